@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,6 +20,26 @@ class Settings(BaseSettings):
     openai_api_key: str
     openai_base_url: Optional[str] = None
     
+    # Model routing: "service.task" or "service" -> model, e.g.
+    # {"name_generator": "gpt-4o-mini", "copy_generator.end": "gpt-4o-mini"}
+    llm_default_model: str = "gpt-4o"
+    llm_model_routes: Dict[str, str] = {}
+    
+    # Shared LLM client (rate limiting, retries, circuit breaker)
+    llm_max_concurrency: int = 8  # Simultaneous in-flight provider calls per process
+    llm_rate_limits: Dict[str, Dict[str, int]] = {
+        "gpt-4o": {"rpm": 500, "tpm": 30000},
+        "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+        "text-embedding-3-small": {"rpm": 3000, "tpm": 1000000},
+    }
+    llm_default_rpm: int = 500  # For models not listed in llm_rate_limits
+    llm_default_tpm: int = 30000
+    llm_max_retries: int = 4
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 30.0
+    llm_breaker_failure_threshold: int = 5  # Consecutive provider failures before opening
+    llm_breaker_reset_seconds: float = 30.0
+    
     # API Configuration
     backend_url: str = "http://localhost:8000"
     frontend_url: str = "http://localhost:3000"
@@ -27,17 +47,42 @@ class Settings(BaseSettings):
     # Upload Settings
     max_upload_size_mb: int = 100
     upload_dir: str = "./uploads"
+    zip_max_uncompressed_mb: int = 500  # Total declared size of all ZIP members
+    zip_max_compression_ratio: int = 100  # Per member (members over 1 MB), rejects zip bombs
+    zip_max_members: int = 5000
+    html_parser_backend: str = "bs4"  # HTML extraction backend: bs4 or lxml (faster, same output)
+    html_stream_threshold_kb: int = 2048  # Larger pages use the bounded-memory streaming parse
+    
+    # Ingestion (uploads are indexed in the background)
+    ingest_workers: int = 2  # Pages indexed concurrently
+    ingest_events_interval_seconds: float = 0.5  # How often the SSE progress stream checks for changes
+    embedding_batch_size: int = 100  # Texts per embeddings API call (provider max 2048)
+    embedding_batch_max_tokens: int = 250000  # Estimated tokens per embeddings call (provider max 300k)
+    screenshot_dedup_enabled: bool = True  # Reuse vision analyses of near-duplicate screenshots
+    screenshot_dedup_max_distance: int = 3  # dHash bits that may differ (0-3 are always found)
+    vision_concurrency: int = 4  # Screenshots analyzed in parallel per upload
+    vision_decode_workers: int = 2  # Threads decoding/resizing screenshots for vision calls
     
     # Generation Settings
     default_temperature: float = 0.7
     max_tokens: int = 2000
     
+    # Idempotency (deduplication of retried generation requests)
+    idempotency_ttl_seconds: int = 86400  # How long completed results are replayed
+    idempotency_lock_timeout_seconds: int = 600  # After this an in-flight claim is considered abandoned
+    idempotency_hash_requests: bool = False  # Dedupe identical bodies even without Idempotency-Key
+    
     # Active Learning
     auto_promotion_threshold: float = 5.0
     min_feedback_samples: int = 10
     
     # Compliance
     default_compliance_level: str = "strict_facebook"
+    compliance_stream_abort: bool = True  # Cancel streamed generations on critical banned phrases
+    compliance_max_regenerations: int = 1  # Corrective retries after an abort before accepting the draft
+    compliance_rules_dir: str = ""  # Rule files (<language>.json); empty = app/data/compliance
+    compliance_rules_reload_seconds: float = 5.0  # How often rule files are checked for changes
+    compliance_memo_size: int = 10000  # In-process LRU of results by (text hash, level, version); 0 = off
     
     model_config = SettingsConfigDict(
         env_file=".env",
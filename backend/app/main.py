@@ -1,12 +1,17 @@
-from fastapi import FastAPI
+import uuid
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import prelandings, generation, feedback, scenarios, generators
+from app.routes import prelandings, generation, feedback, scenarios, generators, usage, compliance
 from app.config import settings
 from app.database import engine
 from app.models import Base
+from app.migrations import upgrade_schema
+from app.services.llm_usage import usage_context
+from app.services.ingest import ingest_registry
 
-# Create database tables
+# Create database tables, then add columns newer than existing tables
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # Create FastAPI application
 app = FastAPI(
@@ -30,12 +35,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def attribute_llm_usage(request: Request, call_next):
+    """Tag LLM calls made while handling a request with its request id."""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with usage_context(request_id=request_id[:64]):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Include routers
 app.include_router(prelandings.router)
 app.include_router(generation.router)
 app.include_router(feedback.router)
 app.include_router(scenarios.router)
 app.include_router(generators.router)
+app.include_router(usage.router)
+app.include_router(compliance.router)
+
+
+@app.on_event("startup")
+def recover_ingests():
+    """Re-queue background ingests that a restart or crash interrupted."""
+    ingest_registry.recover()
 
 
 @app.get("/")
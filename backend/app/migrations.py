@@ -0,0 +1,75 @@
+"""
+In-place upgrade of existing databases.
+
+Base.metadata.create_all creates missing tables but never alters existing ones,
+so columns added to a model after its table was created are added here
+(ALTER TABLE ... ADD COLUMN, with their indexes) and backfilled. Safe to run on
+every start: columns that already exist are skipped.
+"""
+
+from sqlalchemy import inspect, text, update
+from sqlalchemy.engine import Engine
+from app.models import Prelanding, ExtractedElement, GeneratedPrelanding, ElementType
+
+
+# (model, column) added after the table's first release, in the order they were added
+ADDED_COLUMNS = [
+    (GeneratedPrelanding, 'compliance_warnings'),
+    (GeneratedPrelanding, 'compliance_text_hash'),
+    (GeneratedPrelanding, 'compliance_ruleset_version'),
+    (Prelanding, 'content_hash'),
+    (Prelanding, 'ingest_status'),
+    (Prelanding, 'ingest_error'),
+    (Prelanding, 'ingest_options'),
+    (ExtractedElement, 'embedding_status'),
+]
+
+
+def _backfill(connection, model, column_name: str):
+    """Give rows that predate a column the value new rows would have."""
+    if model is Prelanding and column_name == 'ingest_status':
+        # Rows from before background ingest were indexed synchronously
+        connection.execute(update(Prelanding).values(ingest_status='ready'))
+    elif model is ExtractedElement and column_name == 'embedding_status':
+        connection.execute(
+            update(ExtractedElement)
+            .where(ExtractedElement.element_type != ElementType.IMAGE_DESC)
+            .values(embedding_status='pending')
+        )
+        connection.execute(
+            update(ExtractedElement)
+            .where(ExtractedElement.embedding_id.isnot(None))
+            .values(embedding_status='embedded')
+        )
+
+
+def upgrade_schema(engine: Engine) -> list:
+    """
+    Add missing ADDED_COLUMNS to existing tables. Run after create_all.
+
+    Returns:
+        "table.column" names that were added
+    """
+    inspector = inspect(engine)
+    added = []
+    for model, column_name in ADDED_COLUMNS:
+        table = model.__table__
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        if column_name in existing:
+            continue
+
+        column = table.c[column_name]
+        column_type = column.type.compile(dialect=engine.dialect)
+        with engine.begin() as connection:
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                if column_name in index.columns:
+                    index.create(connection, checkfirst=True)
+            _backfill(connection, model, column_name)
+        added.append(f'{table.name}.{column_name}')
+
+    if added:
+        print(f"Database upgraded, added columns: {', '.join(added)}")
+    return added
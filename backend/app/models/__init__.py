@@ -10,6 +10,9 @@ from app.models.prelanding import (
     ElementType
 )
 from app.models.scenario import Scenario
+from app.models.idempotency import IdempotencyRecord
+from app.models.llm_usage import LLMUsage
+from app.models.screenshot import ScreenshotAnalysis
 
 __all__ = [
     "Base",
@@ -20,6 +23,9 @@ __all__ = [
     "PrelendingStatus",
     "PrelendingFormat",
     "ElementType",
-    "Scenario"
+    "Scenario",
+    "IdempotencyRecord",
+    "LLMUsage",
+    "ScreenshotAnalysis"
 ]
 
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, JSON
+from app.database import Base
+
+
+class IdempotencyRecord(Base):
+    """Stored outcome of an idempotent request (e.g. a generation), keyed by endpoint + key."""
+
+    __tablename__ = "idempotency_records"
+
+    endpoint = Column(String(50), primary_key=True)  # e.g. "generate", "generate_with_scenario"
+    key = Column(String(255), primary_key=True)  # Idempotency-Key header or "hash:<request_hash>"
+    request_hash = Column(String(64), nullable=False)  # sha256 of the canonical request body
+
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress, completed
+    gen_id = Column(String, nullable=True)  # Resulting generated prelanding
+    response_body = Column(JSON, nullable=True)  # Stored response returned on replay
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)  # End of retention window
+
+    def __repr__(self):
+        return f"<IdempotencyRecord {self.endpoint}:{self.key} ({self.status})>"
@@ -0,0 +1,37 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from app.database import Base
+
+
+class LLMUsage(Base):
+    """One LLM/embedding API call with token counts, latency and computed cost."""
+
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # What made the call
+    service = Column(String(50), nullable=False, index=True)  # e.g. copy_generator, name_generator
+    task = Column(String(50), nullable=True)  # e.g. beginning, middle, end, names
+    model = Column(String(100), nullable=False, index=True)
+
+    # Attribution
+    gen_id = Column(String, nullable=True, index=True)  # Generated prelanding, if any
+    request_id = Column(String(64), nullable=True, index=True)  # HTTP request that triggered the call
+    geo = Column(String(2), nullable=True, index=True)
+    persona = Column(String(50), nullable=True, index=True)
+
+    # Usage
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)  # Prompt tokens served from provider cache
+    total_tokens = Column(Integer, default=0)
+    latency_ms = Column(Float, default=0.0)
+    cost_usd = Column(Float, default=0.0)
+    success = Column(Integer, default=1)  # Boolean as int
+
+    # Timestamp
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<LLMUsage {self.id} {self.service}/{self.model} ({self.total_tokens} tokens)>"
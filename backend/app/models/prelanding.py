@@ -58,6 +58,12 @@ class Prelanding(Base):
     # File paths
     html_path = Column(String, nullable=False)
     screenshots_dir = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # HTMLParser.content_hash of the HTML
+    
+    # Background indexing: queued, parsing, storing, embedding, analyzing, ready, failed
+    ingest_status = Column(String(20), default="ready", index=True)
+    ingest_error = Column(Text, nullable=True)
+    ingest_options = Column(JSON, nullable=True)  # IngestPipeline flags, to re-run it after a restart or on retry
     
     # Metadata
     date_added = Column(DateTime, default=datetime.utcnow)
@@ -90,6 +96,7 @@ class ExtractedElement(Base):
     
     # Vector embedding reference (stored in Qdrant)
     embedding_id = Column(String, nullable=True)  # UUID in vector DB
+    embedding_status = Column(String(20), nullable=True, index=True)  # pending, embedded, failed; None = not embedded (image descriptions)
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -138,6 +145,10 @@ class GeneratedPrelanding(Base):
     # Compliance checks
     compliance_issues = Column(JSON, default=list)
     compliance_passed = Column(Integer, default=1)  # Boolean as int
+    compliance_warnings = Column(JSON, default=list)
+    # Memo key of the stored result: sha256(generated_text) + ruleset version
+    compliance_text_hash = Column(String(64), nullable=True, index=True)
+    compliance_ruleset_version = Column(String(200), nullable=True)
     
     # Performance tracking (filled via feedback)
     ctr_to_landing = Column(Float, nullable=True)
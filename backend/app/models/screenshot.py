@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from app.database import Base
+
+
+class ScreenshotAnalysis(Base):
+    """Vision analysis of a screenshot, keyed by its perceptual hash so near-duplicates reuse it."""
+
+    __tablename__ = "screenshot_analyses"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # 64-bit difference hash of the downscaled grayscale image, as 16 hex digits
+    dhash = Column(String(16), nullable=False, index=True)
+    # 16-bit quarters of dhash: a hash within 3 bits shares at least one of them
+    band_0 = Column(Integer, nullable=False, index=True)
+    band_1 = Column(Integer, nullable=False, index=True)
+    band_2 = Column(Integer, nullable=False, index=True)
+    band_3 = Column(Integer, nullable=False, index=True)
+
+    analysis = Column(JSON, nullable=False)  # VisionAnalyzer.analyze_image result
+    image_prompts = Column(JSON, nullable=False)  # IMAGE_DESC texts generated from the analysis
+
+    # Where the analysis came from
+    prelanding_id = Column(String, nullable=True, index=True)
+    screenshot_path = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScreenshotAnalysis {self.dhash} ({self.prelanding_id})>"
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException
+
+from app.schemas import ComplianceAuditRequest, ComplianceAuditResponse
+from app.services.compliance_audit import ComplianceAudit, audit_registry
+from app.services.compliance_checker import ComplianceChecker
+
+router = APIRouter(prefix="/api/compliance", tags=["compliance"])
+
+
+@router.post("/audit", response_model=ComplianceAuditResponse, status_code=202)
+def start_compliance_audit(request: ComplianceAuditRequest):
+    """
+    Re-check every generated prelanding against the current rules.
+
+    Runs in the background; poll GET /api/compliance/audit/{audit_id} for progress
+    and the summary.
+    """
+    if request.compliance_level and request.compliance_level not in ComplianceChecker.levels():
+        raise HTTPException(status_code=400, detail=f"Unknown compliance level: {request.compliance_level}")
+
+    audit = ComplianceAudit(
+        compliance_level=request.compliance_level,
+        batch_size=request.batch_size,
+        workers=request.workers,
+        dry_run=request.dry_run
+    )
+    try:
+        return audit_registry.start(audit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/audit/{audit_id}", response_model=ComplianceAuditResponse)
+def get_compliance_audit(audit_id: str):
+    """Get progress or the final summary of a compliance audit."""
+    record = audit_registry.get(audit_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Audit not found")
+    return record
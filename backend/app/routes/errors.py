@@ -0,0 +1,12 @@
+from fastapi import HTTPException
+
+from app.services.llm_client import LLMUnavailableError
+
+
+def llm_unavailable_http_error(error: LLMUnavailableError) -> HTTPException:
+    """Map rate-limit / open-circuit errors to 429/503 so clients back off instead of seeing a 500."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
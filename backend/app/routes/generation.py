@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
 from sqlalchemy.orm import Session
+from typing import Dict, Optional
+import asyncio
 import uuid
 from datetime import datetime
 
@@ -14,41 +16,84 @@ from app.schemas import (
     ScenarioGenerationResponse
 )
 from app.services import CopyGenerator, OutputFormatter
+from app.services.compliance_checker import ComplianceChecker
+from app.services.llm_usage import usage_context
+from app.services.llm_client import LLMUnavailableError
+from app.routes.errors import llm_unavailable_http_error
+from app.services.idempotency import (
+    IdempotencyStore,
+    IdempotencyConflictError,
+    IdempotencyInProgressError
+)
 
 router = APIRouter(prefix="/api/generate", tags=["generation"])
 
 
+def _claim_idempotency_key(
+    store: IdempotencyStore,
+    endpoint: str,
+    key: str,
+    request_hash: str,
+    response: Response
+) -> Optional[Dict]:
+    """Claim the key or return the stored response of a completed duplicate."""
+    try:
+        stored = store.begin(endpoint, key, request_hash)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "5"})
+    
+    if stored is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+    return stored
+
+
 @router.post("/", response_model=GenerationResponse)
 def generate_prelanding(
     request: GenerationRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db)
 ):
     """
     Generate new prelanding copy using AI with RAG.
+    
+    Retries carrying the same Idempotency-Key replay the stored result instead of
+    running (and paying for) the generation again.
     """
+    store = IdempotencyStore(db)
+    request_hash = IdempotencyStore.hash_request("generate", request)
+    key = IdempotencyStore.resolve_key(idempotency_key, request_hash)
+    if key:
+        stored = _claim_idempotency_key(store, "generate", key, request_hash, response)
+        if stored is not None:
+            return GenerationResponse(**stored)
+    
     try:
         print(f"Starting generation for offer: {request.offer}")
         
+        # Create gen_id up front so LLM usage is attributed to it
+        gen_id = f"gen_{uuid.uuid4().hex[:12]}"
+        
         # Generate copy
         generator = CopyGenerator(db)
         print("CopyGenerator created successfully")
         
-        result = generator.generate_prelanding_copy(
-            geo=request.geo,
-            language=request.language,
-            vertical=request.vertical,
-            offer=request.offer,
-            persona=request.persona,
-            compliance_level=request.compliance_level,
-            format_type=request.format,
-            target_length=request.target_length,
-            use_rag=request.use_rag
-        )
+        with usage_context(gen_id=gen_id, geo=request.geo, persona=request.persona):
+            result = generator.generate_prelanding_copy(
+                geo=request.geo,
+                language=request.language,
+                vertical=request.vertical,
+                offer=request.offer,
+                persona=request.persona,
+                compliance_level=request.compliance_level,
+                format_type=request.format,
+                target_length=request.target_length,
+                use_rag=request.use_rag
+            )
         print("Generation completed successfully")
         
-        # Create gen_id
-        gen_id = f"gen_{uuid.uuid4().hex[:12]}"
-        
         # Format outputs
         formatter = OutputFormatter()
         generated_html = formatter.format_as_html(result['generated_text'])
@@ -66,15 +111,14 @@ def generate_prelanding(
             source_prelanding_ids=result.get('source_prelanding_ids', []),
             generated_text=result['generated_text'],
             generated_html=generated_html,
-            compliance_issues=result['compliance'].get('issues', []),
-            compliance_passed=1 if result['compliance']['passed'] else 0
+            **result['compliance_fields']
         )
         
         db.add(generated_record)
         db.commit()
         print("Saved to database")
         
-        return GenerationResponse(
+        result_response = GenerationResponse(
             gen_id=gen_id,
             generated_text=result['generated_text'],
             generated_html=generated_html,
@@ -84,12 +128,24 @@ def generate_prelanding(
             compliance_warnings=result['compliance'].get('warnings', []),
             source_prelanding_ids=result.get('source_prelanding_ids', []),
             tokens_used=result.get('tokens_used', 0),
+            cached_tokens=result.get('cached_tokens', 0),
             created_at=datetime.utcnow()
         )
+        
+        if key:
+            store.complete("generate", key, result_response.model_dump(mode="json"), gen_id=gen_id)
+        
+        return result_response
     
+    except LLMUnavailableError as e:
+        if key:
+            store.release("generate", key)
+        raise llm_unavailable_http_error(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
+        if key:
+            store.release("generate", key)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -116,7 +172,12 @@ def export_generated_prelanding(
     request: ExportRequest,
     db: Session = Depends(get_db)
 ):
-    """Export generated prelanding in specified format."""
+    """
+    Export generated prelanding in specified format.
+    
+    Compliance is re-validated against the current rules; the result stored on
+    the row is reused unless the text or the ruleset version changed.
+    """
     generated = db.query(GeneratedPrelanding).filter(GeneratedPrelanding.gen_id == gen_id).first()
     if not generated:
         raise HTTPException(status_code=404, detail="Generated prelanding not found")
@@ -128,27 +189,51 @@ def export_generated_prelanding(
     else:
         raise HTTPException(status_code=400, detail="Invalid format. Use: text or html")
     
+    checker = ComplianceChecker(generated.compliance_level, language=generated.target_language)
+    compliance, changed = checker.check_row(generated)
+    if changed:
+        db.commit()
+    
     return ExportResponse(
         content=content,
-        format=request.format
+        format=request.format,
+        compliance_passed=compliance['passed'],
+        compliance_issues=compliance['issues'],
+        compliance_warnings=compliance['warnings']
     )
 
 
 @router.post("/with-scenario", response_model=ScenarioGenerationResponse)
-async def generate_with_scenario(
+def generate_with_scenario(
     request: ScenarioGenerationRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
     db: Session = Depends(get_db)
 ):
     """
     Generate prelanding using scenario-based three-part structure.
+    
+    Supports Idempotency-Key the same way as the plain generation endpoint.
+    
+    A sync endpoint: RAG, DB and LLM calls (with their rate-limit and backoff
+    waits) all block, so the generation runs in the threadpool on its own
+    event loop rather than on the server's.
     """
+    store = IdempotencyStore(db)
+    request_hash = IdempotencyStore.hash_request("generate_with_scenario", request)
+    key = IdempotencyStore.resolve_key(idempotency_key, request_hash)
+    if key:
+        stored = _claim_idempotency_key(store, "generate_with_scenario", key, request_hash, response)
+        if stored is not None:
+            return ScenarioGenerationResponse(**stored)
+    
     try:
         print(f"Starting scenario-based generation for offer: {request.offer}")
         print(f"Scenario ID: {request.scenario_id}")
 
         # Generate with scenario
         generator = CopyGenerator(db)
-        result = await generator.generate_with_scenario(
+        result = asyncio.run(generator.generate_with_scenario(
             scenario_id=request.scenario_id,
             geo=request.geo,
             language=request.language,
@@ -157,11 +242,11 @@ async def generate_with_scenario(
             persona=request.persona,
             compliance_level=request.compliance_level,
             use_rag=request.use_rag
-        )
+        ))
 
         print("Scenario-based generation completed successfully")
 
-        return ScenarioGenerationResponse(
+        result_response = ScenarioGenerationResponse(
             gen_id=result['gen_id'],
             beginning=result['beginning'],
             middle=result['middle'],
@@ -172,10 +257,26 @@ async def generate_with_scenario(
             compliance_passed=result['compliance_passed'],
             compliance_issues=result['compliance_issues'],
             tokens_used=result['tokens_used'],
+            cached_tokens=result['cached_tokens'],
             created_at=datetime.utcnow()
         )
 
+        if key:
+            store.complete(
+                "generate_with_scenario", key,
+                result_response.model_dump(mode="json"),
+                gen_id=result['gen_id']
+            )
+
+        return result_response
+
+    except LLMUnavailableError as e:
+        if key:
+            store.release("generate_with_scenario", key)
+        raise llm_unavailable_http_error(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
+        if key:
+            store.release("generate_with_scenario", key)
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,6 +4,8 @@ from typing import List
 from app.config import settings
 from app.services.name_generator import NameGenerator
 from app.services.review_generator import ReviewGenerator
+from app.services.llm_client import LLMUnavailableError
+from app.routes.errors import llm_unavailable_http_error
 from app.schemas import (
     NameGenerationRequest,
     NameResponse,
@@ -25,21 +27,25 @@ def get_openai_api_key():
     return settings.openai_api_key
 
 
-@router.post("/names", response_model=List[NameResponse])
-async def generate_names(
-    request: NameGenerationRequest,
-    api_key: str = Depends(get_openai_api_key)
-):
-    """Generate realistic names for specified GEO and gender."""
+@router.post("/names", response_model=List[NameResponse], dependencies=[Depends(get_openai_api_key)])
+def generate_names(request: NameGenerationRequest):
+    """
+    Generate realistic names for specified GEO and gender.
+    
+    A sync endpoint: the LLM client blocks on rate-limit, concurrency and
+    backoff waits, so it runs in the threadpool instead of the event loop.
+    """
     try:
-        generator = NameGenerator(api_key)
-        names = await generator.generate_names(
+        generator = NameGenerator()
+        names = generator.generate_names_sync(
             geo=request.geo,
             gender=request.gender,
             count=request.count,
             include_nickname=request.include_nickname
         )
         return names
+    except LLMUnavailableError as e:
+        raise llm_unavailable_http_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -47,15 +53,12 @@ async def generate_names(
         )
 
 
-@router.post("/reviews", response_model=List[ReviewResponse])
-async def generate_reviews(
-    request: ReviewGenerationRequest,
-    api_key: str = Depends(get_openai_api_key)
-):
-    """Generate realistic reviews for investment platform."""
+@router.post("/reviews", response_model=List[ReviewResponse], dependencies=[Depends(get_openai_api_key)])
+def generate_reviews(request: ReviewGenerationRequest):
+    """Generate realistic reviews for investment platform (sync endpoint, see generate_names)."""
     try:
-        generator = ReviewGenerator(api_key)
-        reviews = await generator.generate_reviews(
+        generator = ReviewGenerator()
+        reviews = generator.generate_reviews_sync(
             geo=request.geo,
             language=request.language,
             vertical=request.vertical,
@@ -64,6 +67,8 @@ async def generate_reviews(
             names=request.names
         )
         return reviews
+    except LLMUnavailableError as e:
+        raise llm_unavailable_http_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import json
@@ -10,9 +11,14 @@ import tempfile
 from datetime import datetime
 
 from app.database import get_db
-from app.models import Prelanding, ExtractedElement, PrelendingStatus, PrelendingFormat, ElementType
-from app.schemas import PrelendingResponse, PrelendingMetrics
-from app.services import HTMLParser, VisionAnalyzer, EmbeddingService
+from app.models import Prelanding, ExtractedElement, PrelendingStatus, PrelendingFormat
+from app.schemas import PrelendingResponse, PrelendingMetrics, IngestJobResponse
+from app.services import HTMLParser, EmbeddingService
+from app.services.ingest import IngestPipeline, IngestInProgressError, ReindexMissing, ingest_registry
+from app.services.upload_archive import (
+    UploadTooLargeError, UnsafeArchiveError, max_upload_bytes, save_upload, write_file,
+    check_archive, index_archive, default_meta, read_member, copy_member
+)
 from app.config import settings
 
 router = APIRouter(prefix="/api/prelandings", tags=["prelandings"])
@@ -31,6 +37,11 @@ async def upload_prelanding_zip(
     - meta.json (required) - metadata with geo, vertical, metrics, etc.
     - screenshots/ (optional) - folder with screenshots
     - Any .png/.jpg/.jpeg/.webp files (optional) - will be treated as screenshots
+    
+    Files are saved and 202 is returned with an ingest job id; parsing, embedding
+    and storage run in the background (GET /ingest/{job_id} or its /events
+    stream for progress). Re-uploads of an already indexed page return 200; a
+    re-upload of a page whose indexing failed or stalled resumes it (202).
     """
     if not zip_file.filename.endswith('.zip'):
         raise HTTPException(status_code=400, detail="File must be a ZIP archive")
@@ -39,81 +50,76 @@ async def upload_prelanding_zip(
     original_name = os.path.splitext(zip_file.filename)[0]
     
     try:
-        # Create temp directory for extraction
+        # Temp directory holds only the uploaded archive; nothing is extracted
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Save uploaded ZIP
+            # Stream uploaded ZIP to disk, enforcing the size limit as it arrives
             zip_path = os.path.join(temp_dir, "upload.zip")
-            with open(zip_path, "wb") as f:
-                content = await zip_file.read()
-                f.write(content)
+            await save_upload(zip_file, zip_path, max_upload_bytes())
             
-            # Extract ZIP
-            extract_dir = os.path.join(temp_dir, "extracted")
+            # Check member headers against the zip-bomb limits and index the
+            # central directory once; only the members we need are read
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
+                check_archive(zip_ref)
+                members = index_archive(zip_ref)
             
-            # Find HTML file
-            html_content = None
-            html_filename = None
-            for root, dirs, files in os.walk(extract_dir):
-                for file in files:
-                    if file.endswith('.html'):
-                        html_path = os.path.join(root, file)
-                        with open(html_path, 'r', encoding='utf-8') as f:
-                            html_content = f.read()
-                        html_filename = file
-                        break
-                if html_content:
-                    break
+                if members.html is None:
+                    raise HTTPException(status_code=400, detail="No HTML file found in ZIP")
+                html_bytes = await read_member(zip_ref, members.html)
+                html_content = html_bytes.decode('utf-8')
+                html_filename = os.path.basename(members.html.filename)
             
-            if not html_content:
-                raise HTTPException(status_code=400, detail="No HTML file found in ZIP")
+                meta = default_meta()
+                if members.meta is not None:
+                    meta = json.loads((await read_member(zip_ref, members.meta)).decode('utf-8'))
             
-            # Find meta.json
-            meta = {"id": f"pl_{uuid.uuid4().hex[:8]}", "geo": "US", "language": "en", "vertical": "general", "format": "interview", "status": "testing", "tags": [], "metrics": {}}
-            for root, dirs, files in os.walk(extract_dir):
-                if 'meta.json' in files:
-                    meta_path = os.path.join(root, 'meta.json')
-                    with open(meta_path, 'r', encoding='utf-8') as f:
-                        meta = json.load(f)
-                    break
+                # Same HTML already uploaded: reuse its row. Only a finished ingest
+                # is a duplicate; a failed or stalled one is resumed instead.
+                content_hash = HTMLParser.content_hash(html_content)
+                existing = db.query(Prelanding).filter(
+                    Prelanding.content_hash == content_hash
+                ).order_by(Prelanding.ingest_status != 'ready').first()
+                duplicate = existing if existing and existing.ingest_status == 'ready' else None
             
-            prelanding_id = meta.get('id', f"pl_{uuid.uuid4().hex[:8]}")
+                prelanding_id = existing.id if existing else meta.get('id', f"pl_{uuid.uuid4().hex[:8]}")
             
-            # Create upload directory
-            upload_path = os.path.join(settings.upload_dir, prelanding_id)
-            os.makedirs(upload_path, exist_ok=True)
-            screenshots_path = os.path.join(upload_path, "screenshots")
-            os.makedirs(screenshots_path, exist_ok=True)
+                # Create upload directory
+                upload_path = os.path.join(settings.upload_dir, prelanding_id)
+                os.makedirs(upload_path, exist_ok=True)
+                screenshots_path = os.path.join(upload_path, "screenshots")
+                os.makedirs(screenshots_path, exist_ok=True)
             
-            # Save HTML
-            final_html_path = os.path.join(upload_path, "index.html")
-            with open(final_html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                # Save HTML (a duplicate's stored copy is already identical)
+                final_html_path = os.path.join(upload_path, "index.html")
+                if not duplicate:
+                    await write_file(final_html_path, html_bytes)
             
-            # Find and save screenshots
-            screenshot_paths = []
-            image_extensions = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
-            for root, dirs, files in os.walk(extract_dir):
-                for file in files:
-                    if file.lower().endswith(image_extensions):
-                        src_path = os.path.join(root, file)
-                        dst_path = os.path.join(screenshots_path, file)
-                        shutil.copy2(src_path, dst_path)
-                        screenshot_paths.append(dst_path)
+                # Stream screenshots straight from the archive to their final location
+                screenshot_paths = []
+                for info in members.images:
+                    dst_path = os.path.join(screenshots_path, os.path.basename(info.filename))
+                    await copy_member(zip_ref, info, dst_path)
+                    screenshot_paths.append(dst_path)
             
-            # Auto-detect vertical if not specified in meta.json
-            parser = HTMLParser()
-            detected_vertical = parser.detect_vertical(html_content)
-            final_vertical = meta.get('vertical') or detected_vertical
+            if duplicate:
+                return _refresh_duplicate_upload(
+                    db, duplicate, meta, original_name, html_filename, screenshots_path, screenshot_paths
+                )
+            if existing:
+                return _resume_existing_upload(
+                    db, existing, meta, original_name, html_filename, final_html_path,
+                    screenshots_path, screenshot_paths
+                )
             
-            # Create prelanding record - all uploaded are winners (best examples)
+            # Create prelanding record - all uploaded are winners (best examples).
+            # Parsing, storage and embedding run in the background; without a
+            # vertical in meta.json it is auto-detected during parsing.
+            ingest_options = {'detect_vertical': not meta.get('vertical')}
             prelanding = Prelanding(
                 id=prelanding_id,
                 name=original_name,  # Save original filename
                 geo=meta.get('geo', 'US'),
                 language=meta.get('language', 'en'),
-                vertical=final_vertical,  # Auto-detected or from meta.json
+                vertical=meta.get('vertical') or 'general',
                 format=PrelendingFormat(meta.get('format', 'interview')),
                 ctr_to_landing=meta.get('metrics', {}).get('ctr_to_landing'),
                 lead_rate=meta.get('metrics', {}).get('lead_rate'),
@@ -121,67 +127,39 @@ async def upload_prelanding_zip(
                 status=PrelendingStatus(meta.get('status', 'winner')),  # Default to winner
                 tags=meta.get('tags', []),
                 html_path=final_html_path,
-                screenshots_dir=screenshots_path if screenshot_paths else None
+                screenshots_dir=screenshots_path if screenshot_paths else None,
+                content_hash=content_hash,
+                ingest_status='queued',
+                ingest_options=ingest_options
             )
             
             db.add(prelanding)
             db.commit()
             
-            # Parse HTML and extract elements
-            parser = HTMLParser()
-            extracted = parser.parse_html(html_content)
+            job = ingest_registry.submit(IngestPipeline(
+                prelanding_id,
+                screenshot_paths=screenshot_paths,
+                **ingest_options
+            ))
             
-            # Store extracted elements with embeddings
-            try:
-                embedding_service = EmbeddingService()
-                
-                for element_type, elements in extracted.items():
-                    for elem in elements:
-                        db_element = ExtractedElement(
-                            prelanding_id=prelanding_id,
-                            element_type=ElementType(elem.get('type', element_type)),
-                            text_content=elem['text'],
-                            speaker=elem.get('speaker'),
-                            sentiment=elem.get('sentiment'),
-                            order_index=elem.get('order', 0)
-                        )
-                        
-                        performance_score = prelanding.lead_rate or 0.0
-                        try:
-                            embedding_id = embedding_service.store_element_embedding(
-                                text=elem['text'],
-                                prelanding_id=prelanding_id,
-                                element_type=str(elem.get('type', element_type)),
-                                performance_score=performance_score,
-                                metadata={
-                                    'geo': prelanding.geo,
-                                    'vertical': prelanding.vertical,
-                                    'speaker': elem.get('speaker'),
-                                    'sentiment': elem.get('sentiment')
-                                }
-                            )
-                            db_element.embedding_id = embedding_id
-                        except Exception as embed_err:
-                            print(f"Embedding error: {embed_err}")
-                        
-                        db.add(db_element)
-            except Exception as parse_err:
-                print(f"Parsing/embedding error: {parse_err}")
-            
-            db.commit()
-            db.refresh(prelanding)
-            
-            return {
+            return JSONResponse(status_code=202, content={
                 "success": True,
                 "prelanding_id": prelanding_id,
                 "name": original_name,  # Original ZIP filename
-                "message": f"Successfully uploaded prelanding {original_name}",
+                "message": f"Uploaded prelanding {original_name}, indexing in background",
                 "html_found": html_filename,
                 "screenshots_count": len(screenshot_paths),
-                "elements_extracted": sum(len(v) for v in extracted.values()),
-                "vertical_detected": final_vertical  # Show auto-detected category
-            }
+                "ingest_job_id": job['job_id'],
+                "ingest_status": "queued",
+                "duplicate": False
+            })
     
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsafeArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except zipfile.BadZipFile:
         raise HTTPException(status_code=400, detail="Invalid ZIP file")
     except Exception as e:
@@ -191,6 +169,114 @@ async def upload_prelanding_zip(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _apply_upload_meta(
+    prelanding: Prelanding,
+    meta: dict,
+    original_name: str,
+    screenshots_path: str,
+    screenshot_paths: List[str]
+):
+    """Update an existing row from a re-uploaded archive's meta.json."""
+    metrics = meta.get('metrics', {})
+    prelanding.name = original_name
+    prelanding.geo = meta.get('geo', prelanding.geo)
+    prelanding.language = meta.get('language', prelanding.language)
+    prelanding.vertical = meta.get('vertical') or prelanding.vertical
+    prelanding.format = PrelendingFormat(meta.get('format', prelanding.format))
+    prelanding.ctr_to_landing = metrics.get('ctr_to_landing', prelanding.ctr_to_landing)
+    prelanding.lead_rate = metrics.get('lead_rate', prelanding.lead_rate)
+    prelanding.deposit_rate = metrics.get('deposit_rate', prelanding.deposit_rate)
+    prelanding.status = PrelendingStatus(meta.get('status', 'winner'))
+    prelanding.tags = meta.get('tags', prelanding.tags)
+    if screenshot_paths:
+        prelanding.screenshots_dir = screenshots_path
+
+
+def _resume_existing_upload(
+    db: Session,
+    prelanding: Prelanding,
+    meta: dict,
+    original_name: str,
+    html_filename: str,
+    html_path: str,
+    screenshots_path: str,
+    screenshot_paths: List[str]
+) -> JSONResponse:
+    """
+    Handle a re-upload of HTML whose earlier ingest failed or stalled.
+    
+    Metadata is updated and the ingest is re-queued for the existing row
+    (finished stages are kept); if it is still running, its job is returned.
+    """
+    _apply_upload_meta(prelanding, meta, original_name, screenshots_path, screenshot_paths)
+    prelanding.html_path = html_path
+    prelanding.ingest_options = {'detect_vertical': not meta.get('vertical')}
+    db.commit()
+    
+    try:
+        job = ingest_registry.retry(db, prelanding)
+    except IngestInProgressError:
+        job = ingest_registry.latest_for(prelanding.id)
+    
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "prelanding_id": prelanding.id,
+        "name": original_name,
+        "message": f"{original_name} was not fully indexed as {prelanding.id}; indexing resumed",
+        "html_found": html_filename,
+        "screenshots_count": len(screenshot_paths),
+        "ingest_job_id": job['job_id'],
+        "ingest_status": job['status'],
+        "duplicate": False
+    })
+
+
+def _refresh_duplicate_upload(
+    db: Session,
+    prelanding: Prelanding,
+    meta: dict,
+    original_name: str,
+    html_filename: str,
+    screenshots_path: str,
+    screenshot_paths: List[str]
+) -> dict:
+    """
+    Handle a re-upload of already indexed HTML without parsing or embedding.
+    
+    Metadata is updated from meta.json in one transaction; the stored
+    ExtractedElement rows and their Qdrant vectors are kept, and only the
+    payload fields derived from metadata (performance_score, geo, vertical)
+    are patched in place.
+    """
+    _apply_upload_meta(prelanding, meta, original_name, screenshots_path, screenshot_paths)
+    
+    elements_count = db.query(ExtractedElement).filter(
+        ExtractedElement.prelanding_id == prelanding.id
+    ).count()
+    db.commit()
+    
+    try:
+        EmbeddingService().update_prelanding_payload(prelanding.id, {
+            'performance_score': prelanding.lead_rate or 0.0,
+            'geo': prelanding.geo,
+            'vertical': prelanding.vertical
+        })
+    except Exception as e:
+        print(f"Qdrant payload update error: {e}")
+    
+    return {
+        "success": True,
+        "prelanding_id": prelanding.id,
+        "name": original_name,
+        "message": f"{original_name} is already indexed as {prelanding.id}; metadata updated",
+        "html_found": html_filename,
+        "screenshots_count": len(screenshot_paths),
+        "elements_extracted": elements_count,
+        "vertical_detected": prelanding.vertical,
+        "duplicate": True
+    }
+
+
 @router.post("/upload")
 async def upload_prelanding(
     html_file: UploadFile = File(...),
@@ -200,6 +286,9 @@ async def upload_prelanding(
 ):
     """
     Upload a new prelanding with HTML, metadata, and screenshots.
+    
+    Returns 202 with an ingest job id once the files are saved; the page is
+    parsed, stored, embedded and its screenshots analyzed in the background.
     """
     try:
         # Parse metadata
@@ -214,16 +303,13 @@ async def upload_prelanding(
         
         # Save HTML file
         html_path = os.path.join(upload_path, "index.html")
-        with open(html_path, "wb") as f:
-            content = await html_file.read()
-            f.write(content)
+        await save_upload(html_file, html_path, max_upload_bytes())
         
         # Save screenshots
         screenshot_paths = []
         for screenshot in screenshots:
             screenshot_path = os.path.join(screenshots_path, screenshot.filename)
-            with open(screenshot_path, "wb") as f:
-                f.write(await screenshot.read())
+            await save_upload(screenshot, screenshot_path, max_upload_bytes())
             screenshot_paths.append(screenshot_path)
         
         # Create prelanding record
@@ -239,83 +325,99 @@ async def upload_prelanding(
             status=PrelendingStatus(meta.get('status', 'testing')),
             tags=meta.get('tags', []),
             html_path=html_path,
-            screenshots_dir=screenshots_path if screenshot_paths else None
+            screenshots_dir=screenshots_path if screenshot_paths else None,
+            ingest_status='queued',
+            ingest_options={'analyze_screenshots': True}
         )
         
         db.add(prelanding)
         db.commit()
         
-        # Parse HTML and extract elements
-        parser = HTMLParser()
-        html_content = content.decode('utf-8')
-        extracted = parser.parse_html(html_content)
-        
-        # Store extracted elements
-        embedding_service = EmbeddingService()
-        
-        for element_type, elements in extracted.items():
-            for elem in elements:
-                # Create database record
-                db_element = ExtractedElement(
-                    prelanding_id=prelanding_id,
-                    element_type=ElementType(elem.get('type', element_type)),
-                    text_content=elem['text'],
-                    speaker=elem.get('speaker'),
-                    sentiment=elem.get('sentiment'),
-                    order_index=elem.get('order', 0)
-                )
-                
-                # Create and store embedding
-                performance_score = prelanding.lead_rate or 0.0
-                embedding_id = embedding_service.store_element_embedding(
-                    text=elem['text'],
-                    prelanding_id=prelanding_id,
-                    element_type=str(elem.get('type', element_type)),
-                    performance_score=performance_score,
-                    metadata={
-                        'geo': prelanding.geo,
-                        'vertical': prelanding.vertical,
-                        'speaker': elem.get('speaker'),
-                        'sentiment': elem.get('sentiment')
-                    }
-                )
-                
-                db_element.embedding_id = embedding_id
-                db.add(db_element)
-        
-        # Analyze screenshots if provided
-        if screenshot_paths:
-            vision_analyzer = VisionAnalyzer()
-            for screenshot_path in screenshot_paths:
-                try:
-                    analysis = vision_analyzer.analyze_screenshot(screenshot_path)
-                    # Store image descriptions as elements
-                    image_prompts = vision_analyzer.generate_image_prompts(analysis)
-                    for i, prompt in enumerate(image_prompts):
-                        db_element = ExtractedElement(
-                            prelanding_id=prelanding_id,
-                            element_type=ElementType.IMAGE_DESC,
-                            text_content=prompt,
-                            order_index=1000 + i  # High order to keep at end
-                        )
-                        db.add(db_element)
-                except Exception as e:
-                    print(f"Error analyzing screenshot: {e}")
-        
-        db.commit()
-        db.refresh(prelanding)
+        # Parse, store, embed and analyze screenshots in the background
+        job = ingest_registry.submit(IngestPipeline(
+            prelanding_id,
+            screenshot_paths=screenshot_paths,
+            **prelanding.ingest_options
+        ))
         
-        return {
+        return JSONResponse(status_code=202, content={
             "success": True,
             "prelanding_id": prelanding_id,
-            "message": f"Uploaded and processed prelanding {prelanding_id}"
-        }
+            "message": f"Uploaded prelanding {prelanding_id}, indexing in background",
+            "ingest_job_id": job['job_id'],
+            "ingest_status": "queued"
+        })
     
+    except UploadTooLargeError as e:
+        db.rollback()
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/ingest/{job_id}", response_model=IngestJobResponse)
+def get_ingest_job(job_id: str):
+    """Get per-stage progress of a background ingest job (parse, store, embed, vision)."""
+    record = ingest_registry.get(job_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return record
+
+
+@router.get("/ingest/{job_id}/events")
+async def stream_ingest_job(job_id: str):
+    """
+    Server-sent events with the progress of an ingest job.
+    
+    Emits `progress` with the job record whenever it changes and a final `done`
+    once the job completes or fails.
+    """
+    if not ingest_registry.get(job_id):
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return StreamingResponse(
+        ingest_registry.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/reindex-missing", response_model=IngestJobResponse, status_code=202)
+def reindex_missing_embeddings():
+    """
+    Embed every element of the library that has no vector yet, in batches.
+    
+    Safe to re-run, also while another reindex or ingest is running: point ids
+    are derived from the elements, so vectors are overwritten, never duplicated.
+    """
+    return ingest_registry.submit(ReindexMissing())
+
+
+@router.post("/{prelanding_id}/reindex-missing", response_model=IngestJobResponse, status_code=202)
+def reindex_missing_prelanding_embeddings(prelanding_id: str, db: Session = Depends(get_db)):
+    """Embed the elements of one prelanding that have no vector yet."""
+    if not db.get(Prelanding, prelanding_id):
+        raise HTTPException(status_code=404, detail=f"Prelanding {prelanding_id} not found")
+    return ingest_registry.submit(ReindexMissing(prelanding_id))
+
+
+@router.post("/{prelanding_id}/reingest", response_model=IngestJobResponse, status_code=202)
+def reingest_prelanding(prelanding_id: str, db: Session = Depends(get_db)):
+    """
+    Retry the background ingest of a prelanding whose indexing failed or stalled.
+    
+    Stages that already finished are not redone: stored elements are kept and
+    only elements without vectors are embedded.
+    """
+    prelanding = db.get(Prelanding, prelanding_id)
+    if not prelanding:
+        raise HTTPException(status_code=404, detail=f"Prelanding {prelanding_id} not found")
+    try:
+        return ingest_registry.retry(db, prelanding)
+    except IngestInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
 @router.get("/", response_model=List[PrelendingResponse])
 def list_prelandings(
     geo: Optional[str] = None,
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.services.llm_usage import UsageReport
+from app.services.llm_client import get_llm_client
+
+router = APIRouter(prefix="/api/usage", tags=["usage"])
+
+
+@router.get("/summary")
+def get_usage_summary(
+    group_by: str = "day",
+    days: int = 30,
+    db: Session = Depends(get_db)
+):
+    """
+    Aggregate LLM token usage and cost.
+
+    group_by: day, model, geo, persona, service or task
+    """
+    report = UsageReport(db)
+    try:
+        rows = report.aggregate(group_by=group_by, days=days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "group_by": group_by,
+        "days": days,
+        "total_cost_usd": round(sum(r['cost_usd'] for r in rows), 6),
+        "total_tokens": sum(r['total_tokens'] for r in rows),
+        "rows": rows
+    }
+
+
+@router.get("/generations/{gen_id}")
+def get_generation_usage(gen_id: str, db: Session = Depends(get_db)):
+    """Get every LLM call attributed to a generated prelanding."""
+    return UsageReport(db).for_generation(gen_id)
+
+
+@router.get("/llm-client")
+def get_llm_client_metrics():
+    """Queue time, retries, rate limiting and circuit state of the shared LLM client."""
+    return get_llm_client().metrics()
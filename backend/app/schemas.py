@@ -26,12 +26,35 @@ class PrelendingResponse(BaseModel):
     deposit_rate: Optional[float] = None
     html_path: Optional[str] = None
     screenshots_dir: Optional[str] = None
+    ingest_status: Optional[str] = None  # queued, parsing, storing, embedding, analyzing, ready, failed
+    ingest_error: Optional[str] = None
     date_added: datetime
     
     class Config:
         from_attributes = True
 
 
+class IngestStageProgress(BaseModel):
+    """Progress of one ingest pipeline stage."""
+    status: str  # pending, running, completed, skipped, failed
+    done: int = 0
+    total: int = 0
+
+
+class IngestJobResponse(BaseModel):
+    """Status of a background ingest job (parse -> store -> embed -> vision) or reindex."""
+    job_id: str
+    prelanding_id: Optional[str] = None  # None for a library-wide reindex
+    status: str  # queued, running, completed, failed
+    stage: Optional[str] = None
+    stages: Dict[str, IngestStageProgress] = {}
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
 # Generation schemas
 class GenerationRequest(BaseModel):
     """Request schema for generating new prelanding."""
@@ -57,6 +80,7 @@ class GenerationResponse(BaseModel):
     compliance_warnings: List[dict] = []
     source_prelanding_ids: List[str] = []
     tokens_used: int
+    cached_tokens: int = 0
     created_at: datetime
 
 
@@ -69,6 +93,9 @@ class ExportResponse(BaseModel):
     """Response schema for export."""
     content: str
     format: str
+    compliance_passed: Optional[bool] = None
+    compliance_issues: List[dict] = []
+    compliance_warnings: List[dict] = []
 
 
 # Feedback schemas
@@ -196,4 +223,25 @@ class ScenarioGenerationResponse(BaseModel):
     compliance_passed: bool = True
     compliance_issues: List[dict] = []
     tokens_used: int = 0
+    cached_tokens: int = 0
     created_at: datetime
+
+
+# Compliance audit schemas
+class ComplianceAuditRequest(BaseModel):
+    """Request schema for re-checking the generated library."""
+    compliance_level: Optional[str] = Field(default=None, description="Check all rows at this level (default: each row's own level)")
+    batch_size: int = Field(default=1000, ge=1, le=10000, description="Rows per fetch/worker task/update")
+    workers: Optional[int] = Field(default=None, ge=0, description="Worker processes (default: CPU count, 0 = in-process)")
+    dry_run: bool = Field(default=False, description="Only report, do not write results")
+
+
+class ComplianceAuditResponse(BaseModel):
+    """Status of a compliance audit."""
+    audit_id: str
+    status: str  # running, completed, failed
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    progress: Dict[str, int] = {}
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
@@ -0,0 +1,250 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from app.database import SessionLocal, engine
+from app.models.prelanding import GeneratedPrelanding
+from app.services.compliance_checker import ComplianceChecker
+
+
+def check_batch(rows: List[Tuple], compliance_level: Optional[str]) -> List[Dict]:
+    """
+    Check one batch of (gen_id, stored level, language, text, stored result) rows.
+    Runs in a worker process.
+
+    Compiled rulesets are cached per process, so each worker compiles once.
+    Rows whose stored result is still valid (same text hash, level and ruleset
+    version) are not scanned and are marked 'memoized' so they are not rewritten.
+    """
+    results = []
+    for gen_id, stored_level, language, text, stored in rows:
+        level = compliance_level or stored_level
+        text = text or ''
+        checker = ComplianceChecker(compliance_level=level, language=language)
+        text_hash = checker.text_hash(text)
+        result = checker.stored_result(text_hash, stored_level, *stored)
+        memoized = result is not None
+        if not memoized:
+            result = checker.check_compliance(text, text_hash=text_hash)
+        results.append({
+            'gen_id': gen_id,
+            'compliance_level': level,
+            'memoized': memoized,
+            **checker.stored_fields(text, result, text_hash)
+        })
+    return results
+
+
+class ComplianceAudit:
+    """
+    Re-check every generated prelanding against the current compliance rules.
+
+    Rows are streamed with a server-side cursor in batches, checked across a
+    process pool and written back with one bulk UPDATE per batch, so memory
+    stays bounded by (workers * 2) batches regardless of table size.
+    """
+
+    def __init__(
+        self,
+        compliance_level: Optional[str] = None,
+        batch_size: int = 1000,
+        workers: Optional[int] = None,
+        dry_run: bool = False
+    ):
+        """
+        Args:
+            compliance_level: Check every row at this level (and store it);
+                by default each row is checked at its own level
+            batch_size: Rows per cursor fetch, worker task and UPDATE
+            workers: Worker processes (default: CPU count, 0 = check in-process)
+            dry_run: Compute the summary without writing results
+        """
+        self.compliance_level = compliance_level
+        self.batch_size = max(1, batch_size)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.dry_run = dry_run
+        self.progress = {'checked': 0, 'updated': 0}
+
+    def run(self) -> Dict:
+        """
+        Run the audit.
+
+        Returns:
+            Summary dict: totals, status changes, most frequent issues, throughput
+        """
+        started = time.perf_counter()
+        summary = {
+            'total': 0,
+            'passed': 0,
+            'failed': 0,
+            'newly_failed': 0,
+            'newly_passed': 0,
+            'updated': 0,
+            'memoized': 0,
+        }
+        issue_counts: Counter = Counter()
+
+        executor = self._executor()
+        pending = {}
+        try:
+            for batch in self._stream_batches():
+                # Bound in-flight work so memory does not grow with table size
+                while executor and len(pending) >= self.workers * 2:
+                    self._drain(pending, wait(pending, return_when=FIRST_COMPLETED).done, summary, issue_counts)
+
+                previous = {gen_id: passed for gen_id, passed, _ in batch}
+                rows = [(gen_id, *values) for gen_id, _, values in batch]
+                if executor:
+                    pending[executor.submit(check_batch, rows, self.compliance_level)] = previous
+                else:
+                    self._apply(check_batch(rows, self.compliance_level), previous, summary, issue_counts)
+
+            if pending:
+                self._drain(pending, wait(pending).done, summary, issue_counts)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        summary.update({
+            'compliance_level': self.compliance_level or 'per-row',
+            'dry_run': self.dry_run,
+            'top_issues': [{'phrase': phrase, 'rows': count} for phrase, count in issue_counts.most_common(20)],
+            'duration_seconds': round(elapsed, 2),
+            'rows_per_second': round(summary['total'] / elapsed, 1) if elapsed > 0 else 0.0
+        })
+        return summary
+
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        # spawn: workers must not inherit the parent's DB connections or server threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def _stream_batches(self):
+        """
+        Yield lists of (gen_id, previous passed, (level, language, text, stored result))
+        using a server-side cursor.
+        """
+        query = select(
+            GeneratedPrelanding.gen_id,
+            GeneratedPrelanding.compliance_passed,
+            GeneratedPrelanding.compliance_level,
+            GeneratedPrelanding.target_language,
+            GeneratedPrelanding.generated_text,
+            GeneratedPrelanding.compliance_text_hash,
+            GeneratedPrelanding.compliance_ruleset_version,
+            GeneratedPrelanding.compliance_issues,
+            GeneratedPrelanding.compliance_warnings
+        ).order_by(GeneratedPrelanding.gen_id)
+
+        with engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True,
+                yield_per=self.batch_size
+            ).execute(query)
+            for partition in result.partitions():
+                yield [
+                    (row[0], row[1], (row[2], row[3], row[4], (row[5], row[6], row[1], row[7], row[8])))
+                    for row in partition
+                ]
+
+    def _drain(self, pending: Dict, done, summary: Dict, issue_counts: Counter):
+        for future in done:
+            previous = pending.pop(future)
+            self._apply(future.result(), previous, summary, issue_counts)
+
+    def _apply(self, results: List[Dict], previous: Dict[str, int], summary: Dict, issue_counts: Counter):
+        """Tally a checked batch and write back the rescanned rows with one bulk UPDATE."""
+        for result in results:
+            summary['total'] += 1
+            if result['memoized']:
+                summary['memoized'] += 1
+            was_passed = previous.get(result['gen_id'])
+            if result['compliance_passed']:
+                summary['passed'] += 1
+                if was_passed == 0:
+                    summary['newly_passed'] += 1
+            else:
+                summary['failed'] += 1
+                if was_passed != 0:
+                    summary['newly_failed'] += 1
+            issue_counts.update({issue['phrase'] for issue in result['compliance_issues']})
+
+        self.progress['checked'] = summary['total']
+        skip = {'memoized'} if self.compliance_level else {'memoized', 'compliance_level'}
+        results = [{k: v for k, v in r.items() if k not in skip} for r in results if not r['memoized']]
+        if self.dry_run or not results:
+            return
+
+        db = SessionLocal()
+        try:
+            # Bulk UPDATE by primary key (executemany)
+            db.execute(update(GeneratedPrelanding), results)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        summary['updated'] += len(results)
+        self.progress['updated'] = summary['updated']
+
+
+class ComplianceAuditRegistry:
+    """In-process registry of audits started from the API, run in background threads."""
+
+    def __init__(self):
+        self.audits: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def start(self, audit: ComplianceAudit) -> Dict:
+        """Start an audit in a background thread. Only one may run at a time."""
+        with self.lock:
+            if any(a['status'] == 'running' for a in self.audits.values()):
+                raise RuntimeError("A compliance audit is already running")
+            audit_id = uuid.uuid4().hex
+            record = {
+                'audit_id': audit_id,
+                'status': 'running',
+                'started_at': datetime.utcnow(),
+                'finished_at': None,
+                'progress': audit.progress,
+                'summary': None,
+                'error': None
+            }
+            self.audits[audit_id] = record
+
+        thread = threading.Thread(target=self._run, args=(audit, record), daemon=True)
+        thread.start()
+        return record
+
+    def get(self, audit_id: str) -> Optional[Dict]:
+        return self.audits.get(audit_id)
+
+    @staticmethod
+    def _run(audit: ComplianceAudit, record: Dict):
+        try:
+            record['summary'] = audit.run()
+            record['status'] = 'completed'
+        except Exception as e:
+            import traceback
+            print(f"Compliance audit failed: {e}")
+            print(traceback.format_exc())
+            record['status'] = 'failed'
+            record['error'] = str(e)
+        finally:
+            record['finished_at'] = datetime.utcnow()
+
+
+audit_registry = ComplianceAuditRegistry()
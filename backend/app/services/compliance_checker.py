@@ -1,62 +1,87 @@
-from typing import List, Dict, Optional
-import re
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, List, Dict, Optional, Tuple
+from app.config import settings
+from app.services.compliance_rules import CompiledRuleset, get_rule_store
 
 
 class ComplianceChecker:
-    """Service for checking prelanding copy compliance with ad network policies."""
-    
-    # Banned phrases by compliance level
-    BANNED_PHRASES = {
-        'strict_facebook': [
-            'guaranteed profit',
-            'guaranteed income',
-            'guaranteed return',
-            'risk-free',
-            'no risk',
-            'zero risk',
-            'get rich quick',
-            '100% profit',
-            'click here to win',
-            'you will earn',
-            'you will make',
-            'become a millionaire',
-            'financial freedom guaranteed'
-        ],
-        'moderate': [
-            'guaranteed profit',
-            '100% profit',
-            'get rich quick',
-            'no risk whatsoever'
-        ],
-        'relaxed': [
-            'guaranteed 1000%',
-            'impossible to lose'
-        ]
-    }
+    """
+    Service for checking prelanding copy compliance with ad network policies.
+    
+    Rules are loaded per (level, language) from app/data/compliance/<language>.json
+    and compiled once per version (see ComplianceRuleStore).
     
-    # Celebrity/endorsement patterns
-    CELEBRITY_PATTERNS = [
-        r'\b(elon musk|bill gates|warren buffett|jeff bezos)\b',
-        r'\b(trump|biden|merkel|macron)\b',
-        r'\b(celebrity|famous person)\b'
-    ]
+    Results are memoized by (sha256(text), level, ruleset version): in-process in
+    an LRU shared by all checkers, and on GeneratedPrelanding rows via
+    stored_fields()/stored_result(). The ruleset version includes a digest of the
+    rule files, so any edit changes the key and stale results are never reused.
+    """
     
-    # Financial claim patterns (specific amounts)
-    FINANCIAL_CLAIM_PATTERN = r'\$\d+[\d,]*|\€\d+[\d,]*|£\d+[\d,]*'
+    _memo: 'OrderedDict[Tuple[str, str, str], Dict]' = OrderedDict()
+    _memo_lock = threading.Lock()
     
-    def __init__(self, compliance_level: str = 'strict_facebook'):
+    def __init__(self, compliance_level: str = 'strict_facebook', language: Optional[str] = None):
         self.compliance_level = compliance_level
-        self.banned_phrases = self.BANNED_PHRASES.get(
-            compliance_level,
-            self.BANNED_PHRASES['strict_facebook']
-        )
+        self.language = language
+        self.ruleset = self.get_ruleset(compliance_level, language)
+        self.banned_phrases = self.ruleset.banned_phrases
+        self.ruleset_version = self.ruleset.version
+    
+    @staticmethod
+    def get_ruleset(compliance_level: str, language: Optional[str] = None) -> CompiledRuleset:
+        """Return the cached compiled ruleset for (level, language) at the current rules version."""
+        return get_rule_store().get(compliance_level, language)
+    
+    @staticmethod
+    def levels() -> List[str]:
+        """Available compliance levels."""
+        return get_rule_store().levels()
+    
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """sha256 hex digest of the text, the text part of the memo key."""
+        return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+    
+    def _memo_key(self, text_hash: str) -> Tuple[str, str, str]:
+        return (text_hash, self.ruleset.level, self.ruleset_version)
+    
+    @classmethod
+    def _memo_get(cls, key: Tuple[str, str, str]) -> Optional[Dict]:
+        with cls._memo_lock:
+            result = cls._memo.get(key)
+            if result is not None:
+                cls._memo.move_to_end(key)
+        # Callers may mutate the result, so never hand out the cached object
+        return copy.deepcopy(result) if result is not None else None
+    
+    @classmethod
+    def _memo_put(cls, key: Tuple[str, str, str], result: Dict):
+        if settings.compliance_memo_size <= 0:
+            return
+        with cls._memo_lock:
+            cls._memo[key] = copy.deepcopy(result)
+            cls._memo.move_to_end(key)
+            while len(cls._memo) > settings.compliance_memo_size:
+                cls._memo.popitem(last=False)
+    
+    @classmethod
+    def clear_memo(cls):
+        """Drop all in-process memoized results."""
+        with cls._memo_lock:
+            cls._memo.clear()
     
-    def check_compliance(self, text: str) -> Dict:
+    def check_compliance(self, text: str, text_hash: Optional[str] = None) -> Dict:
         """
-        Check text for compliance issues.
+        Check text for compliance issues in a single pass.
+        
+        Unchanged texts are answered from the in-process memo without scanning.
         
         Args:
             text: Text to check
+            text_hash: Precomputed text_hash(text), if the caller already has it
             
         Returns:
             Dict with compliance results:
@@ -66,35 +91,169 @@ class ComplianceChecker:
                 'warnings': List[Dict]
             }
         """
+        key = self._memo_key(text_hash or self.text_hash(text))
+        result = self._memo_get(key)
+        if result is None:
+            result = self._build_result(self.ruleset.find_hits(text))
+            self._memo_put(key, result)
+        return result
+    
+    def check_and_rewrite(self, text: str) -> Tuple[str, Dict]:
+        """
+        Check text and, if it fails, soften its claims and check the result.
+        
+        Args:
+            text: Text to check
+            
+        Returns:
+            (text, compliance result). The text is rewritten only when the check
+            failed; the result then describes the rewritten text.
+        """
+        key = self._memo_key(self.text_hash(text))
+        result = self._memo_get(key)
+        if result is not None and result['passed']:
+            return text, result
+        
+        hits = self.ruleset.find_hits(text)
+        if result is None:
+            result = self._build_result(hits)
+            self._memo_put(key, result)
+            if result['passed']:
+                return text, result
+        
+        rewritten, _ = self.ruleset.apply_rewrites(text, hits)
+        # A real scan of the rewritten text: its result is memoized and persisted
+        # (stored_fields), so it must not be derived from the original's hits
+        return rewritten, self.check_compliance(rewritten)
+    
+    def stored_fields(self, text: str, result: Dict, text_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        GeneratedPrelanding column values that persist a result next to its row.
+        
+        Args:
+            text: The checked text (generated_text)
+            result: check_compliance result for that text
+            text_hash: Precomputed text_hash(text)
+            
+        Returns:
+            Dict of compliance_* columns, usable as model kwargs or in a bulk UPDATE
+        """
+        return {
+            'compliance_passed': 1 if result['passed'] else 0,
+            'compliance_issues': result.get('issues', []),
+            'compliance_warnings': result.get('warnings', []),
+            'compliance_text_hash': text_hash or self.text_hash(text),
+            'compliance_ruleset_version': self.ruleset_version
+        }
+    
+    def stored_result(
+        self,
+        text_hash: str,
+        stored_level: Optional[str],
+        stored_hash: Optional[str],
+        stored_version: Optional[str],
+        passed: Optional[int],
+        issues: Optional[List[Dict]],
+        warnings: Optional[List[Dict]]
+    ) -> Optional[Dict]:
+        """
+        Rebuild a result persisted on a row, if it is still valid.
+        
+        Args:
+            text_hash: text_hash() of the row's current text
+            stored_level: compliance_level the stored result was computed at
+            stored_hash, stored_version: compliance_text_hash / compliance_ruleset_version
+            passed, issues, warnings: stored compliance_* columns
+            
+        Returns:
+            The stored result (also put into the in-process memo), or None when
+            the text, level or ruleset version changed since it was stored
+        """
+        if (stored_hash != text_hash or stored_level != self.compliance_level
+                or stored_version != self.ruleset_version):
+            return None
+        result = {
+            'passed': bool(passed),
+            'issues': issues or [],
+            'warnings': warnings or []
+        }
+        self._memo_put(self._memo_key(text_hash), result)
+        return result
+    
+    def check_row(self, row) -> Tuple[Dict, bool]:
+        """
+        Check a GeneratedPrelanding, reusing the result stored on it when valid.
+        
+        A fresh result is written onto the row (not committed).
+        
+        Args:
+            row: GeneratedPrelanding checked at this checker's level
+            
+        Returns:
+            (result, changed) - changed is True when the row's columns were updated
+        """
+        text = row.generated_text or ''
+        text_hash = self.text_hash(text)
+        result = self.stored_result(
+            text_hash, row.compliance_level, row.compliance_text_hash, row.compliance_ruleset_version,
+            row.compliance_passed, row.compliance_issues, row.compliance_warnings
+        )
+        if result is not None:
+            return result, False
+        
+        result = self.check_compliance(text, text_hash=text_hash)
+        for column, value in self.stored_fields(text, result, text_hash).items():
+            setattr(row, column, value)
+        return result, True
+    
+    def _build_result(self, hits: List[Tuple[str, str, int]]) -> Dict:
+        """Turn hits from CompiledRuleset.find_hits into the issues/warnings structure."""
+        banned_offsets: Dict[str, List[int]] = {}
+        celebrity_matches: Dict[int, List[str]] = {}
+        celebrity_offsets: Dict[int, List[int]] = {}
+        financial_claims = []
+        urgency_found = set()
+        
+        for category, phrase, offset in hits:
+            if category == 'banned':
+                banned_offsets.setdefault(phrase, []).append(offset)
+            elif category == 'financial':
+                financial_claims.append(phrase)
+            elif category == 'urgency':
+                urgency_found.add(phrase)
+            elif category.startswith('celebrity'):
+                index = int(category[len('celebrity'):])
+                celebrity_matches.setdefault(index, []).append(phrase)
+                celebrity_offsets.setdefault(index, []).append(offset)
+        
+        urgency_count = len(urgency_found)
         issues = []
         warnings = []
         
-        text_lower = text.lower()
-        
-        # 1. Check banned phrases
+        # 1. Banned phrases (in rule order)
         for phrase in self.banned_phrases:
-            if phrase.lower() in text_lower:
+            if phrase.lower() in banned_offsets:
                 issues.append({
                     'type': 'banned_phrase',
                     'severity': 'critical',
                     'phrase': phrase,
+                    'offsets': banned_offsets[phrase.lower()],
                     'message': f'Contains banned phrase: "{phrase}"'
                 })
         
-        # 2. Check celebrity endorsements
-        for pattern in self.CELEBRITY_PATTERNS:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            if matches:
-                warnings.append({
-                    'type': 'celebrity_endorsement',
-                    'severity': 'warning',
-                    'matches': matches,
-                    'message': f'Contains celebrity name: {matches}. Requires manual review.'
-                })
+        # 2. Celebrity endorsements (one warning per pattern)
+        for index in sorted(celebrity_matches):
+            matches = celebrity_matches[index]
+            warnings.append({
+                'type': 'celebrity_endorsement',
+                'severity': 'warning',
+                'matches': matches,
+                'offsets': celebrity_offsets[index],
+                'message': f'Contains celebrity name: {matches}. Requires manual review.'
+            })
         
-        # 3. Check financial claims
-        financial_claims = re.findall(self.FINANCIAL_CLAIM_PATTERN, text)
-        if financial_claims and self.compliance_level == 'strict_facebook':
+        # 3. Financial claims
+        if financial_claims and self.ruleset.flag_financial_claims:
             warnings.append({
                 'type': 'financial_claim',
                 'severity': 'warning',
@@ -102,10 +261,9 @@ class ComplianceChecker:
                 'message': f'Contains specific financial amounts: {financial_claims}. Verify claims are substantiated.'
             })
         
-        # 4. Check for excessive urgency/FOMO
-        urgency_words = ['hurry', 'limited time', 'only today', 'expires soon', 'last chance']
-        urgency_count = sum(1 for word in urgency_words if word in text_lower)
-        if urgency_count > 2 and self.compliance_level == 'strict_facebook':
+        # 4. Excessive urgency/FOMO
+        threshold = self.ruleset.urgency_threshold
+        if threshold is not None and urgency_count > threshold:
             warnings.append({
                 'type': 'excessive_urgency',
                 'severity': 'warning',
@@ -119,6 +277,10 @@ class ComplianceChecker:
             'warnings': warnings
         }
     
+    def stream_scanner(self) -> 'StreamingComplianceScanner':
+        """Create an incremental scanner for critical issues in a token stream."""
+        return StreamingComplianceScanner(self.ruleset)
+    
     def rewrite_claims(self, text: str) -> str:
         """
         Soften aggressive claims to pass compliance.
@@ -128,37 +290,15 @@ class ComplianceChecker:
         - "guaranteed profit" → "potential returns"
         - "no risk" → "managed risk"
         
+        All rewrites of the ruleset are applied in one pass over the text.
+        
         Args:
             text: Original text
             
         Returns:
             Rewritten text with softened claims
         """
-        rewritten = text
-        
-        # Define rewrite rules
-        rewrites = {
-            'you will earn': 'you could potentially earn',
-            'you will make': 'you might make',
-            'guaranteed profit': 'potential returns',
-            'guaranteed income': 'potential income',
-            'guaranteed return': 'expected return',
-            'risk-free': 'low-risk',
-            'no risk': 'managed risk',
-            'zero risk': 'minimal risk',
-            'get rich quick': 'build wealth',
-            '100% profit': 'high returns',
-            'become a millionaire': 'achieve financial success'
-        }
-        
-        for original, replacement in rewrites.items():
-            rewritten = re.sub(
-                re.escape(original),
-                replacement,
-                rewritten,
-                flags=re.IGNORECASE
-            )
-        
+        rewritten, _ = self.ruleset.apply_rewrites(text, self.ruleset.find_hits(text))
         return rewritten
     
     def generate_compliance_report(self, text: str) -> str:
@@ -174,7 +314,7 @@ class ComplianceChecker:
         result = self.check_compliance(text)
         
         report_lines = [
-            f"=== Compliance Report ({self.compliance_level}) ===\n",
+            f"=== Compliance Report ({self.compliance_level}, {self.ruleset_version}) ===\n",
             f"Status: {'✓ PASSED' if result['passed'] else '✗ FAILED'}\n"
         ]
         
@@ -192,3 +332,48 @@ class ComplianceChecker:
             report_lines.append("\n✓ No issues detected.")
         
         return '\n'.join(report_lines)
+
+
+class StreamingComplianceScanner:
+    """
+    Incremental banned-phrase scanner for streamed completions.
+    
+    Chunks are fed as they arrive; the last (longest phrase - 1) characters are
+    kept between calls so phrases split across chunk boundaries are still found.
+    """
+    
+    def __init__(self, ruleset: CompiledRuleset):
+        self.ruleset = ruleset
+        self.tail_size = max((len(phrase) for phrase in ruleset.banned_phrases), default=1) - 1
+        self.tail = ''
+        self.chars_seen = 0
+    
+    def feed(self, chunk: str) -> Optional[Dict]:
+        """
+        Scan the next chunk of streamed text.
+        
+        Args:
+            chunk: Newly received text
+            
+        Returns:
+            Critical issue dict (same shape as check_compliance issues) for the
+            first banned phrase found, otherwise None
+        """
+        if not chunk:
+            return None
+        
+        window = self.tail + chunk
+        window_start = self.chars_seen - len(self.tail)
+        self.chars_seen += len(chunk)
+        self.tail = window[-self.tail_size:] if self.tail_size else ''
+        
+        for category, phrase, offset in self.ruleset.find_hits(window):
+            if category == 'banned':
+                return {
+                    'type': 'banned_phrase',
+                    'severity': 'critical',
+                    'phrase': phrase,
+                    'offsets': [window_start + offset],
+                    'message': f'Contains banned phrase: "{phrase}"'
+                }
+        return None
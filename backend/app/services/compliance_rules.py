@@ -0,0 +1,430 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import re
+from app.config import settings
+
+
+DEFAULT_RULES_DIR = Path(__file__).resolve().parent.parent / "data" / "compliance"
+
+# Language whose rules apply to every language (copy often keeps English phrases)
+BASE_LANGUAGE = 'en'
+DEFAULT_LEVEL = 'strict_facebook'
+# A replacement can complete another rewrite phrase with the text around it
+# ("kein risikofrei" -> "kein risikoarm"); passes stop once nothing is left to rewrite
+MAX_REWRITE_PASSES = 4
+
+
+class CompiledRuleset:
+    """
+    All rules of one (compliance level, language, version) compiled into a single regex.
+    
+    Literal phrases are merged into a character trie ("guaranteed (?:profit|income)")
+    so the regex engine can skip positions that cannot start a hit, and one scan of
+    the lower-cased text reports every hit with its offset. Scanning resumes one
+    character after each hit start, so overlapping hits are found too; at each
+    position the longest phrase matches and shorter phrases it starts with are
+    credited via prefix_credit.
+    """
+    
+    def __init__(self, rules: Dict, level: str, language: str, version: str):
+        """
+        Args:
+            rules: Merged rules for one level: banned_phrases, celebrity_names,
+                financial_patterns, urgency_words, rewrites, flag_financial_claims,
+                urgency_threshold
+            level: Compliance level the rules belong to
+            language: Language code
+            version: Ruleset version (part of the cache key)
+        """
+        self.level = level
+        self.language = language
+        self.version = version
+        self.banned_phrases: List[str] = rules['banned_phrases']
+        self.urgency_words: List[str] = rules['urgency_words']
+        self.financial_patterns: List[str] = rules['financial_patterns']
+        self.flag_financial_claims: bool = rules['flag_financial_claims']
+        self.urgency_threshold: Optional[int] = rules['urgency_threshold']
+        self.rewrites = {original.lower(): replacement for original, replacement in rules['rewrites'].items()}
+        # Rule order decides which of two overlapping rewrites applies
+        self.rewrite_order = {original: index for index, original in enumerate(self.rewrites)}
+        banned_phrases = self.banned_phrases
+        celebrity_names = rules['celebrity_names']
+        urgency_words = self.urgency_words
+        
+        # Lower-cased literal -> categories it belongs to
+        categories: Dict[str, List[str]] = {}
+        for phrase in banned_phrases:
+            categories.setdefault(phrase.lower(), []).append('banned')
+        for index, names in enumerate(celebrity_names):
+            for name in names:
+                categories.setdefault(name.lower(), []).append(f'celebrity{index}')
+        for word in urgency_words:
+            categories.setdefault(word.lower(), []).append('urgency')
+        for original in self.rewrites:
+            categories.setdefault(original, []).append('rewrite')
+        
+        # Matched literal -> (category, literal) for it and every literal it starts with
+        self.prefix_credit: Dict[str, List[Tuple[str, str]]] = {
+            literal: [
+                (category, other)
+                for other, other_categories in categories.items()
+                if literal.startswith(other)
+                for category in other_categories
+            ]
+            for literal in categories
+        }
+        
+        self.max_literal_length = max((len(literal) for literal in categories), default=0)
+        
+        financial_pattern = '|'.join(f'(?:{pattern})' for pattern in self.financial_patterns) or '(?!)'
+        alternatives = [self._trie_pattern(categories)] if categories else []
+        alternatives.append(financial_pattern)
+        self.pattern = re.compile('|'.join(alternatives))
+        self.financial_pattern = re.compile(financial_pattern, re.IGNORECASE)
+        self._pattern_ignorecase = None
+        
+        # Replacements are spliced in without rescanning them, so they must be clean themselves
+        for original, replacement in self.rewrites.items():
+            if any(category in ('banned', 'rewrite') for category, _, _ in self.find_hits(replacement)):
+                raise ValueError(f'Rewrite for "{original}" produces a banned phrase: "{replacement}"')
+    
+    @staticmethod
+    def _trie_pattern(literals) -> str:
+        """Build a trie-shaped alternation; optional branches are greedy so the longest literal wins."""
+        trie: Dict = {}
+        for literal in literals:
+            node = trie
+            for char in literal:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def emit(node: Dict) -> str:
+            branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            return f'(?:{body})?' if '' in node else body
+        
+        return emit(trie)
+    
+    def find_hits(self, text: str) -> List[Tuple[str, str, int]]:
+        """
+        Scan text once.
+        
+        Returns:
+            List of (category, phrase, offset) in text order, where category is
+            banned, celebrity<N>, financial, urgency or rewrite. Celebrity names
+            only count on word boundaries.
+        """
+        text_lower = text.lower()
+        if len(text_lower) == len(text):
+            scanned, search = text_lower, self.pattern.search
+        else:
+            # Lower-casing changed the length (e.g. "İ"); scan the original so offsets stay valid
+            if self._pattern_ignorecase is None:
+                self._pattern_ignorecase = re.compile(self.pattern.pattern, re.IGNORECASE)
+            scanned, search = text, self._pattern_ignorecase.search
+        
+        hits = []
+        # Amounts do not overlap ("1.000 €" must not also yield "000 €"), but
+        # literals inside an amount still count ("$100% profit")
+        amount_end = 0
+        match = search(scanned)
+        while match:
+            matched = match.group().lower()
+            start = match.start()
+            credits = self.prefix_credit.get(matched)
+            if credits is not None:
+                for category, literal in credits:
+                    if category.startswith('celebrity') and not self._on_word_boundary(
+                        scanned, start, start + len(literal)
+                    ):
+                        continue
+                    hits.append((category, literal, start))
+            if start >= amount_end:
+                # The literal alternative wins the combined match, so look for an amount here too
+                amount = match if credits is None else self.financial_pattern.match(scanned, start)
+                if amount and self.financial_pattern.fullmatch(amount.group()):
+                    hits.append(('financial', text[start:amount.end()].strip(), start))
+                    amount_end = amount.end()
+            match = search(scanned, start + 1)
+        return hits
+    
+    def apply_rewrites(
+        self,
+        text: str,
+        hits: List[Tuple[str, str, int]]
+    ) -> Tuple[str, List[Tuple[str, str, int]]]:
+        """
+        Splice rewrite replacements into text using hits from find_hits.
+        
+        In each pass an earlier rule wins over a later one it overlaps, and a
+        rule's own matches are taken leftmost first without overlapping. A
+        replacement that forms another rewrite phrase with the text around it
+        ("kein risikofrei" -> "kein risikoarm", which contains "kein risiko")
+        is rewritten in a further pass, up to MAX_REWRITE_PASSES; anything still
+        banned after that is left in the returned hits.
+        
+        Returns:
+            (rewritten text, hits in the rewritten text)
+        """
+        for _ in range(MAX_REWRITE_PASSES):
+            if not any(category == 'rewrite' for category, _, _ in hits):
+                break
+            text, hits = self._rewrite_pass(text, hits)
+        return text, [hit for hit in hits if hit[0] != 'rewrite']
+    
+    def _rewrite_pass(
+        self,
+        text: str,
+        hits: List[Tuple[str, str, int]]
+    ) -> Tuple[str, List[Tuple[str, str, int]]]:
+        """
+        Apply the rewrite hits once.
+        
+        Hits lying entirely inside a replaced span are dropped, the rest are
+        returned with offsets shifted into the rewritten text. Only when a hit
+        straddles a replaced span - before or after splicing, e.g. "risk-free"
+        left over from "zero risk-free" - is the rewritten text scanned again.
+        
+        Returns:
+            (rewritten text, hits in the rewritten text, rewrite hits included)
+        """
+        candidates = sorted(
+            (self.rewrite_order[phrase], offset, phrase)
+            for category, phrase, offset in hits if category == 'rewrite'
+        )
+        spans = []  # (start, end, replacement), disjoint
+        for _, offset, phrase in candidates:
+            end = offset + len(phrase)
+            if any(offset < span_end and span_start < end for span_start, span_end, _ in spans):
+                continue
+            spans.append((offset, end, self.rewrites[phrase]))
+        
+        spans.sort()
+        
+        parts = []
+        position = 0
+        length = 0
+        new_spans = []  # Replacement spans in the rewritten text
+        for start, end, replacement in spans:
+            parts.append(text[position:start])
+            length += start - position
+            parts.append(replacement)
+            new_spans.append((length, length + len(replacement)))
+            length += len(replacement)
+            position = end
+        parts.append(text[position:])
+        rewritten = ''.join(parts)
+        
+        surviving = []
+        span_index = 0
+        shift = 0
+        for category, phrase, offset in hits:
+            while span_index < len(spans) and spans[span_index][1] <= offset:
+                start, end, replacement = spans[span_index]
+                shift += len(replacement) - (end - start)
+                span_index += 1
+            # Spans are sorted and disjoint: only the first one ending after the hit can overlap it
+            if span_index < len(spans) and spans[span_index][0] < offset + len(phrase):
+                start, end, _ = spans[span_index]
+                if start <= offset and offset + len(phrase) <= end:
+                    continue  # Replaced along with the span
+                return rewritten, self.find_hits(rewritten)
+            surviving.append((category, phrase, offset + shift))
+        
+        # A replacement can also complete a phrase with the text around it
+        margin = self.max_literal_length
+        for new_start, new_end in new_spans:
+            window_start = max(0, new_start - margin)
+            window = rewritten[window_start:new_end + margin]
+            for category, phrase, offset in self.find_hits(window):
+                start = window_start + offset
+                end = start + len(phrase)
+                if start < new_start < end or start < new_end < end:
+                    return rewritten, self.find_hits(rewritten)
+        
+        return rewritten, surviving
+    
+    @staticmethod
+    def _on_word_boundary(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else ' '
+        after = text[end] if end < len(text) else ' '
+        return not (before.isalnum() or before == '_') and not (after.isalnum() or after == '_')
+
+
+class ComplianceRuleStore:
+    """
+    Versioned compliance rules loaded from <rules_dir>/<language>.json.
+    
+    Each language file adds to the base (English) rules. Compiled rulesets are
+    cached by (level, language, version), where the version includes a digest of
+    the file contents, so an edit takes effect even if the file's "version" was
+    not bumped. Files are re-checked at most every compliance_rules_reload_seconds
+    and reloaded when their mtime or size change, so edits take effect without a
+    restart and lookups never compile in the request path after the first use of
+    a ruleset version.
+    """
+    
+    def __init__(self, rules_dir: Optional[str] = None, reload_seconds: Optional[float] = None):
+        self.rules_dir = Path(rules_dir or settings.compliance_rules_dir or DEFAULT_RULES_DIR)
+        self.reload_seconds = settings.compliance_rules_reload_seconds if reload_seconds is None else reload_seconds
+        self.files: Dict[str, Dict] = {}  # language -> {'stamp', 'digest', 'data'}
+        self.compiled: Dict[Tuple[str, str, str], CompiledRuleset] = {}
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+    
+    @staticmethod
+    def normalize_language(language: Optional[str]) -> str:
+        """"de-AT" / "DE" / None -> "de" / "de" / "en"."""
+        return (language or BASE_LANGUAGE).replace('_', '-').split('-')[0].lower()
+    
+    def get(self, level: str, language: Optional[str] = None) -> CompiledRuleset:
+        """Compiled ruleset for (level, language); unknown levels fall back to strict_facebook."""
+        self._refresh()
+        language = self.normalize_language(language)
+        with self.lock:
+            if language not in self.files:
+                language = BASE_LANGUAGE
+            levels = self.files[BASE_LANGUAGE]['data']['levels']
+            if level not in levels:
+                level = DEFAULT_LEVEL
+            version = self.version(language)
+            key = (level, language, version)
+            ruleset = self.compiled.get(key)
+            if ruleset is None:
+                ruleset = CompiledRuleset(self._merge(level, language), level, language, version)
+                self.compiled[key] = ruleset
+            return ruleset
+    
+    def levels(self) -> List[str]:
+        """Compliance levels defined by the base rules."""
+        self._refresh()
+        return list(self.files[BASE_LANGUAGE]['data']['levels'])
+    
+    def languages(self) -> List[str]:
+        """Languages that have a rules file."""
+        self._refresh()
+        return sorted(self.files)
+    
+    def version(self, language: str) -> str:
+        """
+        Combined version of the base and language files, each with a digest of
+        its contents, e.g. "en@2026.10.1:3f2a9c0d41b7+de@2026.10.1:8e01d2c4a9f3".
+        """
+        base = self._file_version(BASE_LANGUAGE)
+        if language == BASE_LANGUAGE or language not in self.files:
+            return base
+        return f"{base}+{self._file_version(language)}"
+    
+    def _file_version(self, language: str) -> str:
+        loaded = self.files[language]
+        return f"{language}@{loaded['data'].get('version', '0')}:{loaded['digest']}"
+    
+    def _merge(self, level: str, language: str) -> Dict:
+        """Base rules for the level plus the language file's additions."""
+        sources = [self.files[BASE_LANGUAGE]['data']]
+        if language != BASE_LANGUAGE:
+            sources.append(self.files[language]['data'])
+        
+        merged = {
+            'banned_phrases': [],
+            'celebrity_names': [],
+            'financial_patterns': [],
+            'urgency_words': [],
+            'rewrites': {},
+            'flag_financial_claims': False,
+            'urgency_threshold': None,
+        }
+        for data in sources:
+            level_rules = data.get('levels', {}).get(level, {})
+            merged['banned_phrases'] += [p for p in level_rules.get('banned_phrases', []) if p not in merged['banned_phrases']]
+            for flag in ('flag_financial_claims', 'urgency_threshold'):
+                if flag in level_rules:
+                    merged[flag] = level_rules[flag]
+            for index, names in enumerate(data.get('celebrity_names', [])):
+                if index < len(merged['celebrity_names']):
+                    merged['celebrity_names'][index] = merged['celebrity_names'][index] + names
+                else:
+                    merged['celebrity_names'].append(list(names))
+            merged['financial_patterns'] += data.get('financial_patterns', [])
+            merged['urgency_words'] += [w for w in data.get('urgency_words', []) if w not in merged['urgency_words']]
+            merged['rewrites'].update(data.get('rewrites', {}))
+        return merged
+    
+    def _refresh(self):
+        """Reload changed rule files (at most every reload_seconds)."""
+        now = time.monotonic()
+        if self.files and now - self.checked_at < self.reload_seconds:
+            return
+        
+        with self.lock:
+            if self.files and now - self.checked_at < self.reload_seconds:
+                return
+            self.checked_at = now
+            
+            seen = set()
+            loaded = []
+            for entry in os.scandir(self.rules_dir):
+                if not entry.name.endswith('.json'):
+                    continue
+                language = entry.name[:-len('.json')].lower()
+                seen.add(language)
+                stat = entry.stat()
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                cached = self.files.get(language)
+                if cached and cached['stamp'] == stamp:
+                    continue
+                try:
+                    with open(entry.path, 'rb') as f:
+                        raw = f.read()
+                    data = json.loads(raw.decode('utf-8'))
+                except (OSError, ValueError) as e:
+                    # Keep serving the previous version of a broken file
+                    print(f"Compliance rules {entry.name} not loaded: {e}")
+                    continue
+                digest = hashlib.sha256(raw).hexdigest()[:12]
+                if cached and cached['digest'] == digest:
+                    # Touched but unchanged
+                    cached['stamp'] = stamp
+                    continue
+                if cached and cached['data'].get('version') == data.get('version'):
+                    print(f"Compliance rules {entry.name} changed without a version bump; "
+                          f"reloading as {language}@{data.get('version', '0')}:{digest}")
+                self.files[language] = {'stamp': stamp, 'digest': digest, 'data': data}
+                loaded.append(f"{language}@{data.get('version', '0')}:{digest}")
+            
+            if loaded:
+                print(f"Loaded compliance rules: {', '.join(sorted(loaded))}")
+            
+            for language in set(self.files) - seen:
+                del self.files[language]
+            
+            if BASE_LANGUAGE not in self.files:
+                raise RuntimeError(f"Base compliance rules {BASE_LANGUAGE}.json not found in {self.rules_dir}")
+            
+            # Drop rulesets compiled from versions that are no longer current
+            current = {language: self.version(language) for language in self.files}
+            self.compiled = {
+                key: ruleset for key, ruleset in self.compiled.items()
+                if current.get(key[1]) == key[2]
+            }
+
+
+_rule_store: Optional[ComplianceRuleStore] = None
+_rule_store_lock = threading.Lock()
+
+
+def get_rule_store() -> ComplianceRuleStore:
+    """Return the process-wide compliance rule store."""
+    global _rule_store
+    if _rule_store is None:
+        with _rule_store_lock:
+            if _rule_store is None:
+                _rule_store = ComplianceRuleStore()
+    return _rule_store
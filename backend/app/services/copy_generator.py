@@ -1,9 +1,10 @@
-from typing import Dict, Optional
-from openai import OpenAI
+from typing import Callable, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.config import settings
 from app.services.rag_retriever import RAGRetriever
 from app.services.compliance_checker import ComplianceChecker
+from app.services.llm_client import get_llm_client
+from app.services.llm_usage import extract_usage, usage_context
 
 
 class CopyGenerator:
@@ -303,10 +304,150 @@ class CopyGenerator:
         }
     }
     
+    # System instruction shared by every generation call
+    SYSTEM_PROMPT = "You are an expert prelanding copywriter specializing in high-conversion sales copy."
+    
+    # Precompiled static prompt blocks shared across instances, keyed by
+    # (block kind, geo, language, persona) or (block kind, scenario, part, version)
+    STATIC_BLOCK_CACHE_SIZE = 512
+    _static_block_cache: Dict[Tuple, str] = {}
+    
     def __init__(self, db: Session):
         self.db = db
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.llm = get_llm_client()
         self.rag_retriever = RAGRetriever(db)
+        self.usage = {'total_tokens': 0, 'cached_tokens': 0}
+    
+    @classmethod
+    def _get_static_block(cls, key: Tuple, builder: Callable[[], str]) -> str:
+        """Return a precompiled prompt block, building and caching it on first use."""
+        block = cls._static_block_cache.get(key)
+        if block is None:
+            if len(cls._static_block_cache) >= cls.STATIC_BLOCK_CACHE_SIZE:
+                cls._static_block_cache.clear()
+            block = builder()
+            cls._static_block_cache[key] = block
+        return block
+    
+    @classmethod
+    def _resolve_persona(cls, persona: str) -> str:
+        """Map unknown personas to the default one so cache keys stay stable."""
+        return persona if persona in cls.PERSONAS else 'aggressive_investigator'
+    
+    def _complete(
+        self,
+        static_prefix: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        task: str,
+        compliance_checker: Optional[ComplianceChecker] = None
+    ) -> str:
+        """
+        Run a chat completion with the static prefix as the system message.
+        
+        The prefix is byte-identical across requests sharing geo/language/persona,
+        so provider-side prompt caching can reuse it. Usage is recorded per call
+        in the usage table and accumulated in self.usage.
+        
+        With a compliance_checker the completion is streamed and scanned as it
+        arrives (see _complete_streaming).
+        """
+        if compliance_checker and settings.compliance_stream_abort:
+            return self._complete_streaming(
+                static_prefix, prompt, temperature, max_tokens, task, compliance_checker
+            )
+        
+        response = self.llm.chat(
+            service="copy_generator",
+            task=task,
+            messages=[
+                {"role": "system", "content": static_prefix},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        
+        self._add_usage(extract_usage(response.usage))
+        return response.choices[0].message.content
+    
+    def _complete_streaming(
+        self,
+        static_prefix: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        task: str,
+        compliance_checker: ComplianceChecker
+    ) -> str:
+        """
+        Stream a completion and cancel it as soon as a critical banned phrase appears.
+        
+        The aborted draft is discarded and the request is retried with a corrective
+        instruction naming the phrases to avoid. The last allowed attempt runs to
+        completion; whatever slips through is handled by rewrite_claims.
+        """
+        avoided_phrases = []
+        attempts = settings.compliance_max_regenerations + 1
+        
+        for attempt in range(attempts):
+            final_attempt = attempt == attempts - 1
+            attempt_prompt = prompt + self._build_corrective_instruction(avoided_phrases)
+            scanner = compliance_checker.stream_scanner()
+            violation = None
+            parts = []
+            
+            stream = self.llm.chat_stream(
+                service="copy_generator",
+                task=task,
+                messages=[
+                    {"role": "system", "content": static_prefix},
+                    {"role": "user", "content": attempt_prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            try:
+                for text in stream:
+                    parts.append(text)
+                    if not final_attempt:
+                        violation = scanner.feed(text)
+                        if violation:
+                            break
+            finally:
+                stream.close()
+                self._add_usage(stream.usage)
+            
+            if violation is None:
+                return ''.join(parts)
+            
+            print(
+                f"Compliance abort ({task}): \"{violation['phrase']}\" after "
+                f"{scanner.chars_seen} chars, regenerating ({attempt + 1}/{attempts - 1})"
+            )
+            avoided_phrases.append(violation['phrase'])
+        
+        return ''.join(parts)
+    
+    @staticmethod
+    def _build_corrective_instruction(avoided_phrases) -> str:
+        """Instruction appended to the prompt after a draft was aborted for banned phrases."""
+        if not avoided_phrases:
+            return ""
+        phrases = ", ".join(f'"{phrase}"' for phrase in avoided_phrases)
+        return f"""
+
+ВАЖНО: предыдущий вариант был отклонён модерацией, потому что содержал запрещённые фразы: {phrases}.
+Не используй эти фразы (и их переводы), а также любые обещания гарантированного дохода или отсутствия риска.
+"""
+    
+    def _add_usage(self, usage: Optional[Dict[str, int]]):
+        """Accumulate one call's usage into self.usage."""
+        if not usage:
+            return
+        self.usage['total_tokens'] += usage['total_tokens']
+        self.usage['cached_tokens'] += usage['cached_tokens']
     
     def generate_prelanding_copy(
         self,
@@ -375,78 +516,66 @@ class CopyGenerator:
                 ]
             }
         
-        # 2. Get persona details
-        persona_config = self.PERSONAS.get(persona, self.PERSONAS['aggressive_investigator'])
+        # 2. Get static GEO/persona prefix (precompiled and cached)
+        static_prefix = self._build_copy_prefix(geo=geo, language=language, persona=persona)
         
-        # 3. Construct prompt
+        # 3. Construct per-request prompt
         prompt = self._build_generation_prompt(
             offer=offer,
-            geo=geo,
             language=language,
             vertical=vertical,
-            persona_config=persona_config,
             context=context,
             target_length=target_length,
             format_type=format_type
         )
         
-        # 4. Generate with LLM
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert prelanding copywriter specializing in high-conversion sales copy."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+        # 4. Generate with LLM, scanning the stream for the target language's banned phrases
+        compliance_checker = ComplianceChecker(compliance_level=compliance_level, language=language)
+        self.usage = {'total_tokens': 0, 'cached_tokens': 0}
+        generated_text = self._complete(
+            static_prefix,
+            prompt,
             temperature=settings.default_temperature,
-            max_tokens=settings.max_tokens
+            max_tokens=settings.max_tokens,
+            task="copy",
+            compliance_checker=compliance_checker
         )
         
-        generated_text = response.choices[0].message.content
-        
-        # 5. Compliance check and rewrite if needed
-        compliance_checker = ComplianceChecker(compliance_level=compliance_level)
-        compliance_result = compliance_checker.check_compliance(generated_text)
-        
-        # Rewrite if failed
-        if not compliance_result['passed']:
-            generated_text = compliance_checker.rewrite_claims(generated_text)
-            # Check again
-            compliance_result = compliance_checker.check_compliance(generated_text)
+        # 5. Compliance check, rewriting claims if it failed
+        generated_text, compliance_result = compliance_checker.check_and_rewrite(generated_text)
         
         # 6. Return result
         return {
             'generated_text': generated_text,
             'compliance': compliance_result,
+            'compliance_fields': compliance_checker.stored_fields(generated_text, compliance_result),
             'source_prelanding_ids': [w['id'] for w in context.get('winners', [])],
             'persona': persona,
-            'tokens_used': response.usage.total_tokens
+            'tokens_used': self.usage['total_tokens'],
+            'cached_tokens': self.usage['cached_tokens']
         }
     
-    def _build_generation_prompt(
-        self,
-        offer: str,
-        geo: str,
-        language: str,
-        vertical: str,
-        persona_config: Dict,
-        context: Dict,
-        target_length: int,
-        format_type: str
-    ) -> str:
-        """Build the generation prompt with RAG context and cultural adaptation."""
+    @classmethod
+    def _build_copy_prefix(cls, geo: str, language: str, persona: str) -> str:
+        """Return the cached static prefix (cultural context, persona, rules) for full-copy generation."""
+        geo = geo.upper()
+        persona = cls._resolve_persona(persona)
+        return cls._get_static_block(
+            ('copy', geo, language, persona),
+            lambda: cls._render_copy_prefix(geo, language, persona)
+        )
+    
+    @classmethod
+    def _render_copy_prefix(cls, geo: str, language: str, persona: str) -> str:
+        """Render the static GEO/persona block. Contains no per-request data."""
         
         # Get cultural context for target GEO
-        cultural_ctx = self.GEO_CULTURAL_CONTEXT.get(geo.upper(), self.DEFAULT_CULTURAL_CONTEXT)
+        cultural_ctx = cls.GEO_CULTURAL_CONTEXT.get(geo, cls.DEFAULT_CULTURAL_CONTEXT)
+        persona_config = cls.PERSONAS[persona]
         
         # Special handling for Quebec French (CA + fr)
         quebec_context = ""
-        if geo.upper() == 'CA' and language.lower() in ['fr', 'french']:
+        if geo == 'CA' and language.lower() in ['fr', 'french']:
             quebec_data = cultural_ctx.get('quebec_french', {})
             if quebec_data:
                 quebec_notes = '\n'.join([f"  - {note}" for note in quebec_data.get('notes', [])])
@@ -472,23 +601,11 @@ AVOID for Québécois audience: {quebec_avoid}
         trust_signals = ', '.join(cultural_ctx.get('trust_signals', [])) or 'N/A'
         avoid_list = ', '.join(cultural_ctx.get('avoid', [])) or 'N/A'
         
-        # Extract examples from context
-        example_headings = '\n'.join([f"- {h}" for h in context['example_headings'][:3]])
-        example_dialogues = '\n'.join([
-            f"  {d.get('speaker', 'Speaker')}: {d['text']}"
-            for d in context['example_dialogues'][:4]
-        ])
-        example_quotes = '\n'.join([f"- \"{q}\"" for q in context['example_quotes'][:2]])
-        
-        prompt = f"""Generate a high-converting prelanding copy for the following:
+        return f"""{cls.SYSTEM_PROMPT}
 
-**Offer:** {offer}
 **Target Country:** {cultural_ctx['country_name']} ({geo})
 **Target Language:** {language}
 **Local Currency:** {cultural_ctx['currency']}
-**Target Vertical:** {vertical}
-**Format:** {format_type}
-**Target Length:** {target_length} words
 
 **🎯 LANGUAGE-GEO RELATIONSHIP (CRITICAL):**
 Language takes priority over GEO. If GEO is {geo} but language is {language}:
@@ -517,26 +634,15 @@ Example: UK + Russian = content for Russian-speaking community in UK, in Russian
 - Hook Strategy: {persona_config['hook']}
 - Style: {persona_config['style']}
 
-**Reference Examples from Top Performers:**
-
-Example Headlines:
-{example_headings}
-
-Example Dialogue (Interview Format):
-{example_dialogues}
-
-Example Quotes/Testimonials:
-{example_quotes}
-
 **⚠️ ABSOLUTE LANGUAGE REQUIREMENT ⚠️**
 The ENTIRE output MUST be written in **{language}** language.
-Even if the examples above are in English, you MUST write your output in {language}.
+Even if the reference examples in the request are in English, you MUST write your output in {language}.
 This is non-negotiable. Do NOT output English unless {language} is 'en'.
 
 **Requirements:**
 1. Write 100% in {language} language - this is CRITICAL, no exceptions
 2. Use {cultural_ctx['currency']} for any monetary references - NEVER use wrong currency!
-3. Use {format_type} format with clear speaker labels if interview
+3. Use the requested format with clear speaker labels if interview
 4. Include:
    - Compelling headline that resonates with modern {geo} audience
    - Interview-style dialogue between Host and Expert
@@ -545,13 +651,52 @@ This is non-negotiable. Do NOT output English unless {language} is 'en'.
    - Call to action embedded naturally
    - Placeholders for images: [Image: описание изображения на РУССКОМ языке. Описание должно быть очень подробным, включая композицию, настроение, детали, эмоции персонажей (если есть), чтобы дизайнер мог сразу создать изображение]
 5. Apply {persona_config['tone']} tone, adapted for contemporary {geo} communication style
-6. Length: approximately {target_length} words
+6. Length: approximately the target length given in the request
 7. DO NOT use obviously banned phrases like "guaranteed profit" or "risk-free"
 8. Use persuasion patterns from the examples but with 100% unique wording IN {language}
 9. DO NOT use emojis in the text regardless of the persona
 10. Content must feel authentic to modern {cultural_ctx['country_name']} life, not stereotypical
+"""
+    
+    @classmethod
+    def _build_generation_prompt(
+        cls,
+        offer: str,
+        language: str,
+        vertical: str,
+        context: Dict,
+        target_length: int,
+        format_type: str
+    ) -> str:
+        """Build the per-request part of the prompt (offer, RAG examples). Goes after the static prefix."""
+        
+        # Extract examples from context
+        example_headings = '\n'.join([f"- {h}" for h in context['example_headings'][:3]])
+        example_dialogues = '\n'.join([
+            f"  {d.get('speaker', 'Speaker')}: {d['text']}"
+            for d in context['example_dialogues'][:4]
+        ])
+        example_quotes = '\n'.join([f"- \"{q}\"" for q in context['example_quotes'][:2]])
+        
+        prompt = f"""Generate a high-converting prelanding copy for the following:
+
+**Offer:** {offer}
+**Target Vertical:** {vertical}
+**Format:** {format_type}
+**Target Length:** {target_length} words
+
+**Reference Examples from Top Performers:**
+
+Example Headlines:
+{example_headings}
+
+Example Dialogue (Interview Format):
+{example_dialogues}
+
+Example Quotes/Testimonials:
+{example_quotes}
 
-Generate the complete prelanding copy now (remember: in {language} language!):
+Generate the complete prelanding copy now in {format_type} format, approximately {target_length} words (remember: in {language} language!):
 """
         
         return prompt
@@ -594,41 +739,50 @@ Generate the complete prelanding copy now (remember: in {language} language!):
         if not scenario:
             raise ValueError(f"Scenario with id {scenario_id} not found")
 
-        # Get RAG context if enabled
-        rag_context = ""
-        source_ids = []
-        if use_rag:
-            try:
-                context = self.rag_retriever.build_context_for_generation(
-                    offer=offer,
-                    geo=geo,
-                    vertical=vertical,
-                    persona=persona
-                )
-                source_ids = [w['id'] for w in context.get('winners', [])]
-                # Format RAG context as text
-                rag_context = self._format_rag_context(context)
-            except Exception as e:
-                print(f"RAG retrieval failed: {e}")
-                rag_context = ""
-
-        # Get persona config
-        persona_config = self.PERSONAS.get(persona, self.PERSONAS['aggressive_investigator'])
-
-        # Generate three parts sequentially
-        beginning = await self._generate_beginning(
-            scenario, geo, language, vertical, offer, persona_config, rag_context
-        )
-
-        middle = await self._generate_middle(
-            scenario, geo, language, vertical, offer, persona_config,
-            beginning, rag_context
-        )
+        # Calls below are attributed to this generation in the usage table
+        gen_id = str(uuid.uuid4())
 
-        end = await self._generate_end(
-            scenario, geo, language, vertical, offer, persona_config,
-            beginning, middle, rag_context
-        )
+        with usage_context(gen_id=gen_id, geo=geo, persona=persona):
+            # Get RAG context if enabled
+            rag_context = ""
+            source_ids = []
+            if use_rag:
+                try:
+                    context = self.rag_retriever.build_context_for_generation(
+                        offer=offer,
+                        geo=geo,
+                        vertical=vertical,
+                        persona=persona
+                    )
+                    source_ids = [w['id'] for w in context.get('winners', [])]
+                    # Format RAG context as text
+                    rag_context = self._format_rag_context(context)
+                except Exception as e:
+                    print(f"RAG retrieval failed: {e}")
+                    rag_context = ""
+
+            # Static system prefix is shared by all three calls
+            self.usage = {'total_tokens': 0, 'cached_tokens': 0}
+            compliance_checker = ComplianceChecker(compliance_level=compliance_level, language=language)
+            base_context = self._build_base_context(geo, language, persona)
+
+            # Generate three parts sequentially
+            beginning = await self._generate_beginning(
+                scenario, base_context, language, vertical, offer, rag_context,
+                compliance_checker=compliance_checker
+            )
+
+            middle = await self._generate_middle(
+                scenario, base_context, language, vertical, offer,
+                beginning, rag_context,
+                compliance_checker=compliance_checker
+            )
+
+            end = await self._generate_end(
+                scenario, base_context, language, vertical, offer,
+                beginning, middle, rag_context,
+                compliance_checker=compliance_checker
+            )
 
         # Concatenate parts
         full_text = f"{beginning}\n\n{middle}\n\n{end}"
@@ -639,12 +793,9 @@ Generate the complete prelanding copy now (remember: in {language} language!):
         generated_html = formatter.format_as_html(full_text)
 
         # Compliance check
-        from app.services.compliance_checker import ComplianceChecker
-        compliance_checker = ComplianceChecker(compliance_level=compliance_level)
         compliance_result = compliance_checker.check_compliance(full_text)
 
         # Save to database
-        gen_id = str(uuid.uuid4())
         gen_prelanding = GeneratedPrelanding(
             gen_id=gen_id,
             scenario_id=scenario_id,
@@ -660,8 +811,7 @@ Generate the complete prelanding copy now (remember: in {language} language!):
             generated_text=full_text,
             generated_html=generated_html,
             source_prelanding_ids=source_ids,
-            compliance_passed=1 if compliance_result['passed'] else 0,
-            compliance_issues=compliance_result.get('issues', [])
+            **compliance_checker.stored_fields(full_text, compliance_result)
         )
 
         self.db.add(gen_prelanding)
@@ -682,7 +832,8 @@ Generate the complete prelanding copy now (remember: in {language} language!):
             },
             'compliance_passed': compliance_result['passed'],
             'compliance_issues': compliance_result.get('issues', []),
-            'tokens_used': 0  # TODO: track tokens
+            'tokens_used': self.usage['total_tokens'],
+            'cached_tokens': self.usage['cached_tokens']
         }
 
     def _format_rag_context(self, context: Dict) -> str:
@@ -705,28 +856,49 @@ Generate the complete prelanding copy now (remember: in {language} language!):
 
         return '\n'.join(sections)
 
+    @classmethod
+    def _build_scenario_block(cls, scenario, part: str) -> str:
+        """Return the cached task block for one scenario part (beginning, middle or end)."""
+        version = scenario.updated_at.isoformat() if scenario.updated_at else ''
+        return cls._get_static_block(
+            ('scenario', scenario.id, part, version),
+            lambda: cls._render_scenario_block(scenario, part)
+        )
+
+    @classmethod
+    def _render_scenario_block(cls, scenario, part: str) -> str:
+        """Render the static scenario task block. Contains no per-request data."""
+        if part == 'beginning':
+            return f"""ЗАДАЧА: Напиши захватывающее начало прелендинга (700-1000 символов).
+
+{scenario.beginning_template}
+
+Это начало должно МАКСИМАЛЬНО ЗАЦЕПИТЬ читателя, чтобы он прочитал весь прелендинг.
+"""
+        if part == 'middle':
+            return f"""ЗАДАЧА: Напиши основную часть прелендинга по следующему сценарию:
+
+{scenario.middle_template}
+"""
+        return f"""ЗАДАЧА: Напиши завершающую часть прелендинга:
+
+{scenario.end_template}
+"""
+
     async def _generate_beginning(
         self,
         scenario,
-        geo: str,
+        base_context: str,
         language: str,
         vertical: str,
         offer: str,
-        persona_config: Dict,
-        rag_context: str
+        rag_context: str,
+        compliance_checker: Optional[ComplianceChecker] = None
     ) -> str:
         """Generate beginning (700-1000 characters)."""
 
-        base_context = self._build_base_context(geo, language, vertical, offer, persona_config)
-
-        prompt = f"""
-{base_context}
-
-ЗАДАЧА: Напиши захватывающее начало прелендинга (700-1000 символов).
-
-{scenario.beginning_template}
-
-Это начало должно МАКСИМАЛЬНО ЗАЦЕПИТЬ читателя, чтобы он прочитал весь прелендинг.
+        prompt = f"""{self._build_scenario_block(scenario, 'beginning')}
+{self._build_request_params(offer, vertical)}
 
 {rag_context}
 
@@ -734,51 +906,32 @@ Generate the complete prelanding copy now (remember: in {language} language!):
 Длина: 700-1000 символов (не слов, именно символов).
 """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert prelanding copywriter specializing in high-conversion sales copy."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.8,
-            max_tokens=2000
-        )
-
-        return response.choices[0].message.content.strip()
+        return self._complete(
+            base_context, prompt, temperature=0.8, max_tokens=2000, task="beginning",
+            compliance_checker=compliance_checker
+        ).strip()
 
     async def _generate_middle(
         self,
         scenario,
-        geo: str,
+        base_context: str,
         language: str,
         vertical: str,
         offer: str,
-        persona_config: Dict,
         beginning: str,
-        rag_context: str
+        rag_context: str,
+        compliance_checker: Optional[ComplianceChecker] = None
     ) -> str:
         """Generate middle (main scenario)."""
 
-        base_context = self._build_base_context(geo, language, vertical, offer, persona_config)
-
-        prompt = f"""
-{base_context}
+        prompt = f"""{self._build_scenario_block(scenario, 'middle')}
+{self._build_request_params(offer, vertical)}
 
 КОНТЕКСТ: Ты уже написал начало прелендинга:
 ---
 {beginning}
 ---
 
-ЗАДАЧА: Теперь напиши основную часть прелендинга по следующему сценарию:
-
-{scenario.middle_template}
-
 {rag_context}
 
 ВАЖНО:
@@ -788,46 +941,31 @@ Generate the complete prelanding copy now (remember: in {language} language!):
 - Сохрани тон и стиль из начала
 """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert prelanding copywriter specializing in high-conversion sales copy."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.8,
-            max_tokens=8000
-        )
-
-        return response.choices[0].message.content.strip()
+        return self._complete(
+            base_context, prompt, temperature=0.8, max_tokens=8000, task="middle",
+            compliance_checker=compliance_checker
+        ).strip()
 
     async def _generate_end(
         self,
         scenario,
-        geo: str,
+        base_context: str,
         language: str,
         vertical: str,
         offer: str,
-        persona_config: Dict,
         beginning: str,
         middle: str,
-        rag_context: str
+        rag_context: str,
+        compliance_checker: Optional[ComplianceChecker] = None
     ) -> str:
         """Generate end (proofs + reviews)."""
 
-        base_context = self._build_base_context(geo, language, vertical, offer, persona_config)
-
         # Take snippets for context
         beginning_snippet = beginning[:300] if len(beginning) > 300 else beginning
         middle_snippet = middle[:500] if len(middle) > 500 else middle
 
-        prompt = f"""
-{base_context}
+        prompt = f"""{self._build_scenario_block(scenario, 'end')}
+{self._build_request_params(offer, vertical)}
 
 КОНТЕКСТ: Ты написал прелендинг с таким началом:
 ---
@@ -839,10 +977,6 @@ Generate the complete prelanding copy now (remember: in {language} language!):
 {middle_snippet}...
 ---
 
-ЗАДАЧА: Напиши завершающую часть прелендинга:
-
-{scenario.end_template}
-
 {rag_context}
 
 ВАЖНО:
@@ -853,42 +987,34 @@ Generate the complete prelanding copy now (remember: in {language} language!):
 - Описания скриншотов должны быть детальными
 """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert prelanding copywriter specializing in high-conversion sales copy."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.8,
-            max_tokens=5000
+        return self._complete(
+            base_context, prompt, temperature=0.8, max_tokens=5000, task="end",
+            compliance_checker=compliance_checker
+        ).strip()
+
+    @classmethod
+    def _build_base_context(cls, geo: str, language: str, persona: str) -> str:
+        """Return the cached static system prefix shared by all scenario generation prompts."""
+        geo = geo.upper()
+        persona = cls._resolve_persona(persona)
+        return cls._get_static_block(
+            ('base', geo, language, persona),
+            lambda: cls._render_base_context(geo, language, persona)
         )
 
-        return response.choices[0].message.content.strip()
+    @classmethod
+    def _render_base_context(cls, geo: str, language: str, persona: str) -> str:
+        """Render the static base context. Contains no per-request data."""
 
-    def _build_base_context(
-        self,
-        geo: str,
-        language: str,
-        vertical: str,
-        offer: str,
-        persona_config: Dict
-    ) -> str:
-        """Build base context for all generation prompts."""
+        cultural_ctx = cls.GEO_CULTURAL_CONTEXT.get(geo, cls.DEFAULT_CULTURAL_CONTEXT)
+        persona_config = cls.PERSONAS[persona]
 
-        cultural_ctx = self.GEO_CULTURAL_CONTEXT.get(geo.upper(), self.DEFAULT_CULTURAL_CONTEXT)
+        return f"""{cls.SYSTEM_PROMPT}
 
-        return f"""**Параметры генерации:**
-- Offer: {offer}
+**Параметры генерации:**
 - Target Country: {cultural_ctx['country_name']} ({geo})
 - Target Language: {language}
 - Local Currency: {cultural_ctx['currency']}
-- Vertical: {vertical}
 - Persona Tone: {persona_config['tone']}
 - Persona Hook: {persona_config['hook']}
 
@@ -897,4 +1023,9 @@ The ENTIRE output MUST be written in **{language}** language.
 Use {cultural_ctx['currency']} for all monetary references.
 """
 
-
+    @staticmethod
+    def _build_request_params(offer: str, vertical: str) -> str:
+        """Per-request parameters appended after the static blocks."""
+        return f"""**Параметры запроса:**
+- Offer: {offer}
+- Vertical: {vertical}"""
@@ -1,9 +1,13 @@
 from typing import List, Dict, Optional
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
-from openai import OpenAI
 import uuid
+import openai
 from app.config import settings
+from app.services.llm_client import get_llm_client
+
+
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1f4e-9a57-4d8e-8f3a-2b0d5c7e4a91")
 
 
 class EmbeddingService:
@@ -15,11 +19,8 @@ class EmbeddingService:
             port=settings.qdrant_port
         )
         
-        # OpenAI Client with optional Base URL
-        self.openai_client = OpenAI(
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_base_url if hasattr(settings, 'openai_base_url') else None
-        )
+        # Shared, rate-limited OpenAI client
+        self.llm = get_llm_client()
         
         self.collection_name = settings.qdrant_collection_name
         self.embedding_dimension = 1536  # text-embedding-3-small dimension
@@ -52,7 +53,8 @@ class EmbeddingService:
             Embedding vector or None if generation failed
         """
         try:
-            response = self.openai_client.embeddings.create(
+            response = self.llm.embed(
+                service="embeddings",
                 model="text-embedding-3-small",
                 input=text
             )
@@ -61,6 +63,115 @@ class EmbeddingService:
             print(f"OpenAI Embedding Error (skipping): {e}")
             return None
     
+    @staticmethod
+    def point_id(prelanding_id: str, element_type: str, order_index: int, text: str) -> str:
+        """
+        Deterministic Qdrant point id of an element.
+        
+        Storing the same element again overwrites its point instead of adding a
+        duplicate, so interrupted or concurrent re-indexing is idempotent.
+        """
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{prelanding_id}\n{element_type}\n{order_index}\n{text}"))
+    
+    def create_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Create embeddings for many texts, as few API calls as the provider allows.
+        
+        Requests are capped at settings.embedding_batch_size inputs and about
+        settings.embedding_batch_max_tokens tokens.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One vector per text, in order; None for texts that could not be
+            embedded (a rejected input fails alone, an unavailable provider
+            fails its whole batch)
+        """
+        vectors: List[Optional[List[float]]] = []
+        for batch in self._batches(texts):
+            vectors.extend(self._embed_batch(batch))
+        return vectors
+    
+    def _embed_batch(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed one batch. When the provider rejects the request (e.g. an input over
+        the model's token limit), the batch is split in half and retried so only
+        the offending texts end up None.
+        """
+        try:
+            response = self.llm.embed(
+                service="embeddings",
+                model="text-embedding-3-small",
+                input=batch
+            )
+        except (openai.BadRequestError, openai.UnprocessableEntityError) as e:
+            if len(batch) == 1:
+                print(f"OpenAI Embedding Error (skipping 1 text): {e}")
+                return [None]
+            middle = len(batch) // 2
+            return self._embed_batch(batch[:middle]) + self._embed_batch(batch[middle:])
+        except Exception as e:
+            print(f"OpenAI Embedding Error (skipping {len(batch)} texts): {e}")
+            return [None] * len(batch)
+        by_index = {item.index: item.embedding for item in response.data}
+        return [by_index.get(i) for i in range(len(batch))]
+    
+    @staticmethod
+    def _batches(texts: List[str]):
+        """Split texts into request-sized batches (estimated at 4 chars/token)."""
+        max_items = max(1, settings.embedding_batch_size)
+        max_chars = settings.embedding_batch_max_tokens * 4
+        batch, chars = [], 0
+        for text in texts:
+            if batch and (len(batch) >= max_items or chars + len(text) > max_chars):
+                yield batch
+                batch, chars = [], 0
+            batch.append(text)
+            chars += len(text)
+        if batch:
+            yield batch
+    
+    def store_embeddings(self, points: List[Dict]) -> List[Optional[str]]:
+        """
+        Store precomputed element vectors with one Qdrant upsert.
+        
+        Args:
+            points: Dicts with vector, text, prelanding_id, element_type,
+                performance_score and optional metadata (same payload as
+                store_element_embedding)
+            
+        Returns:
+            Embedding ID per point, in order; None where the vector is missing
+            or the upsert failed
+        """
+        ids: List[Optional[str]] = [None] * len(points)
+        structs = []
+        for i, point in enumerate(points):
+            if not point.get('vector'):
+                continue
+            ids[i] = point.get('embedding_id') or str(uuid.uuid4())
+            structs.append(PointStruct(
+                id=ids[i],
+                vector=point['vector'],
+                payload={
+                    'prelanding_id': point['prelanding_id'],
+                    'element_type': point['element_type'],
+                    'text': point['text'],
+                    'performance_score': point.get('performance_score', 0.0),
+                    **(point.get('metadata') or {})
+                }
+            ))
+        
+        if not structs:
+            return ids
+        try:
+            self.client.upsert(collection_name=self.collection_name, points=structs)
+            return ids
+        except Exception as e:
+            print(f"Qdrant Storage Error: {e}")
+            return [None] * len(points)
+    
     def store_element_embedding(
         self,
         text: str,
@@ -214,3 +325,22 @@ class EmbeddingService:
                 collection_name=self.collection_name,
                 points_selector=point_ids
             )
+    
+    def update_prelanding_payload(self, prelanding_id: str, payload: Dict):
+        """
+        Patch payload fields (e.g. performance_score) of all of a prelanding's points.
+        
+        One filtered set_payload call; vectors are left untouched.
+        """
+        self.client.set_payload(
+            collection_name=self.collection_name,
+            payload=payload,
+            points=Filter(
+                must=[
+                    FieldCondition(
+                        key='prelanding_id',
+                        match=MatchValue(value=prelanding_id)
+                    )
+                ]
+            )
+        )
@@ -1,191 +1,371 @@
-from typing import List, Dict, Optional, Tuple
+import hashlib
+import heapq
+import itertools
+import os
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
 import re
+from app.config import settings
 from app.models import ElementType
 
 
+# Keywords scored by HTMLParser.detect_vertical
+VERTICAL_KEYWORDS = {
+    'crypto': [
+        'bitcoin', 'btc', 'crypto', 'cryptocurrency', 'ethereum', 'eth',
+        'blockchain', 'mining', 'wallet', 'token', 'coin', 'altcoin',
+        'биткоин', 'криптовалюта', 'блокчейн', 'токен', 'майнинг',
+        'krypto', 'kryptowährung', 'münze'
+    ],
+    'forex': [
+        'forex', 'currency', 'trading', 'trader', 'pip', 'spread',
+        'eur/usd', 'gbp', 'leverage', 'metatrader', 'mt4', 'mt5',
+        'форекс', 'валюта', 'трейдинг', 'трейдер',
+        'währung', 'devisen', 'handel'
+    ],
+    'finance': [
+        'bank', 'credit', 'loan', 'mortgage', 'insurance', 'savings',
+        'interest rate', 'deposit', 'withdraw', 'account',
+        'банк', 'кредит', 'займ', 'ипотека', 'страхование', 'вклад',
+        'kredit', 'darlehen', 'versicherung', 'zinsen'
+    ],
+    'investment': [
+        'invest', 'stock', 'shares', 'dividend', 'portfolio', 'fund',
+        'return', 'profit', 'passive income', 'roi', 'asset',
+        'инвестиц', 'акции', 'дивиденд', 'портфель', 'доход', 'прибыль',
+        'investition', 'aktien', 'rendite', 'gewinn', 'anlage'
+    ]
+}
+
+
+# parse_html result keys, also the categories yielded by iter_elements
+ELEMENT_CATEGORIES = ('headings', 'paragraphs', 'quotes', 'ctas', 'dialogue')
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bump when extraction output changes, so content hashes of already indexed pages stop matching
+EXTRACTION_VERSION = 1
+
+
+def score_verticals(text_lower: str) -> Dict[str, int]:
+    """Keyword occurrences per vertical (str.count per keyword measured faster than one regex alternation)."""
+    return {
+        vertical: sum(text_lower.count(keyword) for keyword in keywords)
+        for vertical, keywords in VERTICAL_KEYWORDS.items()
+    }
+
+
+class SoupBackend:
+    """BeautifulSoup over lxml: the reference backend."""
+    
+    name = 'bs4'
+    
+    def parse(self, html_content: str) -> BeautifulSoup:
+        return BeautifulSoup(html_content, 'lxml')
+    
+    def iter_tags(self, document: BeautifulSoup, names) -> Iterator[Tuple[str, Any]]:
+        """(tag name, tag) for every tag in `names`, in document order."""
+        return ((tag.name, tag) for tag in document.find_all(names))
+    
+    def text(self, tag) -> str:
+        return tag.get_text(strip=True)
+    
+    def attr(self, tag, name: str) -> str:
+        return tag.get(name, '')
+    
+    def find_parent(self, tag, name: str):
+        return tag.find_parent(name)
+    
+    def document_text(self, document: BeautifulSoup) -> str:
+        return document.get_text()
+
+
+class LxmlBackend:
+    """
+    Raw lxml.html tree with XPath text extraction - no BeautifulSoup object model.
+    
+    Text follows BeautifulSoup semantics: script/style/template contents and
+    comments are excluded, each text node is stripped and the pieces are joined.
+    """
+    
+    name = 'lxml'
+    
+    _TEXT_NODES = etree.XPath('descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+    _PARSER = lxml.html.HTMLParser(encoding='utf-8')
+    
+    def parse(self, html_content: str):
+        # Bytes + explicit encoding: lxml rejects str input with an XML encoding declaration
+        try:
+            return lxml.html.document_fromstring(html_content.encode('utf-8'), parser=self._PARSER)
+        except etree.ParserError:
+            # Empty document
+            return lxml.html.document_fromstring(b'<html></html>', parser=self._PARSER)
+    
+    def iter_tags(self, document, names) -> Iterator[Tuple[str, Any]]:
+        """(tag name, element) for every element in `names`, in document order."""
+        return ((element.tag, element) for element in document.iter(*names))
+    
+    def text(self, element) -> str:
+        return ''.join(node.strip() for node in self._TEXT_NODES(element))
+    
+    def attr(self, element, name: str) -> str:
+        return element.get(name, '')
+    
+    def find_parent(self, element, name: str):
+        return next(element.iterancestors(name), None)
+    
+    def document_text(self, document) -> str:
+        return ''.join(self._TEXT_NODES(document))
+
+
+HTML_PARSER_BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend
+}
+
+
 class HTMLParser:
-    """Service for parsing prelanding HTML and extracting structural elements."""
+    """
+    Service for parsing prelanding HTML and extracting structural elements.
+    
+    The parsing backend is pluggable (settings.html_parser_backend): "bs4"
+    (BeautifulSoup over lxml) or "lxml" (raw lxml.html, faster for bulk imports).
+    Both produce the same element dicts.
+    """
+    
+    # Tags visited by the single extraction traversal
+    HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+    QUOTE_TAGS = frozenset(['blockquote', 'q'])
+    CTA_TAGS = frozenset(['a', 'button'])
+    QA_TAGS = frozenset(['strong', 'b'])
+    EXTRACT_TAGS = HEADING_TAGS | QUOTE_TAGS | CTA_TAGS | QA_TAGS | {'p'}
+    
+    # Common CTA indicators
+    CTA_KEYWORDS = [
+        'click', 'register', 'sign up', 'join', 'start', 'try', 'get',
+        'learn more', 'download', 'buy', 'order', 'subscribe',
+        'кликни', 'зарегистрируйся', 'начни', 'получи', 'узнай',
+        'jetzt', 'hier', 'mehr erfahren'
+    ]
+    
+    # Text in quotes: "..." or «...»
+    QUOTED_TEXT_PATTERN = re.compile(r'[""«]([^""»]+)[""»]')
     
-    def __init__(self):
-        self.soup: Optional[BeautifulSoup] = None
+    # Speaker name followed by colon, e.g. "Host: Question here?" or "Expert: Answer here."
+    SPEAKER_PATTERN = re.compile(r'^([A-ZА-ЯЁA-ZÄÖÜß][a-zа-яёa-zäöüß\s]+):\s*(.+)', re.MULTILINE)
+    
+    # Q&A markers, e.g. <p><strong>Q:</strong> Question</p>
+    QA_MARKERS = frozenset(['Q:', 'A:', 'Question:', 'Answer:'])
+    
+    def __init__(self, backend: Optional[str] = None):
+        """
+        Args:
+            backend: "bs4" or "lxml" (default: settings.html_parser_backend)
+        """
+        backend = backend or settings.html_parser_backend
+        if backend not in HTML_PARSER_BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend: {backend} (available: {', '.join(HTML_PARSER_BACKENDS)})")
+        self.backend = HTML_PARSER_BACKENDS[backend]()
+        self.document = None  # Last parsed document (backend-specific tree)
+        self.vertical_scores: Optional[Dict[str, int]] = None  # Set by streaming parses
+    
+    @staticmethod
+    def content_hash(html_content: str) -> str:
+        """
+        sha256 of the HTML (BOM and surrounding whitespace removed) and EXTRACTION_VERSION.
+        
+        Equal hashes mean parsing would extract the same elements, so a
+        re-uploaded page can reuse what was stored for the first upload.
+        """
+        normalized = html_content.lstrip('\ufeff').strip()
+        digest = hashlib.sha256(f"{EXTRACTION_VERSION}\n".encode('utf-8'))
+        digest.update(normalized.encode('utf-8'))
+        return digest.hexdigest()
     
     def parse_html(self, html_content: str) -> Dict:
         """
         Parse HTML content and extract all structural elements.
         
+        Documents of settings.html_stream_threshold_kb or more are extracted in
+        streaming mode (see iter_elements) instead of building a full tree.
+        
         Args:
             html_content: Raw HTML string
             
         Returns:
-            Dict with extracted elements categorized by type
+            Dict with extracted elements categorized by type. Every element has a
+            global `order` - its position in the document across all categories.
         """
-        self.soup = BeautifulSoup(html_content, 'lxml')
-        
-        elements = {
-            'headings': self._extract_headings(),
-            'paragraphs': self._extract_paragraphs(),
-            'quotes': self._extract_quotes(),
-            'ctas': self._extract_ctas(),
-            'dialogue': self._extract_dialogue_interview()
-        }
-        
-        return elements
-    
-    def _extract_headings(self) -> List[Dict]:
-        """Extract all headings (h1-h6)."""
-        headings = []
-        order = 0
-        
-        for tag_name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            for tag in self.soup.find_all(tag_name):
-                text = tag.get_text(strip=True)
-                if text:
-                    element_type = ElementType.HEADING if tag_name in ['h1', 'h2'] else ElementType.SUBHEADING
-                    headings.append({
-                        'type': element_type,
-                        'text': text,
-                        'tag': tag_name,
-                        'order': order
-                    })
-                    order += 1
-        
-        return headings
-    
-    def _extract_paragraphs(self) -> List[Dict]:
-        """Extract paragraph content."""
-        paragraphs = []
-        order = 0
-        
-        for p_tag in self.soup.find_all('p'):
-            text = p_tag.get_text(strip=True)
-            if text and len(text) > 20:  # Filter out empty or very short paragraphs
-                paragraphs.append({
-                    'type': ElementType.PARAGRAPH,
-                    'text': text,
-                    'order': order
-                })
-                order += 1
-        
-        return paragraphs
+        if len(html_content) >= settings.html_stream_threshold_kb * 1024:
+            chunks = (
+                html_content[i:i + STREAM_CHUNK_SIZE]
+                for i in range(0, len(html_content), STREAM_CHUNK_SIZE)
+            )
+            return self._collect(self.iter_elements(chunks))
+        
+        self.vertical_scores = None
+        self.document = self.backend.parse(html_content)
+        return self._extract_elements()
     
-    def _extract_quotes(self) -> List[Dict]:
-        """Extract quotes and blockquotes."""
-        quotes = []
-        order = 0
-        
-        # Find blockquote tags
-        for quote_tag in self.soup.find_all(['blockquote', 'q']):
-            text = quote_tag.get_text(strip=True)
-            if text:
-                quotes.append({
-                    'type': ElementType.QUOTE,
-                    'text': text,
-                    'order': order
-                })
-                order += 1
-        
-        # Find quoted text patterns (text in quotes)
-        for p_tag in self.soup.find_all('p'):
-            text = p_tag.get_text(strip=True)
-            # Match text in quotes: "..." or «...»
-            quote_matches = re.findall(r'[""«]([^""»]+)[""»]', text)
-            for match in quote_matches:
-                if len(match) > 30:  # Only substantial quotes
-                    quotes.append({
-                        'type': ElementType.QUOTE,
-                        'text': match,
-                        'order': order
-                    })
-                    order += 1
+    def parse_html_file(self, path: str) -> Dict:
+        """
+        Like parse_html, but large files are streamed from disk and never loaded whole.
         
-        return quotes
+        Args:
+            path: Path to an HTML file (decoded as UTF-8)
+        """
+        if os.path.getsize(path) < settings.html_stream_threshold_kb * 1024:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                return self.parse_html(f.read())
+        
+        def chunks():
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                while True:
+                    chunk = f.read(STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        
+        return self._collect(self.iter_elements(chunks()))
     
-    def _extract_ctas(self) -> List[Dict]:
-        """Extract Call-to-Action elements."""
-        ctas = []
-        order = 0
+    def iter_elements(self, chunks: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """
+        Streaming extraction with bounded memory.
         
-        # Common CTA indicators
-        cta_keywords = [
-            'click', 'register', 'sign up', 'join', 'start', 'try', 'get',
-            'learn more', 'download', 'buy', 'order', 'subscribe',
-            'кликни', 'зарегистрируйся', 'начни', 'получи', 'узнай',
-            'jetzt', 'hier', 'mehr erfahren'
-        ]
+        script/style/svg subtrees and inline data: URIs are dropped from the raw
+        text before parsing, the rest goes through an lxml pull parser and
+        finished subtrees are freed as soon as nothing open still needs them.
+        Elements are yielded as soon as their position is final, with the same
+        fields and global `order` as parse_html. Vertical keyword scores are
+        counted on the fly, so detect_vertical() works afterwards.
         
-        # Find buttons and links
-        for tag in self.soup.find_all(['a', 'button']):
-            text = tag.get_text(strip=True).lower()
+        Args:
+            chunks: HTML text in pieces (e.g. file reads)
             
-            # Check if contains CTA keywords
-            if any(keyword in text for keyword in cta_keywords):
-                ctas.append({
-                    'type': ElementType.CTA,
-                    'text': tag.get_text(strip=True),
-                    'href': tag.get('href', ''),
-                    'order': order
-                })
-                order += 1
-        
-        return ctas
+        Yields:
+            (category, element) - category is a parse_html key (headings, paragraphs, ...)
+        """
+        self.document = None
+        extractor = StreamingExtractor(self)
+        yield from extractor.run(chunks)
+        self.vertical_scores = extractor.vertical_scores
     
-    def _extract_dialogue_interview(self) -> List[Dict]:
+    @staticmethod
+    def _collect(items: Iterable[Tuple[str, Dict]]) -> Dict[str, List[Dict]]:
+        elements = {category: [] for category in ELEMENT_CATEGORIES}
+        for category, element in items:
+            elements[category].append(element)
+        return elements
+    
+    def _extract_elements(self) -> Dict[str, List[Dict]]:
         """
-        Extract interview-style dialogue with speaker identification.
-        This is a smart extraction for interview format.
+        Extract headings, paragraphs, quotes, CTAs and dialogue in one document-order traversal.
+        
+        Elements found inside the same tag are ordered: paragraph, quoted text, dialogue.
         """
-        dialogue_blocks = []
+        elements = {category: [] for category in ELEMENT_CATEGORIES}
         order = 0
-        
-        # Pattern 1: Look for speaker names followed by colon
-        # Example: "Host: Question here?" or "Expert: Answer here."
-        speaker_pattern = re.compile(r'^([A-ZА-ЯЁA-ZÄÖÜß][a-zа-яёa-zäöüß\s]+):\s*(.+)', re.MULTILINE)
-        
-        for p_tag in self.soup.find_all('p'):
-            text = p_tag.get_text(strip=True)
-            match = speaker_pattern.match(text)
+        # Last <p> and its text, for Q&A markers inside it (paragraphs do not nest).
+        # Holding the element also keeps lxml's proxy alive, so identity checks work.
+        last_paragraph, last_paragraph_text = None, ''
+        
+        backend = self.backend
+        for name, tag in backend.iter_tags(self.document, self.EXTRACT_TAGS):
+            if name == 'p':
+                text = backend.text(tag)
+                last_paragraph, last_paragraph_text = tag, text
+                items = self._paragraph_items(text)
+            elif name in self.QA_TAGS:
+                marker = backend.text(tag)
+                if marker not in self.QA_MARKERS:
+                    continue
+                paragraph = backend.find_parent(tag, 'p')
+                if paragraph is None:
+                    continue
+                full_text = last_paragraph_text if paragraph is last_paragraph else backend.text(paragraph)
+                items = [self._qa_item(marker, full_text)]
+            elif name in self.HEADING_TAGS:
+                items = self._heading_items(name, backend.text(tag))
+            elif name in self.QUOTE_TAGS:
+                items = self._quote_items(backend.text(tag))
+            else:  # a / button
+                items = self._cta_items(backend.text(tag), tag, backend)
             
-            if match:
-                speaker = match.group(1).strip()
-                dialogue_text = match.group(2).strip()
-                
-                # Determine sentiment based on keywords
-                sentiment = self._detect_sentiment(dialogue_text)
-                
-                dialogue_blocks.append({
-                    'type': ElementType.DIALOGUE,
-                    'text': dialogue_text,
-                    'speaker': speaker,
-                    'sentiment': sentiment,
-                    'order': order
-                })
+            for category, element in items:
+                element['order'] = order
+                elements[category].append(element)
                 order += 1
         
-        # Pattern 2: Look for Q&A format
-        # Example: <p><strong>Q:</strong> Question</p>
-        for p_tag in self.soup.find_all('p'):
-            strong_tags = p_tag.find_all(['strong', 'b'])
-            for strong in strong_tags:
-                strong_text = strong.get_text(strip=True)
-                if strong_text in ['Q:', 'A:', 'Question:', 'Answer:']:
-                    full_text = p_tag.get_text(strip=True)
-                    # Remove the Q:/A: prefix
-                    dialogue_text = full_text.replace(strong_text, '').strip()
-                    
-                    speaker = "Host" if strong_text.startswith('Q') else "Expert"
-                    sentiment = self._detect_sentiment(dialogue_text)
-                    
-                    dialogue_blocks.append({
-                        'type': ElementType.DIALOGUE,
-                        'text': dialogue_text,
-                        'speaker': speaker,
-                        'sentiment': sentiment,
-                        'order': order
-                    })
-                    order += 1
-        
-        return dialogue_blocks
+        return elements
+    
+    def _paragraph_items(self, text: str) -> List[Tuple[str, Dict]]:
+        """Paragraph, quoted text and speaker dialogue found in one <p> text."""
+        items = []
+        if len(text) > 20:  # Filter out empty or very short paragraphs
+            items.append(('paragraphs', {
+                'type': ElementType.PARAGRAPH,
+                'text': text
+            }))
+        
+        for match in self.QUOTED_TEXT_PATTERN.findall(text):
+            if len(match) > 30:  # Only substantial quotes
+                items.append(('quotes', {
+                    'type': ElementType.QUOTE,
+                    'text': match
+                }))
+        
+        match = self.SPEAKER_PATTERN.match(text)
+        if match:
+            dialogue_text = match.group(2).strip()
+            items.append(('dialogue', {
+                'type': ElementType.DIALOGUE,
+                'text': dialogue_text,
+                'speaker': match.group(1).strip(),
+                'sentiment': self._detect_sentiment(dialogue_text)
+            }))
+        return items
+    
+    def _qa_item(self, marker: str, paragraph_text: str) -> Tuple[str, Dict]:
+        """Dialogue from a <p> starting with a Q:/A: marker in <strong>/<b>."""
+        # Remove the Q:/A: prefix
+        dialogue_text = paragraph_text.replace(marker, '').strip()
+        return ('dialogue', {
+            'type': ElementType.DIALOGUE,
+            'text': dialogue_text,
+            'speaker': "Host" if marker.startswith('Q') else "Expert",
+            'sentiment': self._detect_sentiment(dialogue_text)
+        })
+    
+    @staticmethod
+    def _heading_items(name: str, text: str) -> List[Tuple[str, Dict]]:
+        if not text:
+            return []
+        return [('headings', {
+            'type': ElementType.HEADING if name in ('h1', 'h2') else ElementType.SUBHEADING,
+            'text': text,
+            'tag': name
+        })]
+    
+    @staticmethod
+    def _quote_items(text: str) -> List[Tuple[str, Dict]]:
+        if not text:
+            return []
+        return [('quotes', {
+            'type': ElementType.QUOTE,
+            'text': text
+        })]
+    
+    def _cta_items(self, text: str, tag, backend) -> List[Tuple[str, Dict]]:
+        text_lower = text.lower()
+        if not any(keyword in text_lower for keyword in self.CTA_KEYWORDS):
+            return []
+        return [('ctas', {
+            'type': ElementType.CTA,
+            'text': text,
+            'href': backend.attr(tag, 'href')
+        })]
     
     def _detect_sentiment(self, text: str) -> str:
         """
@@ -229,8 +409,7 @@ class HTMLParser:
             "dialogue_blocks": [...]
         }
         """
-        self.soup = BeautifulSoup(html_content, 'lxml')
-        dialogue = self._extract_dialogue_interview()
+        dialogue = self.parse_html(html_content)['dialogue']
         
         # Extract unique participants
         participants = list(set([d['speaker'] for d in dialogue if 'speaker' in d]))
@@ -248,67 +427,210 @@ class HTMLParser:
             ]
         }
     
-    def detect_vertical(self, html_content: str) -> str:
+    def detect_vertical(self, html_content: Optional[str] = None) -> str:
         """
         Auto-detect vertical/category from HTML content based on keywords.
         
+        Args:
+            html_content: Raw HTML string. If omitted, the document (or the keyword
+                counts of a streaming parse) from the last parse_html call is
+                reused, so uploads parse the HTML only once.
+        
         Returns one of: crypto, forex, finance, investment, general
         """
-        soup = BeautifulSoup(html_content, 'lxml')
-        text = soup.get_text().lower()
-        
-        # Keyword scoring for each vertical
-        verticals = {
-            'crypto': {
-                'keywords': [
-                    'bitcoin', 'btc', 'crypto', 'cryptocurrency', 'ethereum', 'eth',
-                    'blockchain', 'mining', 'wallet', 'token', 'coin', 'altcoin',
-                    'биткоин', 'криптовалюта', 'блокчейн', 'токен', 'майнинг',
-                    'krypto', 'kryptowährung', 'münze'
-                ],
-                'score': 0
-            },
-            'forex': {
-                'keywords': [
-                    'forex', 'currency', 'trading', 'trader', 'pip', 'spread',
-                    'eur/usd', 'gbp', 'leverage', 'metatrader', 'mt4', 'mt5',
-                    'форекс', 'валюта', 'трейдинг', 'трейдер',
-                    'währung', 'devisen', 'handel'
-                ],
-                'score': 0
-            },
-            'finance': {
-                'keywords': [
-                    'bank', 'credit', 'loan', 'mortgage', 'insurance', 'savings',
-                    'interest rate', 'deposit', 'withdraw', 'account',
-                    'банк', 'кредит', 'займ', 'ипотека', 'страхование', 'вклад',
-                    'kredit', 'darlehen', 'versicherung', 'zinsen'
-                ],
-                'score': 0
-            },
-            'investment': {
-                'keywords': [
-                    'invest', 'stock', 'shares', 'dividend', 'portfolio', 'fund',
-                    'return', 'profit', 'passive income', 'roi', 'asset',
-                    'инвестиц', 'акции', 'дивиденд', 'портфель', 'доход', 'прибыль',
-                    'investition', 'aktien', 'rendite', 'gewinn', 'anlage'
-                ],
-                'score': 0
-            }
-        }
-        
-        # Count keyword occurrences
-        for vertical, data in verticals.items():
-            for keyword in data['keywords']:
-                count = text.count(keyword)
-                data['score'] += count
+        if html_content is None and self.vertical_scores is not None:
+            # Counted during a streaming parse
+            scores = self.vertical_scores
+        else:
+            document = self.backend.parse(html_content) if html_content is not None else self.document
+            if document is None:
+                raise ValueError("detect_vertical needs html_content or a prior parse_html call")
+            scores = score_verticals(self.backend.document_text(document).lower())
         
         # Find vertical with highest score
-        best_vertical = max(verticals.items(), key=lambda x: x[1]['score'])
+        best_vertical = max(scores, key=scores.get)
         
         # Return best match or 'general' if no keywords found
-        if best_vertical[1]['score'] > 0:
-            return best_vertical[0]
+        if scores[best_vertical] > 0:
+            return best_vertical
         
         return 'general'
 
+
+class StreamingExtractor:
+    """
+    Bounded-memory extraction for very large pages (see HTMLParser.iter_elements).
+    
+    Memory is bounded by the chunk size, the deepest chain of open elements
+    and the largest single extracted element, not by the document size.
+    """
+    
+    # Subtrees dropped before parsing; inline data: URIs are emptied
+    SKIP_PATTERN = re.compile(
+        r'<(script|style|svg)\b|(=\s*|url\(\s*)(["\']?)data:',
+        re.IGNORECASE
+    )
+    # Raw text held back between chunks so split tokens ("<scr" + "ipt") are still found
+    HOLDBACK = 32
+    
+    def __init__(self, parser: 'HTMLParser'):
+        self.parser = parser
+        self.backend = LxmlBackend()
+        self.vertical_scores = {vertical: 0 for vertical in VERTICAL_KEYWORDS}
+        self._text_parts: List[str] = []
+        self._text_size = 0
+        self._keyword_overlap = max(len(k) for keywords in VERTICAL_KEYWORDS.values() for k in keywords) - 1
+        self._starts: Dict[Any, int] = {}  # open extract tags -> start index
+        self._open: List[int] = []  # start indexes of open extract tags (outermost first)
+        self._qa_markers: Dict[Any, List[Tuple[int, str]]] = {}  # open <p> -> Q&A markers inside it
+        self._pending: List[Tuple[Tuple[int, int], str, Dict]] = []  # heap of ((start, n), category, element)
+        self._order = 0
+        self._next_start = 0
+    
+    def run(self, chunks: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        pull_parser = etree.HTMLPullParser(events=('start', 'end'), encoding='utf-8')
+        for chunk in self._filter(chunks):
+            if chunk:
+                pull_parser.feed(chunk.encode('utf-8'))
+                yield from self._handle_events(pull_parser.read_events())
+        try:
+            pull_parser.close()
+        except etree.XMLSyntaxError:
+            pass  # Empty document
+        yield from self._handle_events(pull_parser.read_events())
+        yield from self._flush(final=True)
+        self._count_text('', final=True)
+    
+    def _filter(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Drop script/style/svg subtrees and data: URI payloads from the raw text."""
+        buffer = ''
+        closing = None  # (pattern, consume terminator) while inside a dropped span
+        for chunk in itertools.chain(chunks, [None]):
+            final = chunk is None
+            buffer += chunk or ''
+            out = []
+            position = 0
+            while True:
+                if closing is not None:
+                    pattern, consume = closing
+                    match = pattern.search(buffer, position)
+                    if match is None:
+                        position = len(buffer) if final else max(position, len(buffer) - self.HOLDBACK)
+                        break
+                    position = match.end() if consume else match.start()
+                    closing = None
+                    continue
+                
+                match = self.SKIP_PATTERN.search(buffer, position)
+                if match is None:
+                    safe = len(buffer) if final else max(position, len(buffer) - self.HOLDBACK)
+                    out.append(buffer[position:safe])
+                    position = safe
+                    break
+                if match.group(1):
+                    out.append(buffer[position:match.start()])
+                    closing = (re.compile(rf'</{match.group(1)}\s*>', re.IGNORECASE), True)
+                else:
+                    # Keep `="` / `url(` so the attribute stays well-formed, drop the payload
+                    out.append(buffer[position:match.end() - len('data:')])
+                    quote = match.group(3)
+                    if quote:
+                        terminator = re.escape(quote)
+                    elif match.group(2).lower().startswith('url'):
+                        terminator = r'\)'
+                    else:
+                        terminator = r'[\s>]'
+                    closing = (re.compile(terminator), False)
+                position = match.end()
+            buffer = buffer[position:]
+            yield ''.join(out)
+    
+    def _handle_events(self, events) -> Iterator[Tuple[str, Dict]]:
+        parser = self.parser
+        for event, element in events:
+            name = element.tag
+            if event == 'start':
+                if name in parser.EXTRACT_TAGS:
+                    self._starts[element] = self._next_start
+                    self._open.append(self._next_start)
+                    self._next_start += 1
+                continue
+            
+            if name in parser.EXTRACT_TAGS:
+                start = self._starts.pop(element, None)
+                if start is not None:
+                    self._open.pop()
+                    self._end_extract_tag(name, element, start)
+                    yield from self._flush()
+            
+            if not self._open:
+                # Nothing open needs this subtree any more: count its text and free it
+                self._release(element)
+    
+    def _end_extract_tag(self, name: str, element, start: int):
+        parser = self.parser
+        backend = self.backend
+        if name == 'p':
+            text = backend.text(element)
+            items = [(start, item) for item in parser._paragraph_items(text)]
+            items += [
+                (marker_start, parser._qa_item(marker, text))
+                for marker_start, marker in self._qa_markers.pop(element, [])
+            ]
+        elif name in parser.QA_TAGS:
+            marker = backend.text(element)
+            paragraph = backend.find_parent(element, 'p')
+            if marker in parser.QA_MARKERS and paragraph is not None:
+                # Resolved when the paragraph ends and its full text is known
+                self._qa_markers.setdefault(paragraph, []).append((start, marker))
+            return
+        elif name in parser.HEADING_TAGS:
+            items = [(start, item) for item in parser._heading_items(name, backend.text(element))]
+        elif name in parser.QUOTE_TAGS:
+            items = [(start, item) for item in parser._quote_items(backend.text(element))]
+        else:  # a / button
+            items = [(start, item) for item in parser._cta_items(backend.text(element), element, backend)]
+        
+        for n, (item_start, (category, item)) in enumerate(items):
+            heapq.heappush(self._pending, ((item_start, n), category, item))
+    
+    def _flush(self, final: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """Yield pending elements that no still-open tag can precede, in document order."""
+        while self._pending and (final or not self._open or self._pending[0][0][0] < self._open[0]):
+            _, category, element = heapq.heappop(self._pending)
+            element['order'] = self._order
+            self._order += 1
+            yield category, element
+    
+    def _release(self, element):
+        """Count and free a finished subtree; drop earlier siblings (already released)."""
+        self._count_text(self.backend.document_text(element))
+        element.clear(keep_tail=True)
+        parent = element.getparent()
+        if parent is None:
+            return
+        previous = element.getprevious()
+        while previous is not None:
+            self._count_text(previous.tail or '')
+            del parent[0]
+            previous = element.getprevious()
+    
+    def _count_text(self, text: str, final: bool = False):
+        """Accumulate text and score vertical keywords in large batches."""
+        if text:
+            self._text_parts.append(text)
+            self._text_size += len(text)
+        if not final and self._text_size < STREAM_CHUNK_SIZE:
+            return
+        
+        batch = ''.join(self._text_parts).lower()
+        for vertical, score in score_verticals(batch).items():
+            self.vertical_scores[vertical] += score
+        # Keep the tail for the next batch so keywords spanning the boundary are found,
+        # minus what it already contributed
+        tail = '' if final else batch[-self._keyword_overlap:]
+        for vertical, score in score_verticals(tail).items():
+            self.vertical_scores[vertical] -= score
+        self._text_parts = [tail] if tail else []
+        self._text_size = len(tail)
+
@@ -0,0 +1,136 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.idempotency import IdempotencyRecord
+
+
+class IdempotencyConflictError(ValueError):
+    """Raised when an idempotency key is reused with a different request body."""
+
+
+class IdempotencyInProgressError(RuntimeError):
+    """Raised when a request with the same key is still being processed."""
+
+
+class IdempotencyStore:
+    """Service for deduplicating retried requests and replaying their stored results."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def hash_request(endpoint: str, request: BaseModel) -> str:
+        """Deterministic sha256 of the endpoint and canonical JSON request body."""
+        canonical = json.dumps(
+            request.model_dump(mode="json"),
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(f"{endpoint}\n{canonical}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def resolve_key(idempotency_key: Optional[str], request_hash: str) -> Optional[str]:
+        """
+        Pick the key to deduplicate on.
+
+        An explicit Idempotency-Key header always wins. Without one, the request hash
+        is used only when idempotency_hash_requests is enabled.
+        """
+        if idempotency_key:
+            return idempotency_key.strip()[:255]
+        if settings.idempotency_hash_requests:
+            return f"hash:{request_hash}"
+        return None
+
+    def begin(self, endpoint: str, key: str, request_hash: str) -> Optional[Dict]:
+        """
+        Claim a key before doing the work.
+
+        Returns:
+            Stored response body if the request was already completed, otherwise None
+            (the caller now owns the key and must call complete() or release()).
+
+        Raises:
+            IdempotencyConflictError: key was used with a different request body
+            IdempotencyInProgressError: the same request is still running
+        """
+        now = datetime.utcnow()
+        self._purge_expired(now)
+
+        record = self._get(endpoint, key)
+        if record:
+            if record.request_hash != request_hash:
+                raise IdempotencyConflictError(
+                    "Idempotency-Key was already used with a different request body"
+                )
+            if record.status == "completed":
+                return record.response_body
+
+            lock_timeout = timedelta(seconds=settings.idempotency_lock_timeout_seconds)
+            if record.created_at and now - record.created_at < lock_timeout:
+                raise IdempotencyInProgressError("A request with this Idempotency-Key is in progress")
+
+            # Abandoned in-flight request (worker died) - take it over
+            record.created_at = now
+            record.expires_at = now + timedelta(seconds=settings.idempotency_ttl_seconds)
+            self.db.commit()
+            return None
+
+        self.db.add(IdempotencyRecord(
+            endpoint=endpoint,
+            key=key,
+            request_hash=request_hash,
+            status="in_progress",
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.idempotency_ttl_seconds)
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request claimed the key first
+            self.db.rollback()
+            raise IdempotencyInProgressError("A request with this Idempotency-Key is in progress")
+
+        return None
+
+    def complete(self, endpoint: str, key: str, response_body: Dict, gen_id: Optional[str] = None):
+        """Store the final response so retries within the retention window replay it."""
+        record = self._get(endpoint, key)
+        if not record:
+            return
+
+        now = datetime.utcnow()
+        record.status = "completed"
+        record.gen_id = gen_id
+        record.response_body = response_body
+        record.expires_at = now + timedelta(seconds=settings.idempotency_ttl_seconds)
+        self.db.commit()
+
+    def release(self, endpoint: str, key: str):
+        """Drop an in-progress claim after a failure so the client can retry."""
+        self.db.rollback()
+        self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.endpoint == endpoint,
+            IdempotencyRecord.key == key,
+            IdempotencyRecord.status == "in_progress"
+        ).delete(synchronize_session=False)
+        self.db.commit()
+
+    def _get(self, endpoint: str, key: str) -> Optional[IdempotencyRecord]:
+        return self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.endpoint == endpoint,
+            IdempotencyRecord.key == key
+        ).first()
+
+    def _purge_expired(self, now: datetime):
+        """Delete records past their retention window."""
+        self.db.query(IdempotencyRecord).filter(
+            IdempotencyRecord.expires_at < now
+        ).delete(synchronize_session=False)
+        self.db.commit()
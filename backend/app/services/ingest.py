@@ -0,0 +1,622 @@
+import asyncio
+import contextvars
+import copy
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func, insert, select, update
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Prelanding, ExtractedElement, ElementType, ScreenshotAnalysis
+from app.services.embeddings import EmbeddingService
+from app.services.html_parser import HTMLParser
+from app.services.screenshot_cache import ScreenshotCache, dhash
+from app.services.upload_archive import IMAGE_EXTENSIONS
+from app.services.vision_analyzer import VisionAnalyzer
+
+
+# Pipeline stages, in order, and the Prelanding.ingest_status shown while each runs.
+# Elements are stored (embedding_status 'pending') before they are embedded, so an
+# interrupted ingest leaves a checkpoint that "reindex missing" can finish.
+STAGES = ('parse', 'store', 'embed', 'vision')
+STAGE_STATUS = {'parse': 'parsing', 'store': 'storing', 'embed': 'embedding', 'vision': 'analyzing'}
+FINISHED = ('completed', 'failed')
+# Prelanding.ingest_status values of an ingest that has not finished
+ACTIVE_STATUSES = ('queued', *STAGE_STATUS.values())
+MAX_FINISHED_JOBS = 1000  # Older finished job records are dropped from the registry
+
+
+class IngestInProgressError(RuntimeError):
+    """Raised when an ingest is retried while a job for the prelanding is still running."""
+
+
+class ElementEmbedder:
+    """
+    Embed stored elements that have no vector yet, in batches.
+
+    An element is missing when its embedding_id is NULL (image descriptions are
+    never embedded). Each batch is one embeddings call, one Qdrant upsert and one
+    bulk UPDATE committed on its own, so progress survives interruption. Point ids
+    are derived from the element (EmbeddingService.point_id), which makes re-runs,
+    including concurrent ones, overwrite the same points instead of adding new ones.
+    """
+
+    def __init__(self, embedding_service: Optional[EmbeddingService]):
+        self.embedding_service = embedding_service
+
+    @staticmethod
+    def _missing(prelanding_id: Optional[str]):
+        conditions = [
+            ExtractedElement.embedding_id.is_(None),
+            ExtractedElement.element_type != ElementType.IMAGE_DESC
+        ]
+        if prelanding_id:
+            conditions.append(ExtractedElement.prelanding_id == prelanding_id)
+        return conditions
+
+    def count_missing(self, db, prelanding_id: Optional[str] = None) -> int:
+        return db.scalar(select(func.count(ExtractedElement.id)).where(*self._missing(prelanding_id)))
+
+    def iter_missing(self, db, prelanding_id: Optional[str] = None, batch_size: Optional[int] = None):
+        """
+        Yield batches of missing elements with their prelanding's payload fields.
+
+        Keyset-paginated by id, so rows that fail again are not revisited in the
+        same run and no cursor stays open while batches are written.
+        """
+        batch_size = batch_size or max(1, settings.embedding_batch_size)
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(
+                    ExtractedElement.id,
+                    ExtractedElement.prelanding_id,
+                    ExtractedElement.element_type,
+                    ExtractedElement.order_index,
+                    ExtractedElement.text_content,
+                    ExtractedElement.speaker,
+                    ExtractedElement.sentiment,
+                    Prelanding.geo,
+                    Prelanding.vertical,
+                    Prelanding.lead_rate
+                )
+                .join(Prelanding, Prelanding.id == ExtractedElement.prelanding_id)
+                .where(ExtractedElement.id > last_id, *self._missing(prelanding_id))
+                .order_by(ExtractedElement.id)
+                .limit(batch_size)
+            ).all()
+            # End the read transaction before the batch's network calls
+            db.commit()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+    def embed_batch(self, db, rows: List) -> int:
+        """
+        Embed, upsert and mark one batch of rows from iter_missing.
+
+        Returns:
+            Number of elements that now have a vector
+        """
+        if self.embedding_service:
+            vectors = self.embedding_service.create_embeddings([row.text_content for row in rows])
+            element_types = [str(ElementType(row.element_type)) for row in rows]
+            embedding_ids = self.embedding_service.store_embeddings([
+                {
+                    'embedding_id': EmbeddingService.point_id(
+                        row.prelanding_id, element_type, row.order_index, row.text_content
+                    ),
+                    'vector': vector,
+                    'text': row.text_content,
+                    'prelanding_id': row.prelanding_id,
+                    'element_type': element_type,
+                    'performance_score': row.lead_rate or 0.0,
+                    'metadata': {
+                        'geo': row.geo,
+                        'vertical': row.vertical,
+                        'speaker': row.speaker,
+                        'sentiment': row.sentiment
+                    }
+                }
+                for row, element_type, vector in zip(rows, element_types, vectors)
+            ])
+        else:
+            embedding_ids = [None] * len(rows)
+
+        embedded = [
+            {'id': row.id, 'embedding_id': embedding_id, 'embedding_status': 'embedded'}
+            for row, embedding_id in zip(rows, embedding_ids) if embedding_id
+        ]
+        failed = [row.id for row, embedding_id in zip(rows, embedding_ids) if not embedding_id]
+        if embedded:
+            # Bulk UPDATE by primary key (executemany)
+            db.execute(update(ExtractedElement), embedded)
+        if failed:
+            # Never downgrade a row a concurrent run has embedded meanwhile
+            db.execute(
+                update(ExtractedElement)
+                .where(ExtractedElement.id.in_(failed), ExtractedElement.embedding_id.is_(None))
+                .values(embedding_status='pending' if self.embedding_service is None else 'failed')
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        return len(embedded)
+
+    def run(self, db, prelanding_id: Optional[str], report: Callable) -> Dict:
+        """Embed every missing element (of one prelanding, or all), reporting 'embed' progress."""
+        total = self.count_missing(db, prelanding_id)
+        report('embed', status='running', done=0, total=total)
+        done = embedded = 0
+        for rows in self.iter_missing(db, prelanding_id):
+            embedded += self.embed_batch(db, rows)
+            done += len(rows)
+            report('embed', done=done)
+        report('embed', status='completed' if self.embedding_service else 'failed')
+        return {'missing': total, 'embedded': embedded, 'failed': total - embedded}
+
+
+class IngestPipeline:
+    """
+    Index one uploaded prelanding: parse -> store -> embed -> vision.
+
+    The upload route persists the files and a Prelanding row (ingest_status
+    'queued'); this runs in a background worker and moves the row through
+    parsing, storing, embedding and analyzing to 'ready', or 'failed' with
+    ingest_error set. Re-running it for the same prelanding resumes: stored
+    elements are not extracted again and only elements without vectors are
+    embedded.
+    """
+
+    def __init__(
+        self,
+        prelanding_id: str,
+        screenshot_paths: Optional[List[str]] = None,
+        detect_vertical: bool = False,
+        analyze_screenshots: bool = False
+    ):
+        """
+        Args:
+            prelanding_id: Row to index; its html_path is parsed
+            screenshot_paths: Saved screenshots for the vision stage
+            detect_vertical: Replace the row's vertical with the detected one
+                (meta.json did not specify it)
+            analyze_screenshots: Run GPT-4o vision on the screenshots and store
+                IMAGE_DESC elements; otherwise the stage is skipped
+        """
+        self.prelanding_id = prelanding_id
+        self.screenshot_paths = screenshot_paths or []
+        self.detect_vertical = detect_vertical
+        self.analyze_screenshots = analyze_screenshots
+
+    @classmethod
+    def for_prelanding(cls, prelanding: Prelanding) -> 'IngestPipeline':
+        """
+        Pipeline that re-runs the ingest of a stored row (after a restart or on
+        retry), from its saved screenshots and the flags the upload recorded in
+        ingest_options.
+        """
+        options = prelanding.ingest_options or {}
+        screenshot_paths = []
+        if prelanding.screenshots_dir and os.path.isdir(prelanding.screenshots_dir):
+            screenshot_paths = [
+                os.path.join(prelanding.screenshots_dir, name)
+                for name in sorted(os.listdir(prelanding.screenshots_dir))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+        return cls(
+            prelanding.id,
+            screenshot_paths=screenshot_paths,
+            detect_vertical=options.get('detect_vertical', False),
+            analyze_screenshots=options.get('analyze_screenshots', False)
+        )
+
+    def run(self, report: Callable[..., None]) -> Dict:
+        """
+        Run every stage.
+
+        Args:
+            report: report(stage, **fields) - called with status/done/total
+                updates as each stage progresses
+
+        Returns:
+            Summary: elements, embedded, missing_embeddings, image_descriptions,
+                screenshots_reused, vertical
+        """
+        db = SessionLocal()
+        try:
+            prelanding = db.get(Prelanding, self.prelanding_id)
+            if prelanding is None:
+                raise ValueError(f"Prelanding {self.prelanding_id} not found")
+
+            try:
+                elements = self._parse(db, prelanding, report)
+                stored = self._store(db, prelanding, elements, report)
+                embedding = self._embed(db, prelanding, report)
+                image_descriptions, screenshots_reused = self._vision(db, prelanding, report)
+            except Exception as e:
+                db.rollback()
+                prelanding.ingest_status = 'failed'
+                prelanding.ingest_error = str(e)
+                db.commit()
+                raise
+
+            prelanding.ingest_status = 'ready'
+            prelanding.ingest_error = None
+            db.commit()
+            return {
+                'elements': stored,
+                'embedded': embedding['embedded'],
+                'missing_embeddings': embedding['failed'],
+                'image_descriptions': image_descriptions,
+                'screenshots_reused': screenshots_reused,
+                'vertical': prelanding.vertical
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _enter(db, prelanding: Prelanding, stage: str, report: Callable, total: int):
+        prelanding.ingest_status = STAGE_STATUS[stage]
+        db.commit()
+        report(stage, status='running', done=0, total=total)
+
+    @staticmethod
+    def _stored_count(db, prelanding: Prelanding) -> int:
+        return db.scalar(
+            select(func.count(ExtractedElement.id)).where(
+                ExtractedElement.prelanding_id == prelanding.id,
+                ExtractedElement.element_type != ElementType.IMAGE_DESC
+            )
+        )
+
+    def _parse(self, db, prelanding: Prelanding, report: Callable) -> Optional[List[Dict]]:
+        """Extract elements, or None when an earlier run already stored them."""
+        if self._stored_count(db, prelanding):
+            report('parse', status='skipped')
+            return None
+
+        self._enter(db, prelanding, 'parse', report, total=1)
+        parser = HTMLParser()
+        extracted = parser.parse_html_file(prelanding.html_path)
+        if self.detect_vertical:
+            prelanding.vertical = parser.detect_vertical()
+
+        elements = []
+        for element_type, items in extracted.items():
+            for elem in items:
+                elements.append({**elem, 'type': ElementType(elem.get('type', element_type))})
+        report('parse', status='completed', done=1)
+        return elements
+
+    def _store(self, db, prelanding: Prelanding, elements: Optional[List[Dict]], report: Callable) -> int:
+        """Store extracted elements as 'pending' rows: the checkpoint embedding resumes from."""
+        if elements is None:
+            report('store', status='skipped')
+            return self._stored_count(db, prelanding)
+
+        self._enter(db, prelanding, 'store', report, total=len(elements))
+        if elements:
+            # One executemany INSERT in a short transaction; no network calls inside
+            db.execute(insert(ExtractedElement), [
+                {
+                    'prelanding_id': prelanding.id,
+                    'element_type': elem['type'],
+                    'text_content': elem['text'],
+                    'speaker': elem.get('speaker'),
+                    'sentiment': elem.get('sentiment'),
+                    'order_index': elem.get('order', 0),
+                    'embedding_status': 'pending'
+                }
+                for elem in elements
+            ])
+        db.commit()
+        report('store', status='completed', done=len(elements))
+        return len(elements)
+
+    def _embed(self, db, prelanding: Prelanding, report: Callable) -> Dict:
+        self._enter(db, prelanding, 'embed', report, total=0)
+        try:
+            embedding_service = EmbeddingService()
+        except Exception as e:
+            # Elements stay 'pending'; "reindex missing" embeds them later
+            print(f"Embedding service unavailable, elements of {prelanding.id} left without vectors: {e}")
+            embedding_service = None
+        return ElementEmbedder(embedding_service).run(db, prelanding.id, report)
+
+    def _vision(self, db, prelanding: Prelanding, report: Callable) -> Tuple[int, int]:
+        """
+        Store IMAGE_DESC elements for the screenshots.
+
+        Screenshots within screenshot_dedup_max_distance bits (dHash) of an
+        analyzed one - stored, or earlier in this upload - reuse its image
+        prompts instead of another vision call. The rest are analyzed
+        concurrently (vision_concurrency at a time).
+
+        Returns:
+            (image descriptions stored, screenshots reused without a vision call)
+        """
+        if not (self.analyze_screenshots and self.screenshot_paths):
+            report('vision', status='skipped')
+            return 0, 0
+        analyzed = db.scalar(
+            select(func.count(ExtractedElement.id)).where(
+                ExtractedElement.prelanding_id == prelanding.id,
+                ExtractedElement.element_type == ElementType.IMAGE_DESC
+            )
+        )
+        # End the read transaction: nothing is held open across the vision calls
+        db.commit()
+        if analyzed:
+            # Resumed run: screenshots were analyzed before
+            report('vision', status='skipped')
+            return analyzed, 0
+
+        self._enter(db, prelanding, 'vision', report, total=len(self.screenshot_paths))
+        cache = ScreenshotCache(db)
+        hashes = []
+        for screenshot_path in self.screenshot_paths:
+            try:
+                hashes.append(dhash(screenshot_path))
+            except Exception as e:
+                print(f"Error hashing screenshot {screenshot_path}: {e}")
+                hashes.append(None)
+        known = cache.candidates([image_hash for image_hash in hashes if image_hash])
+        db.commit()
+
+        # Stored matches are reused; of the rest, near-duplicates within this upload
+        # share the analysis of their first copy, which is the only one sent to vision
+        image_prompts: List[Optional[List[str]]] = [None] * len(self.screenshot_paths)
+        copy_of: Dict[int, int] = {}
+        pending: List[Dict] = []  # {'index', 'dhash'} of the screenshots to analyze
+        reused = 0
+        for index, image_hash in enumerate(hashes):
+            match = cache.nearest(image_hash, known) if image_hash else None
+            if match:
+                image_prompts[index] = match['image_prompts']
+                reused += 1
+                continue
+            first = cache.nearest(image_hash, pending) if image_hash else None
+            if first:
+                copy_of[index] = first['index']
+                reused += 1
+            else:
+                pending.append({'index': index, 'dhash': image_hash})
+
+        report('vision', done=reused)
+        vision_analyzer = VisionAnalyzer()
+        results = asyncio.run(vision_analyzer.analyze_screenshots(
+            [self.screenshot_paths[item['index']] for item in pending],
+            on_done=lambda finished: report('vision', done=reused + finished)
+        ))
+
+        analyses = []
+        for item, analysis in zip(pending, results):
+            if analysis is None:
+                continue
+            index = item['index']
+            image_prompts[index] = vision_analyzer.generate_image_prompts(analysis)
+            # API errors, unparsed responses and analyses without prompts are not
+            # cached, so the next upload of the screenshot retries them
+            cacheable = not (analysis.get('failed') or analysis.get('unparsed')) and image_prompts[index]
+            if item['dhash'] and cacheable:
+                analyses.append(cache.entry(
+                    item['dhash'], analysis, image_prompts[index], prelanding.id, self.screenshot_paths[index]
+                ))
+        for index, first in copy_of.items():
+            image_prompts[index] = image_prompts[first]
+
+        # Store image descriptions as elements
+        rows = [
+            {
+                'prelanding_id': prelanding.id,
+                'element_type': ElementType.IMAGE_DESC,
+                'text_content': prompt,
+                'order_index': 1000 + i  # High order to keep at end
+            }
+            for prompts in image_prompts
+            for i, prompt in enumerate(prompts or [])
+        ]
+        if analyses:
+            db.execute(insert(ScreenshotAnalysis), analyses)
+        if rows:
+            db.execute(insert(ExtractedElement), rows)
+        db.commit()
+        report('vision', status='completed')
+        return len(rows), reused
+
+
+class ReindexMissing:
+    """
+    Registry job that embeds elements left without vectors by failed or
+    interrupted ingests, for one prelanding or the whole library.
+    """
+
+    def __init__(self, prelanding_id: Optional[str] = None):
+        self.prelanding_id = prelanding_id
+
+    def run(self, report: Callable[..., None]) -> Dict:
+        """
+        Returns:
+            Summary: missing (before the run), embedded, failed
+        """
+        for stage in ('parse', 'store', 'vision'):
+            report(stage, status='skipped')
+        db = SessionLocal()
+        try:
+            return ElementEmbedder(EmbeddingService()).run(db, self.prelanding_id, report)
+        finally:
+            db.close()
+
+
+class IngestRegistry:
+    """
+    In-process registry of ingest jobs, run on a bounded pool of background threads.
+
+    Jobs do not survive the process; recover() re-queues the ingests a restart
+    or crash cut off.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, pipeline) -> Dict:
+        """Queue an IngestPipeline or ReindexMissing job. Returns a snapshot of the new job record."""
+        job_id = uuid.uuid4().hex
+        record = {
+            'job_id': job_id,
+            'prelanding_id': pipeline.prelanding_id,
+            'status': 'queued',
+            'stage': None,
+            'stages': {stage: {'status': 'pending', 'done': 0, 'total': 0} for stage in STAGES},
+            'queued_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None,
+            'summary': None,
+            'error': None,
+            'version': 0
+        }
+        with self.lock:
+            self._prune()
+            self.jobs[job_id] = record
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.ingest_workers),
+                    thread_name_prefix="ingest"
+                )
+            snapshot = copy.deepcopy(record)
+
+        # Keep LLM usage attribution (request id) of the upload request
+        context = contextvars.copy_context()
+        self.executor.submit(context.run, self._run, pipeline, record)
+        return snapshot
+
+    def retry(self, db, prelanding: Prelanding) -> Dict:
+        """
+        Re-queue the ingest of a stored prelanding (failed, or stale after a restart).
+
+        Completed stages are not redone: stored elements are kept and only
+        missing embeddings are created.
+
+        Raises:
+            IngestInProgressError: a job for the prelanding is running in this process
+        """
+        if self.is_running(prelanding.id):
+            raise IngestInProgressError(f"Prelanding {prelanding.id} is already being indexed")
+        prelanding.ingest_status = 'queued'
+        prelanding.ingest_error = None
+        db.commit()
+        return self.submit(IngestPipeline.for_prelanding(prelanding))
+
+    def recover(self) -> int:
+        """
+        Re-queue ingests left unfinished by a restart or crash. Called at startup.
+
+        Only rows last updated before this call are taken, and each is claimed
+        with a conditional UPDATE, so an upload accepted meanwhile is not run twice.
+
+        Returns:
+            Number of re-queued ingests
+        """
+        started = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            stale = db.execute(
+                select(Prelanding.id, Prelanding.ingest_status).where(
+                    Prelanding.ingest_status.in_(ACTIVE_STATUSES),
+                    Prelanding.date_updated < started
+                )
+            ).all()
+            recovered = 0
+            for prelanding_id, status in stale:
+                claimed = db.execute(
+                    update(Prelanding)
+                    .where(Prelanding.id == prelanding_id, Prelanding.ingest_status == status)
+                    .values(ingest_status='queued', ingest_error=None)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    self.submit(IngestPipeline.for_prelanding(db.get(Prelanding, prelanding_id)))
+                    recovered += 1
+            if recovered:
+                print(f"Re-queued {recovered} interrupted ingest(s)")
+            return recovered
+        finally:
+            db.close()
+
+    def is_running(self, prelanding_id: str) -> bool:
+        """Whether a job for the prelanding is queued or running in this process."""
+        record = self.latest_for(prelanding_id)
+        return record is not None and record['status'] not in FINISHED
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            record = self.jobs.get(job_id)
+            return copy.deepcopy(record) if record else None
+
+    def latest_for(self, prelanding_id: str) -> Optional[Dict]:
+        """Most recent job of a prelanding."""
+        with self.lock:
+            records = [r for r in self.jobs.values() if r['prelanding_id'] == prelanding_id]
+            return copy.deepcopy(records[-1]) if records else None
+
+    async def events(self, job_id: str) -> AsyncIterator[str]:
+        """
+        Server-sent events for a job: a `progress` event with the full record on
+        every change, and a final `done` event once it completes or fails.
+        """
+        version = -1
+        while True:
+            record = self.get(job_id)
+            if record is None:
+                yield _sse('error', {'detail': "Ingest job not found"})
+                return
+            if record['version'] != version:
+                version = record['version']
+                finished = record['status'] in FINISHED
+                yield _sse('done' if finished else 'progress', record)
+                if finished:
+                    return
+            await asyncio.sleep(settings.ingest_events_interval_seconds)
+
+    def _update(self, record: Dict, stage: Optional[str] = None, **fields):
+        with self.lock:
+            if stage:
+                record['stage'] = stage
+                record['stages'][stage].update(fields)
+            else:
+                record.update(fields)
+            record['version'] += 1
+
+    def _run(self, pipeline, record: Dict):
+        self._update(record, status='running', started_at=datetime.utcnow())
+        try:
+            summary = pipeline.run(lambda stage, **fields: self._update(record, stage, **fields))
+            self._update(record, status='completed', summary=summary, finished_at=datetime.utcnow())
+        except Exception as e:
+            import traceback
+            print(f"Ingest job {record['job_id']} ({pipeline.prelanding_id or 'library'}) failed: {e}")
+            print(traceback.format_exc())
+            if record['stage']:
+                self._update(record, record['stage'], status='failed')
+            self._update(record, status='failed', error=str(e), finished_at=datetime.utcnow())
+
+    def _prune(self):
+        """Drop the oldest finished records beyond MAX_FINISHED_JOBS. Caller holds the lock."""
+        finished = [job_id for job_id, r in self.jobs.items() if r['status'] in FINISHED]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+ingest_registry = IngestRegistry()
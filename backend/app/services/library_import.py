@@ -0,0 +1,403 @@
+import json
+import multiprocessing
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import insert, select
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Prelanding, ExtractedElement, PrelendingStatus, PrelendingFormat, ElementType
+from app.services.embeddings import EmbeddingService
+from app.services.html_parser import HTMLParser
+from app.services.upload_archive import check_archive, index_archive, default_meta, extract_member
+
+
+def normalize_meta(meta) -> Dict:
+    """
+    Validate meta.json and fill in defaults, so one bad archive fails alone
+    instead of breaking the insert of its whole batch.
+
+    Raises:
+        ValueError: meta is not an object, or format/status are not valid values
+    """
+    if not isinstance(meta, dict):
+        raise ValueError("meta.json must contain an object")
+    metrics = meta.get('metrics') or {}
+    tags = meta.get('tags') or []
+    if not isinstance(metrics, dict) or not isinstance(tags, list):
+        raise ValueError("meta.json metrics must be an object and tags a list")
+    return {
+        **meta,
+        'format': PrelendingFormat(meta.get('format', 'interview')).value,
+        'status': PrelendingStatus(meta.get('status', 'winner')).value,
+        'metrics': metrics,
+        'tags': tags
+    }
+
+
+def parse_archive(zip_path: str) -> Dict:
+    """
+    Read and parse one prelanding ZIP. Runs in a worker process; nothing is written.
+
+    Returns:
+        Dict with zip_path, meta (normalized), content_hash, vertical and
+        elements, or zip_path and error if the archive can't be imported
+    """
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            check_archive(zip_ref)
+            members = index_archive(zip_ref)
+            if members.html is None:
+                return {'zip_path': zip_path, 'error': "No HTML file found in ZIP"}
+            html_content = zip_ref.read(members.html).decode('utf-8')
+            meta = default_meta()
+            if members.meta is not None:
+                meta = json.loads(zip_ref.read(members.meta).decode('utf-8'))
+        meta = normalize_meta(meta)
+
+        parser = HTMLParser()
+        extracted = parser.parse_html(html_content)
+        elements = [
+            {**elem, 'type': ElementType(elem.get('type', element_type)).value}
+            for element_type, items in extracted.items()
+            for elem in items
+        ]
+        return {
+            'zip_path': zip_path,
+            'meta': meta,
+            'content_hash': HTMLParser.content_hash(html_content),
+            'vertical': meta.get('vertical') or parser.detect_vertical(),
+            'elements': elements
+        }
+    except Exception as e:
+        return {'zip_path': zip_path, 'error': f"{type(e).__name__}: {e}"}
+
+
+class LibraryImport:
+    """
+    Bulk-import prelanding ZIPs into the library.
+
+    Archives are parsed across a process pool. Parsed pages are committed in
+    batches: embeddings for all of a batch's elements are requested together
+    (EmbeddingService batches across documents up to the provider limits),
+    vectors are upserted to Qdrant, then Prelanding and ExtractedElement rows
+    are bulk-inserted in one transaction.
+
+    Progress is recorded per ZIP in a JSON checkpoint after every batch, so an
+    interrupted import resumes where it stopped. Pages whose HTML is already in
+    the library (same content hash) are skipped, which also covers a crash
+    between a commit and its checkpoint write.
+    """
+
+    def __init__(
+        self,
+        zip_paths: List[str],
+        checkpoint_path: str,
+        workers: Optional[int] = None,
+        batch_pages: int = 50,
+        embed: bool = True
+    ):
+        """
+        Args:
+            zip_paths: Archives to import, in order
+            checkpoint_path: JSON file with per-archive results; created if missing
+            workers: Parser processes (default: CPU count, 0 = in-process)
+            batch_pages: Pages per embedding/insert batch
+            embed: Request embeddings (off: rows are stored without vectors,
+                to be embedded later with "reindex missing")
+        """
+        self.zip_paths = zip_paths
+        self.checkpoint_path = checkpoint_path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_pages = max(1, batch_pages)
+        self.embed = embed
+        self.checkpoint = self._load_checkpoint()
+        self.embedding_service: Optional[EmbeddingService] = None
+
+    @staticmethod
+    def discover(source: str) -> List[str]:
+        """
+        Archives to import from a directory (every *.zip below it, sorted) or a
+        manifest file (one path per line, relative to the manifest; # comments).
+        """
+        path = Path(source)
+        if path.is_dir():
+            return [str(p) for p in sorted(path.rglob('*.zip'))]
+        zip_paths = []
+        for line in path.read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if line and not line.startswith('#'):
+                zip_paths.append(str((path.parent / line).resolve()) if not os.path.isabs(line) else line)
+        return zip_paths
+
+    def run(self) -> Dict:
+        """
+        Import every archive not already recorded in the checkpoint.
+
+        Returns:
+            Summary: imported, duplicates, failed, skipped (done in an earlier
+            run), elements, embedded, duration and pages/min
+        """
+        started = time.perf_counter()
+        pending_paths = [p for p in self.zip_paths if p not in self.checkpoint]
+        summary = {
+            'total': len(self.zip_paths),
+            'skipped': len(self.zip_paths) - len(pending_paths),
+            'imported': 0,
+            'duplicates': 0,
+            'failed': 0,
+            'elements': 0,
+            'embedded': 0
+        }
+        if self.embed and pending_paths:
+            self.embedding_service = EmbeddingService()
+
+        batch: List[Dict] = []
+        for parsed in self._parse_all(pending_paths):
+            batch.append(parsed)
+            if len(batch) >= self.batch_pages:
+                self._commit_batch(batch, summary)
+                self._report(summary, started)
+                batch = []
+        if batch:
+            self._commit_batch(batch, summary)
+            self._report(summary, started)
+
+        elapsed = time.perf_counter() - started
+        processed = summary['imported'] + summary['duplicates'] + summary['failed']
+        summary.update({
+            'duration_seconds': round(elapsed, 2),
+            'pages_per_minute': round(processed * 60 / elapsed, 1) if elapsed > 0 else 0.0
+        })
+        return summary
+
+    def _executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        # spawn: workers must not inherit the parent's DB connections
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def _parse_all(self, zip_paths: List[str]) -> Iterator[Dict]:
+        """Parse archives across the pool, keeping at most workers * 4 in flight."""
+        executor = self._executor()
+        if executor is None:
+            for zip_path in zip_paths:
+                yield parse_archive(zip_path)
+            return
+
+        paths = iter(zip_paths)
+        pending = set()
+        try:
+            while True:
+                for zip_path in paths:
+                    pending.add(executor.submit(parse_archive, zip_path))
+                    if len(pending) >= self.workers * 4:
+                        break
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _commit_batch(self, batch: List[Dict], summary: Dict):
+        """Dedupe, save files, embed and bulk-insert one batch of parsed pages."""
+        for parsed in batch:
+            if 'error' in parsed:
+                self._record(parsed['zip_path'], 'failed', error=parsed['error'])
+                summary['failed'] += 1
+        pages = [p for p in batch if 'error' not in p]
+
+        db = SessionLocal()
+        try:
+            hashes = [p['content_hash'] for p in pages]
+            ids = [p['meta'].get('id') for p in pages if p['meta'].get('id')]
+            known_hashes = dict(db.execute(
+                select(Prelanding.content_hash, Prelanding.id).where(Prelanding.content_hash.in_(hashes))
+            ).all())
+            taken_ids = set(db.scalars(select(Prelanding.id).where(Prelanding.id.in_(ids))).all())
+        finally:
+            db.close()
+
+        new_pages = []
+        for page in pages:
+            if page['content_hash'] in known_hashes:
+                self._record(page['zip_path'], 'duplicate', known_hashes[page['content_hash']])
+                summary['duplicates'] += 1
+                continue
+            page['id'] = page['meta'].get('id') or default_meta()['id']
+            if page['id'] in taken_ids:
+                self._record(page['zip_path'], 'failed', error=f"Prelanding {page['id']} already exists")
+                summary['failed'] += 1
+                continue
+            known_hashes[page['content_hash']] = page['id']
+            taken_ids.add(page['id'])
+            try:
+                self._save_files(page)
+                new_pages.append(page)
+            except Exception as e:
+                shutil.rmtree(os.path.join(settings.upload_dir, page['id']), ignore_errors=True)
+                self._record(page['zip_path'], 'failed', error=f"{type(e).__name__}: {e}")
+                summary['failed'] += 1
+
+        if new_pages:
+            try:
+                embedded = self._store(new_pages)
+            except Exception as e:
+                # The batch is recorded as failed (retried next run) instead of aborting the import
+                print(f"Batch of {len(new_pages)} pages not stored: {type(e).__name__}: {e}")
+                for page in new_pages:
+                    self._discard(page)
+                    self._record(page['zip_path'], 'failed', error=f"{type(e).__name__}: {e}")
+                summary['failed'] += len(new_pages)
+            else:
+                for page in new_pages:
+                    self._record(page['zip_path'], 'imported', page['id'])
+                summary['imported'] += len(new_pages)
+                summary['elements'] += sum(len(page['elements']) for page in new_pages)
+                summary['embedded'] += embedded
+        self._save_checkpoint()
+
+    def _save_files(self, page: Dict):
+        """Copy the HTML and screenshots to upload_dir, like the ZIP upload route."""
+        upload_path = os.path.join(settings.upload_dir, page['id'])
+        screenshots_path = os.path.join(upload_path, "screenshots")
+        os.makedirs(screenshots_path, exist_ok=True)
+        page['html_path'] = os.path.join(upload_path, "index.html")
+        page['screenshot_count'] = 0
+
+        with zipfile.ZipFile(page['zip_path'], 'r') as zip_ref:
+            members = index_archive(zip_ref)
+            extract_member(zip_ref, members.html, page['html_path'])
+            for info in members.images:
+                extract_member(zip_ref, info, os.path.join(screenshots_path, os.path.basename(info.filename)))
+                page['screenshot_count'] += 1
+        page['screenshots_dir'] = screenshots_path if page['screenshot_count'] else None
+
+    def _discard(self, page: Dict):
+        """Remove the files and vectors of a page that was not stored."""
+        shutil.rmtree(os.path.join(settings.upload_dir, page['id']), ignore_errors=True)
+        if self.embedding_service:
+            try:
+                self.embedding_service.delete_prelanding_embeddings(page['id'])
+            except Exception as e:
+                print(f"Could not delete vectors of {page['id']}: {e}")
+
+    def _store(self, pages: List[Dict]) -> int:
+        """Embed every element of the batch together, upsert vectors, bulk-insert rows."""
+        elements = [(page, elem) for page in pages for elem in page['elements']]
+        embedding_ids: List[Optional[str]] = [None] * len(elements)
+        if self.embedding_service and elements:
+            vectors = self.embedding_service.create_embeddings([elem['text'] for _, elem in elements])
+            points = [
+                {
+                    'embedding_id': EmbeddingService.point_id(
+                        page['id'], str(ElementType(elem['type'])), elem.get('order', 0), elem['text']
+                    ),
+                    'vector': vector,
+                    'text': elem['text'],
+                    'prelanding_id': page['id'],
+                    'element_type': str(ElementType(elem['type'])),
+                    'performance_score': page['meta'].get('metrics', {}).get('lead_rate') or 0.0,
+                    'metadata': {
+                        'geo': page['meta'].get('geo', 'US'),
+                        'vertical': page['vertical'],
+                        'speaker': elem.get('speaker'),
+                        'sentiment': elem.get('sentiment')
+                    }
+                }
+                for (page, elem), vector in zip(elements, vectors)
+            ]
+            batch_size = max(1, settings.embedding_batch_size)
+            embedding_ids = []
+            for start in range(0, len(points), batch_size):
+                embedding_ids.extend(self.embedding_service.store_embeddings(points[start:start + batch_size]))
+
+        now = datetime.utcnow()
+        prelanding_rows = []
+        for page in pages:
+            meta = page['meta']
+            metrics = meta['metrics']
+            prelanding_rows.append({
+                'id': page['id'],
+                'name': Path(page['zip_path']).stem,
+                'geo': meta.get('geo', 'US'),
+                'language': meta.get('language', 'en'),
+                'vertical': page['vertical'],
+                'format': PrelendingFormat(meta['format']),
+                'ctr_to_landing': metrics.get('ctr_to_landing'),
+                'lead_rate': metrics.get('lead_rate'),
+                'deposit_rate': metrics.get('deposit_rate'),
+                'status': PrelendingStatus(meta['status']),
+                'tags': meta['tags'],
+                'html_path': page['html_path'],
+                'screenshots_dir': page['screenshots_dir'],
+                'content_hash': page['content_hash'],
+                'ingest_status': 'ready',
+                'date_added': now,
+                'date_updated': now
+            })
+        element_rows = [
+            {
+                'prelanding_id': page['id'],
+                'element_type': ElementType(elem['type']),
+                'text_content': elem['text'],
+                'speaker': elem.get('speaker'),
+                'sentiment': elem.get('sentiment'),
+                'order_index': elem.get('order', 0),
+                'embedding_id': embedding_id,
+                'embedding_status': 'embedded' if embedding_id else ('failed' if self.embedding_service else 'pending'),
+                'created_at': now
+            }
+            for (page, elem), embedding_id in zip(elements, embedding_ids)
+        ]
+
+        db = SessionLocal()
+        try:
+            # One transaction, two executemany INSERTs
+            db.execute(insert(Prelanding), prelanding_rows)
+            if element_rows:
+                db.execute(insert(ExtractedElement), element_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return sum(1 for embedding_id in embedding_ids if embedding_id)
+
+    def _record(self, zip_path: str, status: str, prelanding_id: Optional[str] = None, error: Optional[str] = None):
+        self.checkpoint[zip_path] = {'status': status, 'prelanding_id': prelanding_id, 'error': error}
+
+    def _load_checkpoint(self) -> Dict[str, Dict]:
+        """Archives finished in earlier runs. Failed ones are retried."""
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        return {path: entry for path, entry in checkpoint.items() if entry.get('status') != 'failed'}
+
+    def _save_checkpoint(self):
+        """Write atomically so an interruption never leaves a truncated file."""
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _report(self, summary: Dict, started: float):
+        processed = summary['imported'] + summary['duplicates'] + summary['failed']
+        elapsed = time.perf_counter() - started
+        rate = processed * 60 / elapsed if elapsed > 0 else 0.0
+        print(
+            f"  [{summary['skipped'] + processed}/{summary['total']}] imported {summary['imported']}, "
+            f"duplicates {summary['duplicates']}, failed {summary['failed']} - {rate:.0f} pages/min"
+        )
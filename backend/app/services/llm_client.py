@@ -0,0 +1,384 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+import openai
+from openai import OpenAI
+from app.config import settings
+from app.services.llm_usage import tracked_chat_completion, tracked_chat_stream, tracked_embedding
+
+
+class LLMUnavailableError(Exception):
+    """Raised when a call cannot be served right now; routes map it to 429/503 with Retry-After."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = max(1, int(round(retry_after)))
+
+
+class LLMRateLimitError(LLMUnavailableError):
+    """Provider kept returning 429 after all retries."""
+
+    status_code = 429
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Circuit breaker is open for the model; calls are rejected without hitting the provider."""
+
+    status_code = 503
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `capacity` units per minute."""
+
+    def __init__(self, capacity: int):
+        self.capacity = float(max(capacity, 1))
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0  # units per second
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float) -> float:
+        """Block until `amount` units are available. Returns seconds waited."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def refund(self, amount: float):
+        """Return over-estimated units (e.g. when actual tokens < estimate)."""
+        if amount <= 0:
+            return
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    """Opens after consecutive provider failures, then lets one probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.state = 'closed'  # closed, open, half_open
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def before_call(self, model: str):
+        with self.lock:
+            if self.state == 'open':
+                remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"LLM circuit open for {model}", retry_after=remaining)
+                self.state = 'half_open'
+            elif self.state == 'half_open':
+                # Only one probe at a time
+                raise CircuitOpenError(f"LLM circuit half-open for {model}", retry_after=1)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = 'closed'
+
+    def record_rate_limited(self):
+        """
+        The provider answered with 429: it is reachable, so a half-open probe
+        closes the circuit. Rate limits never count towards opening it.
+        """
+        with self.lock:
+            if self.state == 'half_open':
+                self.failures = 0
+                self.state = 'closed'
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ModelLimiter:
+    """Per-model limits (requests/min, tokens/min), breaker and queue-time metrics."""
+
+    def __init__(self, model: str, rpm: int, tpm: int):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.breaker = CircuitBreaker(
+            settings.llm_breaker_failure_threshold,
+            settings.llm_breaker_reset_seconds
+        )
+        self.queue_waits: Deque[float] = deque(maxlen=1000)
+        self.lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'failures': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'rejected_open_circuit': 0,
+            'queued': 0,
+            'queue_wait_total_s': 0.0,
+            'queue_wait_max_s': 0.0,
+        }
+
+    def record_wait(self, waited: float):
+        with self.lock:
+            self.queue_waits.append(waited)
+            self.stats['queue_wait_total_s'] += waited
+            self.stats['queue_wait_max_s'] = max(self.stats['queue_wait_max_s'], waited)
+
+    def bump(self, stat: str, amount: int = 1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            waits = sorted(self.queue_waits)
+            stats = dict(self.stats)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        return {
+            **stats,
+            'queue_wait_p50_s': round(percentile(0.50), 3),
+            'queue_wait_p95_s': round(percentile(0.95), 3),
+            'circuit_state': self.breaker.state,
+            'rpm_limit': int(self.requests.capacity),
+            'tpm_limit': int(self.tokens.capacity),
+        }
+
+
+class LLMClient:
+    """
+    Shared OpenAI client for all services.
+
+    Every call passes through a per-model token bucket (requests/min and tokens/min),
+    a global concurrency semaphore and a per-model circuit breaker, and is retried
+    with jittered exponential backoff on 429/5xx/connection errors. Usage is recorded
+    via llm_usage.
+    """
+
+    RETRYABLE_ERRORS = (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+
+    def __init__(self):
+        # SDK retries are disabled; backoff is handled here so it is coordinated
+        self.openai = OpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            max_retries=0
+        )
+        self.semaphore = threading.BoundedSemaphore(settings.llm_max_concurrency)
+        self.limiters: Dict[str, ModelLimiter] = {}
+        self.limiters_lock = threading.Lock()
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+
+    @staticmethod
+    def resolve_model(service: str, task: Optional[str] = None) -> str:
+        """Pick the model for a call: "service.task" route, then "service" route, then the default."""
+        routes = settings.llm_model_routes
+        if task and f"{service}.{task}" in routes:
+            return routes[f"{service}.{task}"]
+        return routes.get(service, settings.llm_default_model)
+
+    def chat(self, service: str, task: Optional[str] = None, **create_kwargs):
+        """
+        Rate-limited, retried chat completion. Same kwargs as chat.completions.create.
+
+        If no model is given it is resolved from llm_model_routes for (service, task).
+        """
+        create_kwargs.setdefault('model', self.resolve_model(service, task))
+        return self._call(tracked_chat_completion, service, task, create_kwargs)
+
+    def chat_stream(self, service: str, task: Optional[str] = None, **create_kwargs):
+        """
+        Rate-limited, retried streamed chat completion.
+
+        Returns a TrackedChatStream yielding text deltas. The concurrency slot is held
+        until the stream is exhausted or closed; closing it early cancels generation.
+        """
+        create_kwargs.setdefault('model', self.resolve_model(service, task))
+        return self._call(tracked_chat_stream, service, task, create_kwargs, streaming=True)
+
+    def embed(self, service: str, task: Optional[str] = None, **create_kwargs):
+        """Rate-limited, retried embeddings call. Same kwargs as embeddings.create."""
+        return self._call(tracked_embedding, service, task, create_kwargs)
+
+    def metrics(self) -> Dict:
+        """Queue-time and throughput metrics per model."""
+        with self.limiters_lock:
+            limiters = list(self.limiters.values())
+        return {
+            'in_flight': self.in_flight,
+            'max_concurrency': settings.llm_max_concurrency,
+            'models': {limiter.model: limiter.snapshot() for limiter in limiters}
+        }
+
+    def _limiter(self, model: str) -> ModelLimiter:
+        with self.limiters_lock:
+            limiter = self.limiters.get(model)
+            if limiter is None:
+                limits = settings.llm_rate_limits.get(model, {})
+                limiter = ModelLimiter(
+                    model,
+                    rpm=limits.get('rpm', settings.llm_default_rpm),
+                    tpm=limits.get('tpm', settings.llm_default_tpm)
+                )
+                self.limiters[model] = limiter
+            return limiter
+
+    @staticmethod
+    def _estimate_tokens(create_kwargs: Dict) -> int:
+        """Rough token estimate (4 chars/token + max_tokens) used for the TPM bucket."""
+        chars = 0
+        messages = create_kwargs.get('messages') or []
+        for message in messages:
+            content = message.get('content', '')
+            if isinstance(content, str):
+                chars += len(content)
+            else:
+                for part in content:
+                    if part.get('type') == 'text':
+                        chars += len(part.get('text', ''))
+                    else:
+                        chars += 4000  # ~1k tokens per image
+        embedding_input = create_kwargs.get('input')
+        if isinstance(embedding_input, str):
+            chars += len(embedding_input)
+        elif isinstance(embedding_input, list):
+            chars += sum(len(item) for item in embedding_input if isinstance(item, str))
+        return chars // 4 + (create_kwargs.get('max_tokens') or 0) + 1
+
+    @staticmethod
+    def _backoff(attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After on 429s."""
+        delay = random.uniform(0, min(
+            settings.llm_backoff_max_seconds,
+            settings.llm_backoff_base_seconds * (2 ** attempt)
+        ))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return min(delay, settings.llm_backoff_max_seconds)
+
+    def _release_slot(self):
+        with self.in_flight_lock:
+            self.in_flight -= 1
+        self.semaphore.release()
+
+    def _call(self, tracked_fn, service: str, task: Optional[str], create_kwargs: Dict, streaming: bool = False):
+        model = create_kwargs.get('model', 'unknown')
+        limiter = self._limiter(model)
+        estimate = self._estimate_tokens(create_kwargs)
+
+        last_error: Optional[Exception] = None
+        for attempt in range(settings.llm_max_retries + 1):
+            try:
+                limiter.breaker.before_call(model)
+            except CircuitOpenError:
+                limiter.bump('rejected_open_circuit')
+                raise
+
+            # Queue time: waiting for rate-limit budget and a concurrency slot
+            queued_at = time.monotonic()
+            limiter.requests.acquire(1)
+            limiter.tokens.acquire(estimate)
+            self.semaphore.acquire()
+            waited = time.monotonic() - queued_at
+            limiter.record_wait(waited)
+            if waited > 0.01:
+                limiter.bump('queued')
+
+            with self.in_flight_lock:
+                self.in_flight += 1
+            hold_slot = False
+            try:
+                limiter.bump('calls')
+                response = tracked_fn(self.openai, service=service, task=task, **create_kwargs)
+            except self.RETRYABLE_ERRORS as e:
+                last_error = e
+                limiter.bump('failures')
+                if isinstance(e, openai.RateLimitError):
+                    limiter.bump('rate_limited')
+                    limiter.breaker.record_rate_limited()
+                else:
+                    # Only provider faults count towards opening the circuit
+                    limiter.breaker.record_failure()
+                if attempt >= settings.llm_max_retries:
+                    break
+                limiter.bump('retries')
+                delay = self._backoff(attempt, e)
+            except Exception:
+                # Provider answered with a non-retryable error (e.g. 400): it is reachable,
+                # so a half-open probe must not stay pending
+                limiter.breaker.record_success()
+                raise
+            else:
+                limiter.breaker.record_success()
+                if streaming:
+                    # The stream releases the slot when it is exhausted or closed
+                    hold_slot = True
+                    response.on_close = self._release_slot
+                    return response
+                usage = getattr(response, 'usage', None)
+                actual = getattr(usage, 'total_tokens', None) if usage is not None else None
+                if actual:
+                    limiter.tokens.refund(estimate - actual)
+                return response
+            finally:
+                if not hold_slot:
+                    self._release_slot()
+
+            time.sleep(delay)
+
+        if isinstance(last_error, openai.RateLimitError):
+            raise LLMRateLimitError(
+                f"LLM rate limit for {model} persisted after {settings.llm_max_retries} retries",
+                retry_after=settings.llm_backoff_max_seconds
+            ) from last_error
+        raise LLMUnavailableError(
+            f"LLM provider unavailable for {model}: {last_error}",
+            retry_after=settings.llm_breaker_reset_seconds
+        ) from last_error
+
+
+_shared_client: Optional[LLMClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide shared LLM client."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = LLMClient()
+    return _shared_client
@@ -0,0 +1,345 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.llm_usage import LLMUsage
+
+
+# USD per 1M tokens: input, cached input, output
+MODEL_PRICING = {
+    'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+    'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+    'gpt-4.1': {'input': 2.00, 'cached_input': 0.50, 'output': 8.00},
+    'gpt-4.1-mini': {'input': 0.40, 'cached_input': 0.10, 'output': 1.60},
+    'gpt-4.1-nano': {'input': 0.10, 'cached_input': 0.025, 'output': 0.40},
+    'text-embedding-3-small': {'input': 0.02, 'cached_input': 0.02, 'output': 0.0},
+    'text-embedding-3-large': {'input': 0.13, 'cached_input': 0.13, 'output': 0.0},
+}
+
+# Attribution for calls made in the current request/task (gen_id, request_id, geo, persona)
+_usage_attribution: ContextVar[Dict] = ContextVar('llm_usage_attribution', default={})
+
+
+@contextmanager
+def usage_context(**attribution):
+    """
+    Attribute every LLM call made inside the block to the given gen_id/request_id/geo/persona.
+
+    Nested contexts inherit and override the outer attribution.
+    """
+    merged = {**_usage_attribution.get(), **{k: v for k, v in attribution.items() if v is not None}}
+    token = _usage_attribution.set(merged)
+    try:
+        yield merged
+    finally:
+        _usage_attribution.reset(token)
+
+
+def compute_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """Cost in USD for a call. Unknown models fall back to their base family or cost 0."""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        # Dated snapshots like "gpt-4o-2024-08-06" -> "gpt-4o"
+        family = max((name for name in MODEL_PRICING if model.startswith(name)), key=len, default=None)
+        pricing = MODEL_PRICING.get(family) if family else None
+    if pricing is None:
+        return 0.0
+
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (
+        uncached * pricing['input']
+        + cached_tokens * pricing['cached_input']
+        + completion_tokens * pricing['output']
+    ) / 1_000_000
+
+
+def extract_usage(usage) -> Dict[str, int]:
+    """Normalize an API usage payload into prompt/completion/cached/total token counts."""
+    if usage is None:
+        return {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'total_tokens': 0}
+
+    if isinstance(usage, dict):
+        get = usage.get
+    else:
+        get = lambda name, default=None: getattr(usage, name, default)
+
+    details = get('prompt_tokens_details')
+    if isinstance(details, dict):
+        cached_tokens = details.get('cached_tokens') or 0
+    else:
+        cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+
+    prompt_tokens = get('prompt_tokens', 0) or 0
+    completion_tokens = get('completion_tokens', 0) or 0
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'cached_tokens': cached_tokens,
+        'total_tokens': get('total_tokens', 0) or (prompt_tokens + completion_tokens)
+    }
+
+
+def record_usage(
+    service: str,
+    model: str,
+    usage: Dict[str, int],
+    latency_ms: float,
+    task: Optional[str] = None,
+    success: bool = True
+) -> Optional[LLMUsage]:
+    """
+    Persist one call in the usage table using its own session.
+
+    Accounting must never break generation, so storage errors are only printed.
+    """
+    attribution = _usage_attribution.get()
+    record = LLMUsage(
+        service=service,
+        task=task,
+        model=model,
+        gen_id=attribution.get('gen_id'),
+        request_id=attribution.get('request_id'),
+        geo=(attribution.get('geo') or '')[:2].upper() or None,
+        persona=attribution.get('persona'),
+        prompt_tokens=usage['prompt_tokens'],
+        completion_tokens=usage['completion_tokens'],
+        cached_tokens=usage['cached_tokens'],
+        total_tokens=usage['total_tokens'],
+        latency_ms=latency_ms,
+        cost_usd=compute_cost(model, usage['prompt_tokens'], usage['completion_tokens'], usage['cached_tokens']),
+        success=1 if success else 0
+    )
+
+    db = SessionLocal()
+    try:
+        db.add(record)
+        db.commit()
+        return record
+    except Exception as e:
+        db.rollback()
+        print(f"Usage accounting error (skipping): {e}")
+        return None
+    finally:
+        db.close()
+
+
+def tracked_chat_completion(client, service: str, task: Optional[str] = None, **create_kwargs):
+    """
+    Call client.chat.completions.create and record tokens, latency and cost.
+
+    Failed calls are recorded with zero tokens and re-raised.
+    """
+    model = create_kwargs.get('model', 'unknown')
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(**create_kwargs)
+    except Exception:
+        record_usage(service, model, extract_usage(None), (time.perf_counter() - started) * 1000, task, success=False)
+        raise
+
+    record_usage(
+        service,
+        getattr(response, 'model', None) or model,
+        extract_usage(response.usage),
+        (time.perf_counter() - started) * 1000,
+        task
+    )
+    return response
+
+
+class TrackedChatStream:
+    """
+    Iterator over the text deltas of a streamed chat completion.
+
+    Usage is recorded once, when the stream is exhausted or closed. It comes from
+    the final chunk (stream_options.include_usage); if the caller closes the
+    stream early it is estimated from the prompt and the text received so far.
+    """
+
+    def __init__(self, stream, service: str, task: Optional[str], create_kwargs: Dict, started: float):
+        self.stream = stream
+        self.service = service
+        self.task = task
+        self.model = create_kwargs.get('model', 'unknown')
+        self.messages = create_kwargs.get('messages') or []
+        self.started = started
+        self.received_chars = 0
+        self.usage: Optional[Dict[str, int]] = None
+        self.finished = False
+        self.on_close = None  # Set by the client to release its concurrency slot
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                if getattr(chunk, 'usage', None):
+                    self.usage = extract_usage(chunk.usage)
+                if chunk.choices:
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        self.received_chars += len(text)
+                        yield text
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the stream (cancelling generation) and record usage."""
+        if self.finished:
+            return
+        self.finished = True
+        self.stream.close()
+
+        if self.usage is None:
+            prompt_tokens = sum(
+                len(m['content']) for m in self.messages if isinstance(m.get('content'), str)
+            ) // 4
+            completion_tokens = self.received_chars // 4
+            self.usage = {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'cached_tokens': 0,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        record_usage(
+            self.service,
+            self.model,
+            self.usage,
+            (time.perf_counter() - self.started) * 1000,
+            self.task
+        )
+        if self.on_close:
+            self.on_close()
+
+
+def tracked_chat_stream(client, service: str, task: Optional[str] = None, **create_kwargs) -> TrackedChatStream:
+    """Start a streamed chat completion; usage is recorded when the stream ends."""
+    model = create_kwargs.get('model', 'unknown')
+    extra_body = dict(create_kwargs.pop('extra_body', None) or {})
+    extra_body.setdefault('stream_options', {'include_usage': True})
+    started = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(stream=True, extra_body=extra_body, **create_kwargs)
+    except Exception:
+        record_usage(service, model, extract_usage(None), (time.perf_counter() - started) * 1000, task, success=False)
+        raise
+
+    return TrackedChatStream(stream, service, task, create_kwargs, started)
+
+
+def tracked_embedding(client, service: str, task: Optional[str] = None, **create_kwargs):
+    """Call client.embeddings.create and record tokens, latency and cost."""
+    model = create_kwargs.get('model', 'unknown')
+    started = time.perf_counter()
+    try:
+        response = client.embeddings.create(**create_kwargs)
+    except Exception:
+        record_usage(service, model, extract_usage(None), (time.perf_counter() - started) * 1000, task, success=False)
+        raise
+
+    record_usage(
+        service,
+        model,
+        extract_usage(response.usage),
+        (time.perf_counter() - started) * 1000,
+        task
+    )
+    return response
+
+
+class UsageReport:
+    """Aggregations over the usage table for finding expensive hot paths."""
+
+    GROUP_COLUMNS = {
+        'model': LLMUsage.model,
+        'geo': LLMUsage.geo,
+        'persona': LLMUsage.persona,
+        'service': LLMUsage.service,
+        'task': LLMUsage.task,
+    }
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def aggregate(self, group_by: str = 'day', days: int = 30) -> List[Dict]:
+        """
+        Aggregate calls, tokens, cost and latency over the last `days` days.
+
+        Args:
+            group_by: day, model, geo, persona, service or task
+
+        Returns:
+            List of rows sorted by cost (or by day for group_by=day)
+        """
+        if group_by == 'day':
+            group_column = func.date(LLMUsage.created_at)
+        elif group_by in self.GROUP_COLUMNS:
+            group_column = self.GROUP_COLUMNS[group_by]
+        else:
+            raise ValueError(f"Unsupported group_by: {group_by}")
+
+        since = datetime.utcnow() - timedelta(days=days)
+        cost = func.sum(LLMUsage.cost_usd)
+        rows = (
+            self.db.query(
+                group_column.label('key'),
+                func.count(LLMUsage.id).label('calls'),
+                func.sum(LLMUsage.prompt_tokens).label('prompt_tokens'),
+                func.sum(LLMUsage.completion_tokens).label('completion_tokens'),
+                func.sum(LLMUsage.cached_tokens).label('cached_tokens'),
+                func.sum(LLMUsage.total_tokens).label('total_tokens'),
+                cost.label('cost_usd'),
+                func.avg(LLMUsage.latency_ms).label('avg_latency_ms'),
+                func.sum(1 - LLMUsage.success).label('failed_calls')
+            )
+            .filter(LLMUsage.created_at >= since)
+            .group_by(group_column)
+            .order_by(group_column if group_by == 'day' else cost.desc())
+            .all()
+        )
+
+        return [
+            {
+                group_by: str(row.key) if row.key is not None else None,
+                'calls': row.calls,
+                'prompt_tokens': row.prompt_tokens or 0,
+                'completion_tokens': row.completion_tokens or 0,
+                'cached_tokens': row.cached_tokens or 0,
+                'total_tokens': row.total_tokens or 0,
+                'cost_usd': round(row.cost_usd or 0.0, 6),
+                'avg_latency_ms': round(row.avg_latency_ms or 0.0, 1),
+                'failed_calls': row.failed_calls or 0
+            }
+            for row in rows
+        ]
+
+    def for_generation(self, gen_id: str) -> Dict:
+        """All calls attributed to one generated prelanding, with totals."""
+        calls = (
+            self.db.query(LLMUsage)
+            .filter(LLMUsage.gen_id == gen_id)
+            .order_by(LLMUsage.created_at)
+            .all()
+        )
+
+        return {
+            'gen_id': gen_id,
+            'calls': [
+                {
+                    'service': c.service,
+                    'task': c.task,
+                    'model': c.model,
+                    'prompt_tokens': c.prompt_tokens,
+                    'completion_tokens': c.completion_tokens,
+                    'cached_tokens': c.cached_tokens,
+                    'latency_ms': round(c.latency_ms or 0.0, 1),
+                    'cost_usd': round(c.cost_usd or 0.0, 6),
+                    'created_at': c.created_at
+                }
+                for c in calls
+            ],
+            'total_tokens': sum(c.total_tokens or 0 for c in calls),
+            'cost_usd': round(sum(c.cost_usd or 0.0 for c in calls), 6)
+        }
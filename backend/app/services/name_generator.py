@@ -1,6 +1,7 @@
 import json
 from typing import List, Dict
-from openai import OpenAI
+from app.services.llm_client import get_llm_client
+from app.services.llm_usage import usage_context
 
 
 class NameGenerator:
@@ -13,8 +14,8 @@ class NameGenerator:
         'PL': 'PLN', 'NL': 'EUR'
     }
 
-    def __init__(self, openai_api_key: str):
-        self.client = OpenAI(api_key=openai_api_key)
+    def __init__(self):
+        self.llm = get_llm_client()
 
     async def generate_names(
         self,
@@ -37,15 +38,17 @@ class NameGenerator:
         """
         prompt = self._build_name_prompt(geo, gender, count, include_nickname)
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates realistic names in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=2000
-        )
+        with usage_context(geo=geo):
+            response = self.llm.chat(
+                service="name_generator",
+                task="names",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates realistic names in JSON format."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                max_tokens=2000
+            )
 
         # Parse JSON response
         try:
@@ -168,15 +171,17 @@ class NameGenerator:
         """Synchronous version of generate_names for non-async contexts."""
         prompt = self._build_name_prompt(geo, gender, count, include_nickname)
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates realistic names in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=2000
-        )
+        with usage_context(geo=geo):
+            response = self.llm.chat(
+                service="name_generator",
+                task="names",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates realistic names in JSON format."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                max_tokens=2000
+            )
 
         try:
             text = response.choices[0].message.content
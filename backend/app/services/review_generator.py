@@ -1,6 +1,7 @@
 import json
 from typing import List, Dict, Optional, Any
-from openai import OpenAI
+from app.services.llm_client import get_llm_client
+from app.services.llm_usage import usage_context
 
 
 class ReviewGenerator:
@@ -13,8 +14,8 @@ class ReviewGenerator:
         'PL': 'PLN', 'NL': 'EUR'
     }
 
-    def __init__(self, openai_api_key: str):
-        self.client = OpenAI(api_key=openai_api_key)
+    def __init__(self):
+        self.llm = get_llm_client()
 
     async def generate_reviews(
         self,
@@ -43,15 +44,17 @@ class ReviewGenerator:
             geo, language, vertical, length, count, names
         )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates realistic product reviews in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=4000
-        )
+        with usage_context(geo=geo):
+            response = self.llm.chat(
+                service="review_generator",
+                task="reviews",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates realistic product reviews in JSON format."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                max_tokens=4000
+            )
 
         # Parse JSON response
         try:
@@ -186,15 +189,17 @@ class ReviewGenerator:
             geo, language, vertical, length, count, names
         )
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates realistic product reviews in JSON format."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=4000
-        )
+        with usage_context(geo=geo):
+            response = self.llm.chat(
+                service="review_generator",
+                task="reviews",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that generates realistic product reviews in JSON format."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.8,
+                max_tokens=4000
+            )
 
         try:
             text = response.choices[0].message.content
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional
+from PIL import Image
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import ScreenshotAnalysis
+
+
+DHASH_SIZE = 8  # 8x8 gradient bits = 64-bit hash
+HASH_BANDS = 4  # Indexed 16-bit quarters; exact band lookup finds every hash within HASH_BANDS - 1 bits
+
+
+def dhash(image_path: str) -> str:
+    """
+    Difference hash of an image, as 16 hex digits.
+
+    The image is reduced to a (DHASH_SIZE + 1) x DHASH_SIZE grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right-hand neighbour, so
+    resized, recompressed or re-encoded copies hash to the same or nearby values.
+    """
+    with Image.open(image_path) as img:
+        # JPEGs are decoded at reduced scale straight away
+        img.draft('L', (DHASH_SIZE * 16, DHASH_SIZE * 16))
+        thumb = img.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = thumb.tobytes()
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            offset = row * (DHASH_SIZE + 1) + col
+            bits = (bits << 1) | (pixels[offset] > pixels[offset + 1])
+    return f'{bits:016x}'
+
+
+def hamming(hash_a: str, hash_b: str) -> int:
+    return (int(hash_a, 16) ^ int(hash_b, 16)).bit_count()
+
+
+def hash_bands(image_hash: str) -> List[int]:
+    value = int(image_hash, 16)
+    return [(value >> (16 * (HASH_BANDS - 1 - i))) & 0xFFFF for i in range(HASH_BANDS)]
+
+
+class ScreenshotCache:
+    """Stored vision analyses, looked up by perceptual hash so near-duplicate screenshots skip the API."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def candidates(self, hashes: List[str]) -> List[Dict]:
+        """
+        Stored analyses that share at least one hash band with any of the hashes.
+
+        One indexed query for the whole batch; pick matches with nearest().
+
+        Returns:
+            Dicts with id, dhash and image_prompts
+        """
+        if not hashes or not settings.screenshot_dedup_enabled:
+            return []
+        bands = [hash_bands(image_hash) for image_hash in hashes]
+        band_columns = [getattr(ScreenshotAnalysis, f'band_{i}') for i in range(HASH_BANDS)]
+        rows = self.db.execute(
+            select(ScreenshotAnalysis.id, ScreenshotAnalysis.dhash, ScreenshotAnalysis.image_prompts).where(
+                or_(*(
+                    column.in_({band[i] for band in bands})
+                    for i, column in enumerate(band_columns)
+                ))
+            )
+        ).all()
+        return [{'id': row.id, 'dhash': row.dhash, 'image_prompts': row.image_prompts} for row in rows]
+
+    @staticmethod
+    def nearest(image_hash: str, candidates: List[Dict]) -> Optional[Dict]:
+        """Closest candidate within screenshot_dedup_max_distance bits, or None."""
+        if not settings.screenshot_dedup_enabled:
+            return None
+        best, best_distance = None, settings.screenshot_dedup_max_distance + 1
+        for candidate in candidates:
+            distance = hamming(image_hash, candidate['dhash'])
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    @staticmethod
+    def entry(image_hash: str, analysis: Dict, image_prompts: List[str], prelanding_id: str, screenshot_path: str) -> Dict:
+        """Row for a bulk insert(ScreenshotAnalysis)."""
+        return {
+            'dhash': image_hash,
+            **{f'band_{i}': band for i, band in enumerate(hash_bands(image_hash))},
+            'analysis': analysis,
+            'image_prompts': image_prompts,
+            'prelanding_id': prelanding_id,
+            'screenshot_path': screenshot_path
+        }
@@ -0,0 +1,159 @@
+import os
+import shutil
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import aiofiles
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes read from the request per write
+RATIO_CHECK_MIN_BYTES = 1024 * 1024  # Compression ratio is only checked on members larger than this
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds max_upload_size_mb."""
+
+
+class UnsafeArchiveError(ValueError):
+    """Raised when a ZIP would expand beyond the configured extraction limits."""
+
+
+def max_upload_bytes() -> int:
+    return settings.max_upload_size_mb * 1024 * 1024
+
+
+async def save_upload(upload: UploadFile, dst_path: str, max_bytes: int) -> int:
+    """
+    Stream an uploaded file to disk in fixed-size chunks.
+
+    Only one chunk is held in memory at a time, writes go through aiofiles so the
+    event loop is never blocked on disk, and the copy stops as soon as the running
+    total passes max_bytes (Content-Length can be absent or wrong).
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        UploadTooLargeError: the upload is larger than max_bytes
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLargeError(f"{upload.filename} is larger than {max_bytes // (1024 * 1024)} MB")
+
+    written = 0
+    async with aiofiles.open(dst_path, "wb") as f:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadTooLargeError(f"{upload.filename} is larger than {max_bytes // (1024 * 1024)} MB")
+            await f.write(chunk)
+    return written
+
+
+async def write_file(dst_path: str, data: bytes) -> None:
+    """Write bytes to disk without blocking the event loop, in UPLOAD_CHUNK_SIZE pieces."""
+    async with aiofiles.open(dst_path, "wb") as f:
+        view = memoryview(data)
+        for start in range(0, len(view), UPLOAD_CHUNK_SIZE):
+            await f.write(view[start:start + UPLOAD_CHUNK_SIZE])
+
+
+def check_archive(zip_ref: zipfile.ZipFile) -> int:
+    """
+    Validate member headers before anything is extracted.
+
+    zipfile never inflates a member past the file_size in its header (a mismatch
+    fails the CRC/length check), so bounding the declared sizes bounds what
+    extraction can write.
+
+    Returns:
+        Total uncompressed size in bytes
+
+    Raises:
+        UnsafeArchiveError: too many members, total uncompressed size over
+            zip_max_uncompressed_mb, or a member compressed more than
+            zip_max_compression_ratio
+    """
+    members = zip_ref.infolist()
+    if len(members) > settings.zip_max_members:
+        raise UnsafeArchiveError(f"ZIP has {len(members)} entries (limit {settings.zip_max_members})")
+
+    max_total = settings.zip_max_uncompressed_mb * 1024 * 1024
+    total = 0
+    for info in members:
+        if info.is_dir():
+            continue
+        total += info.file_size
+        if total > max_total:
+            raise UnsafeArchiveError(f"ZIP expands to more than {settings.zip_max_uncompressed_mb} MB")
+        # Small members can't do damage whatever their ratio (a blank-padded page compresses well)
+        ratio_exceeded = info.file_size > info.compress_size * settings.zip_max_compression_ratio
+        if info.file_size > RATIO_CHECK_MIN_BYTES and ratio_exceeded:
+            raise UnsafeArchiveError(
+                f"{info.filename} has a compression ratio above {settings.zip_max_compression_ratio}:1"
+            )
+    return total
+
+
+@dataclass
+class ArchiveMembers:
+    """Members of an uploaded prelanding ZIP that ingestion actually reads."""
+    html: Optional[zipfile.ZipInfo] = None  # First .html file in archive order
+    meta: Optional[zipfile.ZipInfo] = None  # First meta.json, at any depth
+    images: List[zipfile.ZipInfo] = field(default_factory=list)
+
+
+def default_meta() -> Dict:
+    """Metadata used when an archive has no meta.json."""
+    return {
+        "id": f"pl_{uuid.uuid4().hex[:8]}", "geo": "US", "language": "en", "vertical": "general",
+        "format": "interview", "status": "testing", "tags": [], "metrics": {}
+    }
+
+
+def index_archive(zip_ref: zipfile.ZipFile) -> ArchiveMembers:
+    """
+    Pick the HTML page, meta.json and screenshots from the central directory in one pass.
+
+    Directories and macOS resource forks (__MACOSX/, ._* files) are ignored.
+    """
+    members = ArchiveMembers()
+    for info in zip_ref.infolist():
+        name = os.path.basename(info.filename)
+        if info.is_dir() or info.filename.startswith('__MACOSX/') or name.startswith('._'):
+            continue
+        if name.endswith('.html'):
+            if members.html is None:
+                members.html = info
+        elif name == 'meta.json':
+            if members.meta is None:
+                members.meta = info
+        elif name.lower().endswith(IMAGE_EXTENSIONS):
+            members.images.append(info)
+    return members
+
+
+def extract_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dst_path: str) -> None:
+    """Decompress one member straight to dst_path through a fixed-size buffer (blocking)."""
+    with zip_ref.open(info) as src, open(dst_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+
+async def copy_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, dst_path: str) -> None:
+    """
+    extract_member in the threadpool. Members must be copied one at a time since
+    a ZipFile shares a single file handle.
+    """
+    await run_in_threadpool(extract_member, zip_ref, info, dst_path)
+
+
+async def read_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    """Decompress one member into memory in the threadpool."""
+    return await run_in_threadpool(zip_ref.read, info)
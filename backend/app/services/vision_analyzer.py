@@ -1,16 +1,35 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
+import asyncio
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
-from openai import OpenAI
 from app.config import settings
+from app.services.llm_client import get_llm_client
+
+
+_decode_pool: Optional[ThreadPoolExecutor] = None
+_decode_pool_lock = threading.Lock()
+
+
+def decode_pool() -> ThreadPoolExecutor:
+    """Shared pool for screenshot decode/resize/encode (Pillow releases the GIL for most of it)."""
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            _decode_pool = ThreadPoolExecutor(
+                max_workers=settings.vision_decode_workers,
+                thread_name_prefix="vision-decode"
+            )
+    return _decode_pool
 
 
 class VisionAnalyzer:
     """Service for analyzing screenshots using GPT-4o Vision API."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.llm = get_llm_client()
     
     def analyze_screenshot(self, image_path: str) -> Dict:
         """
@@ -22,7 +41,52 @@ class VisionAnalyzer:
         Returns:
             Dict with image_description, layout_hierarchy, color_psychology
         """
-        # Load and encode image
+        return self.analyze_image(self.encode_image(image_path))
+    
+    async def analyze_screenshots(
+        self,
+        screenshot_paths: List[str],
+        on_done: Optional[Callable[[int], None]] = None
+    ) -> List[Optional[Dict]]:
+        """
+        Analyze screenshots concurrently, at most vision_concurrency at a time.
+        
+        Decoding and resizing run in decode_pool() and the (blocking, rate-limited)
+        vision calls in threads, so the event loop is never held.
+        
+        Args:
+            screenshot_paths: Paths to screenshot images
+            on_done: Called with the number of finished screenshots after each one
+            
+        Returns:
+            Analyses in the order of screenshot_paths. Vision API errors give
+            analyze_image's fallback (with 'failed': True); None only for a
+            screenshot that could not be decoded or raised otherwise (the others
+            are unaffected)
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(settings.vision_concurrency)
+        finished = 0
+        
+        async def analyze(path: str) -> Optional[Dict]:
+            nonlocal finished
+            try:
+                async with semaphore:
+                    img_base64 = await loop.run_in_executor(decode_pool(), self.encode_image, path)
+                    return await asyncio.to_thread(self.analyze_image, img_base64)
+            except Exception as e:
+                print(f"Error analyzing {path}: {e}")
+                return None
+            finally:
+                finished += 1
+                if on_done:
+                    on_done(finished)
+        
+        return await asyncio.gather(*(analyze(path) for path in screenshot_paths))
+    
+    @staticmethod
+    def encode_image(image_path: str) -> str:
+        """Load a screenshot, downscale it to at most 2000px wide and return it as base64 PNG (CPU-bound)."""
         with Image.open(image_path) as img:
             # Resize if too large to save tokens
             if img.width > 2000:
@@ -33,8 +97,19 @@ class VisionAnalyzer:
             # Convert to base64
             buffered = BytesIO()
             img.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+            return base64.b64encode(buffered.getvalue()).decode()
+    
+    def analyze_image(self, img_base64: str) -> Dict:
+        """
+        Run GPT-4o vision on an encoded screenshot (blocking network call).
         
+        Args:
+            img_base64: Base64 PNG from encode_image
+            
+        Returns:
+            Parsed analysis, or a fallback with 'failed': True on API errors
+            and 'unparsed': True when the response is not JSON
+        """
         # Create prompt for vision analysis
         prompt = """Analyze this prelanding page screenshot and extract the following:
 
@@ -47,8 +122,9 @@ Provide a structured JSON response with these categories."""
         
         # Call GPT-4o Vision
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
+            response = self.llm.chat(
+                service="vision_analyzer",
+                task="screenshot",
                 messages=[
                     {
                         "role": "user",
@@ -72,6 +148,7 @@ Provide a structured JSON response with these categories."""
             # Return fallback analysis
             return {
                 'raw_analysis': 'Analysis failed due to API error',
+                'failed': True,
                 'image_descriptions': [],
                 'layout_hierarchy': 'Analysis unavailable',
                 'color_psychology': 'Analysis unavailable'
@@ -85,6 +162,7 @@ Provide a structured JSON response with these categories."""
             # Fallback if not JSON
             analysis = {
                 'raw_analysis': analysis_text,
+                'unparsed': True,
                 'image_descriptions': [],
                 'layout_hierarchy': 'Could not parse',
                 'color_psychology': 'Could not parse'
@@ -114,9 +192,9 @@ Provide a structured JSON response with these categories."""
         
         return prompts
     
-    def analyze_multiple_screenshots(self, screenshot_paths: List[str]) -> Dict:
+    async def analyze_multiple_screenshots(self, screenshot_paths: List[str]) -> Dict:
         """
-        Analyze multiple screenshots and combine insights.
+        Analyze multiple screenshots concurrently and combine insights.
         
         Args:
             screenshot_paths: List of paths to screenshots
@@ -124,15 +202,8 @@ Provide a structured JSON response with these categories."""
         Returns:
             Combined analysis
         """
-        all_analyses = []
-        
-        for path in screenshot_paths:
-            try:
-                analysis = self.analyze_screenshot(path)
-                all_analyses.append(analysis)
-            except Exception as e:
-                print(f"Error analyzing {path}: {e}")
-                continue
+        analyses = await self.analyze_screenshots(screenshot_paths)
+        all_analyses = [analysis for analysis in analyses if analysis is not None]
         
         # Combine analyses
         combined = {
@@ -0,0 +1,38 @@
+"""
+Compliance audit script.
+Re-checks every generated prelanding against the current compliance rules
+and writes compliance_passed/compliance_issues back.
+
+Usage:
+    python audit_compliance.py [--level strict_facebook] [--workers 8] [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import json
+
+from app.services.compliance_audit import ComplianceAudit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-check generated prelandings for compliance")
+    parser.add_argument('--level', default=None, help="Check all rows at this level (default: each row's own level)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count, 0 = in-process)")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="Only report, do not write results")
+    args = parser.parse_args()
+
+    print("Running compliance audit...")
+    summary = ComplianceAudit(
+        compliance_level=args.level,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        dry_run=args.dry_run
+    ).run()
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    print(f"\n✓ Checked {summary['total']} rows: {summary['failed']} failed "
+          f"({summary['newly_failed']} newly), {summary['memoized']} unchanged, {summary['updated']} updated")
+
+
+if __name__ == "__main__":
+    main()
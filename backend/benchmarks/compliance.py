@@ -0,0 +1,170 @@
+"""
+Compliance checker benchmark.
+
+Times ComplianceChecker.check_compliance and check_and_rewrite on synthetic
+10k-word documents against the previous multi-pass implementations (kept here
+as a reference) and verifies both produce the same text, issues and warnings,
+on those documents and on short texts whose rewrites overlap each other or a
+banned phrase. Compiled timings run with an empty result memo; memo hits
+(re-checking unchanged text) are reported on a separate line.
+
+Usage:
+    python -m benchmarks.compliance --docs 50 --words 10000
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Dict, List
+
+from app.services.compliance_checker import ComplianceChecker
+
+
+FILLER_WORDS = (
+    "the market platform users report steady results after careful analysis of "
+    "their portfolio with experts and a clear strategy for long term growth in "
+    "difficult times many investors remain cautious while others explore new tools"
+).split()
+
+RULE_SNIPPETS = [
+    'guaranteed profit', 'No Risk', 'no risk whatsoever', 'risk-free', 'you will earn',
+    'Elon Musk', 'merkel', 'famous person', '$1,000', '€250', '£99',
+    'hurry', 'limited time', 'last chance', 'only today', 'impossible to lose',
+    'Trumpet', 'celebrity_x'
+]
+
+# Rewrites overlapping each other or a banned phrase; checked for parity, not timed
+OVERLAP_CASES = [
+    'This is zero risk-free, honestly.',
+    'no risk-free plan',
+    'A Zero Risk-Free, no risk offer',
+    'guaranteed profit-free guaranteed income',
+    'you will earn and you will make no risk',
+    'risk-free no risk zero risk risk-free',
+]
+
+# Previous English-only rules that were hardcoded in ComplianceChecker
+LEGACY_FINANCIAL_CLAIM_PATTERN = r'\$\d+[\d,]*|\€\d+[\d,]*|£\d+[\d,]*'
+LEGACY_CELEBRITY_PATTERNS = [
+    r'\b(elon musk|bill gates|warren buffett|jeff bezos)\b',
+    r'\b(trump|biden|merkel|macron)\b',
+    r'\b(celebrity|famous person)\b'
+]
+
+
+def make_document(rng: random.Random, words: int, rule_rate: float = 0.002) -> str:
+    """Filler text with rule phrases sprinkled in at `rule_rate` per word."""
+    out = []
+    for _ in range(words):
+        if rng.random() < rule_rate:
+            out.append(rng.choice(RULE_SNIPPETS))
+        else:
+            out.append(rng.choice(FILLER_WORDS))
+    return ' '.join(out)
+
+
+def legacy_check_compliance(checker: ComplianceChecker, text: str) -> Dict:
+    """Previous implementation: one scan per phrase/pattern."""
+    issues = []
+    warnings = []
+    text_lower = text.lower()
+
+    for phrase in checker.banned_phrases:
+        if phrase.lower() in text_lower:
+            issues.append({'type': 'banned_phrase', 'phrase': phrase})
+
+    for pattern in LEGACY_CELEBRITY_PATTERNS:
+        matches = re.findall(pattern, text_lower, re.IGNORECASE)
+        if matches:
+            warnings.append({'type': 'celebrity_endorsement', 'matches': matches})
+
+    financial_claims = re.findall(LEGACY_FINANCIAL_CLAIM_PATTERN, text)
+    if financial_claims and checker.compliance_level == 'strict_facebook':
+        warnings.append({'type': 'financial_claim', 'amounts': financial_claims})
+
+    urgency_count = sum(1 for word in checker.ruleset.urgency_words if word in text_lower)
+    if urgency_count > 2 and checker.compliance_level == 'strict_facebook':
+        warnings.append({'type': 'excessive_urgency', 'count': urgency_count})
+
+    return {'passed': not issues, 'issues': issues, 'warnings': warnings}
+
+
+def legacy_check_and_rewrite(checker: ComplianceChecker, text: str):
+    """Previous flow: check, one re.sub per rewrite rule, then check again."""
+    result = legacy_check_compliance(checker, text)
+    if result['passed']:
+        return text, result
+    for original, replacement in checker.ruleset.rewrites.items():
+        text = re.sub(re.escape(original), replacement, text, flags=re.IGNORECASE)
+    return text, legacy_check_compliance(checker, text)
+
+
+def _comparable(result: Dict) -> Dict:
+    """Drop fields only the new implementation reports (offsets, messages)."""
+    keep = ('type', 'phrase', 'matches', 'amounts', 'count')
+    return {
+        'passed': result['passed'],
+        'issues': [{k: v for k, v in i.items() if k in keep} for i in result['issues']],
+        'warnings': [{k: v for k, v in w.items() if k in keep} for w in result['warnings']]
+    }
+
+
+def _time(fn, docs: List[str], memo: bool = False) -> float:
+    """Mean ms per doc; the result memo is emptied first unless memo hits are being timed."""
+    if not memo:
+        ComplianceChecker.clear_memo()
+    started = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    return (time.perf_counter() - started) * 1000 / len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compliance checking")
+    parser.add_argument('--docs', type=int, default=50)
+    parser.add_argument('--words', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = [make_document(rng, args.words) for _ in range(args.docs)]
+    parity_docs = docs + OVERLAP_CASES
+
+    for level in ComplianceChecker.levels():
+        started = time.perf_counter()
+        checker = ComplianceChecker(compliance_level=level)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        mismatches = sum(
+            1 for doc in parity_docs
+            if _comparable(checker.check_compliance(doc)) != _comparable(legacy_check_compliance(checker, doc))
+        )
+        legacy_ms = _time(lambda doc: legacy_check_compliance(checker, doc), docs)
+        compiled_ms = _time(checker.check_compliance, docs)
+        memo_ms = _time(checker.check_compliance, docs, memo=True)
+
+        print(
+            f"{level:<16} check    legacy {legacy_ms:7.2f} ms/doc  compiled {compiled_ms:7.2f} ms/doc  "
+            f"speedup {legacy_ms / compiled_ms:4.1f}x  first compile {compile_ms:.2f} ms  "
+            f"mismatches {mismatches}/{len(parity_docs)}"
+        )
+        print(f"{level:<16} check    memo hit {memo_ms:7.3f} ms/doc (unchanged text, sha256 + LRU lookup)")
+
+        rewrite_mismatches = 0
+        for doc in parity_docs:
+            text, result = checker.check_and_rewrite(doc)
+            legacy_text, legacy_result = legacy_check_and_rewrite(checker, doc)
+            if text != legacy_text or _comparable(result) != _comparable(legacy_result):
+                rewrite_mismatches += 1
+        legacy_ms = _time(lambda doc: legacy_check_and_rewrite(checker, doc), docs)
+        compiled_ms = _time(checker.check_and_rewrite, docs)
+
+        print(
+            f"{level:<16} rewrite  legacy {legacy_ms:7.2f} ms/doc  compiled {compiled_ms:7.2f} ms/doc  "
+            f"speedup {legacy_ms / compiled_ms:4.1f}x  mismatches {rewrite_mismatches}/{len(parity_docs)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
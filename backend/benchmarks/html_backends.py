@@ -0,0 +1,147 @@
+"""
+HTML parser backend benchmark.
+
+Runs HTMLParser.parse_html (plus detect_vertical on the same document, as on
+upload) with every backend, and the streaming mode used for very large pages,
+over a corpus of real-world-size prelanding pages and reports throughput
+(pages/s) and peak memory. Each backend runs in a fresh process so peak RSS is
+not shared between them. Extraction output of every backend is compared with
+the bs4 reference.
+
+The default corpus is synthetic: article-sized pages, heavy pages with inlined
+scripts/CSS/base64 images, and multi-MB scraped copies. Pass --corpus to use
+archived pages instead (every *.html file below the directory).
+
+Usage:
+    python -m benchmarks.html_backends --repeat 3
+    python -m benchmarks.html_backends --corpus ./uploads --backends bs4 lxml stream
+"""
+
+import argparse
+import base64
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from app.config import settings
+from app.services.html_parser import HTML_PARSER_BACKENDS, STREAM_CHUNK_SIZE, HTMLParser
+from benchmarks.html_parser import make_page
+
+
+STREAM = 'stream'
+
+# (name, count, sections, inlined asset KB)
+CORPUS_SHAPES = [
+    ('article', 30, 150, 0),
+    ('heavy', 10, 600, 300),
+    ('scraped', 3, 1500, 2500),
+]
+
+
+def _inline_assets(rng: random.Random, kb: int) -> str:
+    """Inlined script, CSS and a base64 image of about `kb` kilobytes in total."""
+    if kb <= 0:
+        return ''
+    third = kb * 1024 // 3
+    script = 'var tracking = ' + json.dumps([rng.random() for _ in range(third // 20)]) + ';'
+    css = ''.join(f'.c{i}{{margin:{i % 17}px;color:#{i % 4096:03x}}}' for i in range(third // 30))
+    image = base64.b64encode(rng.randbytes(third * 3 // 4)).decode('ascii')
+    return (
+        f'<script>{script}</script><style>{css}</style>'
+        f'<img src="data:image/png;base64,{image}">'
+        f'<svg width="10" height="10"><path d="M0 0L10 10"/></svg>'
+    )
+
+
+def build_corpus(seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    pages = []
+    for _, count, sections, asset_kb in CORPUS_SHAPES:
+        for _ in range(count):
+            page = make_page(rng, sections)
+            pages.append(page.replace('<body>', '<body>' + _inline_assets(rng, asset_kb), 1))
+    return pages
+
+
+def load_corpus(directory: str) -> List[str]:
+    return [
+        path.read_text(encoding='utf-8', errors='replace')
+        for path in sorted(Path(directory).rglob('*.html'))
+    ]
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _stream_chunks(page: str):
+    return (page[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(page), STREAM_CHUNK_SIZE))
+
+
+def run_backend(backend: str, pages: List[str], repeat: int) -> Dict:
+    """Time one backend ("stream" = streaming mode) over the corpus. Runs in a fresh worker process."""
+    streaming = backend == STREAM
+    parser = HTMLParser(backend=None if streaming else backend)
+    # Tree backends always build the full tree, whatever the page size
+    settings.html_stream_threshold_kb = sys.maxsize
+    baseline_mb = _max_rss_mb()
+    started = time.perf_counter()
+    outputs = []
+    for run in range(repeat):
+        for page in pages:
+            if streaming:
+                extracted = parser._collect(parser.iter_elements(_stream_chunks(page)))
+            else:
+                extracted = parser.parse_html(page)
+            parser.detect_vertical()
+            if run == 0:
+                outputs.append(extracted)
+    elapsed = time.perf_counter() - started
+    return {
+        'backend': backend,
+        'pages_per_second': round(len(pages) * repeat / elapsed, 1),
+        'ms_per_page': round(elapsed * 1000 / (len(pages) * repeat), 2),
+        'peak_rss_mb': round(_max_rss_mb() - baseline_mb, 1),
+        'outputs': json.dumps(outputs, default=str, sort_keys=True)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends")
+    parser.add_argument('--backends', nargs='+', default=[*HTML_PARSER_BACKENDS, STREAM])
+    parser.add_argument('--corpus', default=None, help="Directory of *.html pages (default: synthetic corpus)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else build_corpus(args.seed)
+    if not pages:
+        raise SystemExit("Corpus is empty")
+    total_mb = sum(len(page.encode('utf-8')) for page in pages) / (1024 * 1024)
+    print(f"Corpus: {len(pages)} pages, {total_mb:.1f} MB, largest {max(len(p) for p in pages) / 1024:.0f} KB")
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            results.append(pool.apply(run_backend, (backend, pages, args.repeat)))
+
+    reference = results[0]['outputs']
+    for result in results:
+        identical = result['outputs'] == reference
+        print(
+            f"  {result['backend']:<6} {result['pages_per_second']:>8.1f} pages/s  "
+            f"{result['ms_per_page']:>8.2f} ms/page  peak RSS +{result['peak_rss_mb']:>6.1f} MB  "
+            f"output {'identical' if identical else 'DIFFERS'} vs {results[0]['backend']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+HTML extraction benchmark.
+
+Times HTMLParser.parse_html on large synthetic prelanding pages against the
+previous per-category implementation (kept here as a reference: six find_all
+calls for headings and four more over <p>) and verifies both extract the same
+elements. Extraction is also timed on an already-built soup, since lxml tree
+construction is shared by both, and the upload path (extraction plus vertical
+detection) is timed with a separate parse for detection versus a shared one.
+
+Usage:
+    python -m benchmarks.html_parser --pages 20 --sections 400
+"""
+
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+from app.models import ElementType
+from app.services.html_parser import HTMLParser
+
+
+SENTENCES = [
+    "Many readers asked us how the platform really works and whether it is safe.",
+    "After three weeks of testing, our editor reviewed every transaction in detail.",
+    "The results surprised even the most skeptical members of our team.",
+    "Experts warn that every investment carries risk, however small it may seem.",
+    "Registration takes less than five minutes and requires only an email address.",
+]
+
+SPEAKERS = ['Host', 'Expert', 'Anna', 'Reporter']
+
+
+def make_page(rng: random.Random, sections: int) -> str:
+    """A prelanding-like page: headings, paragraphs, quotes, interview and CTAs."""
+    parts = ['<html><head><title>News</title><style>body{margin:0}</style></head><body>']
+    for i in range(sections):
+        kind = rng.random()
+        if i % 25 == 0:
+            level = rng.randint(1, 6)
+            parts.append(f'<h{level}>Section {i}: {rng.choice(SENTENCES)}</h{level}>')
+        if kind < 0.45:
+            parts.append(f'<p>{" ".join(rng.sample(SENTENCES, 3))}</p>')
+        elif kind < 0.6:
+            parts.append(f'<p>{rng.choice(SPEAKERS)}: {rng.choice(SENTENCES)}</p>')
+        elif kind < 0.7:
+            marker = rng.choice(['Q:', 'A:'])
+            parts.append(f'<p><strong>{marker}</strong> {rng.choice(SENTENCES)}</p>')
+        elif kind < 0.8:
+            parts.append(f'<p>She said: "{rng.choice(SENTENCES)}" and smiled.</p>')
+        elif kind < 0.85:
+            parts.append(f'<blockquote>{rng.choice(SENTENCES)}</blockquote>')
+        elif kind < 0.92:
+            label = rng.choice(['Click here to register', 'Learn more', 'Jetzt starten', 'Read the article'])
+            parts.append(f'<div class="btn"><a href="/go?{i}">{label}</a></div>')
+        else:
+            parts.append(f'<div><span>{rng.choice(SENTENCES)}</span><img src="/img/{i}.jpg"></div>')
+    parts.append('<button>Get started now</button></body></html>')
+    return '\n'.join(parts)
+
+
+class LegacyHTMLParser(HTMLParser):
+    """Previous implementation: one traversal per category, per-category order."""
+
+    def parse_html(self, html_content: str) -> Dict:
+        self.document = BeautifulSoup(html_content, 'lxml')
+        return self._extract_elements()
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        return self.document
+
+    def _extract_elements(self) -> Dict[str, List[Dict]]:
+        return {
+            'headings': self._extract_headings(),
+            'paragraphs': self._extract_paragraphs(),
+            'quotes': self._extract_quotes(),
+            'ctas': self._extract_ctas(),
+            'dialogue': self._extract_dialogue_interview()
+        }
+
+    def _extract_headings(self) -> List[Dict]:
+        headings = []
+        for tag_name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+            for tag in self.soup.find_all(tag_name):
+                text = tag.get_text(strip=True)
+                if text:
+                    element_type = ElementType.HEADING if tag_name in ['h1', 'h2'] else ElementType.SUBHEADING
+                    headings.append({'type': element_type, 'text': text, 'tag': tag_name, 'order': len(headings)})
+        return headings
+
+    def _extract_paragraphs(self) -> List[Dict]:
+        paragraphs = []
+        for p_tag in self.soup.find_all('p'):
+            text = p_tag.get_text(strip=True)
+            if text and len(text) > 20:
+                paragraphs.append({'type': ElementType.PARAGRAPH, 'text': text, 'order': len(paragraphs)})
+        return paragraphs
+
+    def _extract_quotes(self) -> List[Dict]:
+        quotes = []
+        for quote_tag in self.soup.find_all(['blockquote', 'q']):
+            text = quote_tag.get_text(strip=True)
+            if text:
+                quotes.append({'type': ElementType.QUOTE, 'text': text, 'order': len(quotes)})
+        for p_tag in self.soup.find_all('p'):
+            text = p_tag.get_text(strip=True)
+            for match in re.findall(r'[""«]([^""»]+)[""»]', text):
+                if len(match) > 30:
+                    quotes.append({'type': ElementType.QUOTE, 'text': match, 'order': len(quotes)})
+        return quotes
+
+    def _extract_ctas(self) -> List[Dict]:
+        ctas = []
+        for tag in self.soup.find_all(['a', 'button']):
+            text = tag.get_text(strip=True).lower()
+            if any(keyword in text for keyword in self.CTA_KEYWORDS):
+                ctas.append({
+                    'type': ElementType.CTA,
+                    'text': tag.get_text(strip=True),
+                    'href': tag.get('href', ''),
+                    'order': len(ctas)
+                })
+        return ctas
+
+    def _extract_dialogue_interview(self) -> List[Dict]:
+        dialogue_blocks = []
+        speaker_pattern = re.compile(r'^([A-ZА-ЯЁA-ZÄÖÜß][a-zа-яёa-zäöüß\s]+):\s*(.+)', re.MULTILINE)
+        for p_tag in self.soup.find_all('p'):
+            text = p_tag.get_text(strip=True)
+            match = speaker_pattern.match(text)
+            if match:
+                dialogue_text = match.group(2).strip()
+                dialogue_blocks.append({
+                    'type': ElementType.DIALOGUE, 'text': dialogue_text, 'speaker': match.group(1).strip(),
+                    'sentiment': self._detect_sentiment(dialogue_text), 'order': len(dialogue_blocks)
+                })
+        for p_tag in self.soup.find_all('p'):
+            for strong in p_tag.find_all(['strong', 'b']):
+                strong_text = strong.get_text(strip=True)
+                if strong_text in ['Q:', 'A:', 'Question:', 'Answer:']:
+                    dialogue_text = p_tag.get_text(strip=True).replace(strong_text, '').strip()
+                    dialogue_blocks.append({
+                        'type': ElementType.DIALOGUE, 'text': dialogue_text,
+                        'speaker': "Host" if strong_text.startswith('Q') else "Expert",
+                        'sentiment': self._detect_sentiment(dialogue_text), 'order': len(dialogue_blocks)
+                    })
+        return dialogue_blocks
+
+
+def _comparable(extracted: Dict) -> Dict[str, Counter]:
+    """Elements per category, ignoring `order` (legacy numbered each category separately)."""
+    return {
+        category: Counter(tuple(sorted((k, str(v)) for k, v in e.items() if k != 'order')) for e in elements)
+        for category, elements in extracted.items()
+    }
+
+
+def _orders_valid(extracted: Dict) -> bool:
+    """Global order: unique across categories and contiguous from 0."""
+    orders = sorted(e['order'] for elements in extracted.values() for e in elements)
+    return orders == list(range(len(orders)))
+
+
+def _time(fn: Callable, items: List) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) * 1000 / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML element extraction")
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--sections', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [make_page(rng, args.sections) for _ in range(args.pages)]
+    size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+
+    current, legacy = HTMLParser(backend='bs4'), LegacyHTMLParser(backend='bs4')
+    mismatches = sum(1 for page in pages if _comparable(current.parse_html(page)) != _comparable(legacy.parse_html(page)))
+    invalid_orders = sum(1 for page in pages if not _orders_valid(current.parse_html(page)))
+
+    legacy_ms = _time(legacy.parse_html, pages)
+    current_ms = _time(current.parse_html, pages)
+    print(
+        f"parse+extract  legacy {legacy_ms:8.2f} ms/page  single-pass {current_ms:8.2f} ms/page  "
+        f"speedup {legacy_ms / current_ms:4.1f}x  ({size_kb:.0f} KB/page)"
+    )
+
+    soups = [BeautifulSoup(page, 'lxml') for page in pages]
+
+    def extract(p: HTMLParser):
+        def run(soup):
+            p.document = soup
+            return p._extract_elements()
+        return run
+
+    legacy_ms = _time(extract(legacy), soups)
+    current_ms = _time(extract(current), soups)
+    print(
+        f"extract only   legacy {legacy_ms:8.2f} ms/page  single-pass {current_ms:8.2f} ms/page  "
+        f"speedup {legacy_ms / current_ms:4.1f}x"
+    )
+
+    def upload_separate(page):
+        HTMLParser(backend='bs4').detect_vertical(page)
+        return HTMLParser(backend='bs4').parse_html(page)
+
+    def upload_shared(page):
+        p = HTMLParser(backend='bs4')
+        extracted = p.parse_html(page)
+        p.detect_vertical()
+        return extracted
+
+    separate_ms = _time(upload_separate, pages)
+    shared_ms = _time(upload_shared, pages)
+    print(
+        f"upload path    two parses {separate_ms:8.2f} ms/page  shared parse {shared_ms:8.2f} ms/page  "
+        f"speedup {separate_ms / shared_ms:4.1f}x"
+    )
+    print(f"mismatches {mismatches}/{len(pages)}  invalid global order {invalid_orders}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
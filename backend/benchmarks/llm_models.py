@@ -0,0 +1,206 @@
+"""
+Model routing benchmark.
+
+Replays a fixed set of representative requests (the same prompts the services
+build) against candidate models and reports p50/p95 latency, tokens and cost
+per (task, model). Use it to decide which tasks can be routed to cheaper/faster
+models via LLM_MODEL_ROUTES.
+
+Usage:
+    python -m benchmarks.llm_models --models gpt-4o gpt-4o-mini --repeat 5
+    python -m benchmarks.llm_models --cases names reviews --scenario-id 1 --json results.json
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.services.copy_generator import CopyGenerator
+from app.services.llm_client import get_llm_client
+from app.services.llm_usage import compute_cost, extract_usage, usage_context
+from app.services.name_generator import NameGenerator
+from app.services.review_generator import ReviewGenerator
+
+
+# Fixed RAG-like context so copy prompts are identical between runs
+BENCHMARK_CONTEXT = {
+    'example_headings': [
+        "Exclusive Interview: How AI is Changing Finance",
+        "The Truth About Cryptocurrency They Don't Want You to Know"
+    ],
+    'example_dialogues': [
+        {'speaker': 'Host', 'text': 'Many people are skeptical about this. What would you say to them?'},
+        {'speaker': 'Expert', 'text': 'I understand the skepticism, but the results speak for themselves.'}
+    ],
+    'example_quotes': ["I never thought this was possible until I tried it myself."]
+}
+
+BENCHMARK_BEGINNING = (
+    "Als Anna aus München zum ersten Mal von der Plattform hörte, war sie skeptisch. "
+    "Doch nach einem Gespräch mit einem Finanzexperten änderte sich ihre Meinung."
+)
+
+
+def _json_array_valid(text: str) -> bool:
+    start, end = text.find('['), text.rfind(']') + 1
+    if start == -1 or end <= start:
+        return False
+    try:
+        return isinstance(json.loads(text[start:end]), list)
+    except json.JSONDecodeError:
+        return False
+
+
+def build_cases(scenario=None) -> Dict[str, Dict]:
+    """Fixed request set: service/task, messages, sampling params and an optional validity check."""
+    names_prompt = NameGenerator()._build_name_prompt('DE', 'random', 10, True)
+    reviews_prompt = ReviewGenerator()._build_review_prompt('DE', 'de', 'crypto', 'short', 5, None)
+    copy_prefix = CopyGenerator._build_copy_prefix('DE', 'de', 'skeptical_journalist')
+    copy_prompt = CopyGenerator._build_generation_prompt(
+        offer='AI trading platform', language='de', vertical='crypto',
+        context=BENCHMARK_CONTEXT, target_length=800, format_type='interview'
+    )
+
+    cases = {
+        'names': {
+            'service': 'name_generator', 'task': 'names',
+            'messages': [
+                {"role": "system", "content": "You are a helpful assistant that generates realistic names in JSON format."},
+                {"role": "user", "content": names_prompt}
+            ],
+            'temperature': 0.8, 'max_tokens': 2000, 'check': _json_array_valid
+        },
+        'reviews': {
+            'service': 'review_generator', 'task': 'reviews',
+            'messages': [
+                {"role": "system", "content": "You are a helpful assistant that generates realistic product reviews in JSON format."},
+                {"role": "user", "content": reviews_prompt}
+            ],
+            'temperature': 0.8, 'max_tokens': 4000, 'check': _json_array_valid
+        },
+        'copy': {
+            'service': 'copy_generator', 'task': 'copy',
+            'messages': [
+                {"role": "system", "content": copy_prefix},
+                {"role": "user", "content": copy_prompt}
+            ],
+            'temperature': 0.7, 'max_tokens': 2000, 'check': None
+        },
+    }
+
+    if scenario is not None:
+        base_context = CopyGenerator._build_base_context('DE', 'de', 'skeptical_journalist')
+        params = CopyGenerator._build_request_params('AI trading platform', 'crypto')
+        for part, max_tokens in (('beginning', 2000), ('middle', 8000), ('end', 5000)):
+            prompt = f"{CopyGenerator._build_scenario_block(scenario, part)}\n{params}\n"
+            if part != 'beginning':
+                prompt += f"\nКОНТЕКСТ: Ты уже написал начало прелендинга:\n---\n{BENCHMARK_BEGINNING}\n---\n"
+            cases[part] = {
+                'service': 'copy_generator', 'task': part,
+                'messages': [
+                    {"role": "system", "content": base_context},
+                    {"role": "user", "content": prompt}
+                ],
+                'temperature': 0.8, 'max_tokens': max_tokens, 'check': None
+            }
+
+    return cases
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+
+def run_case(case: Dict, model: str, repeat: int) -> Dict:
+    """Run one case `repeat` times against `model` and summarize."""
+    client = get_llm_client()
+    check: Optional[Callable[[str], bool]] = case['check']
+    latencies, prompt_tokens, completion_tokens, costs = [], [], [], []
+    valid = errors = 0
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            response = client.chat(
+                service=case['service'],
+                task=case['task'],
+                model=model,
+                messages=case['messages'],
+                temperature=case['temperature'],
+                max_tokens=case['max_tokens']
+            )
+        except Exception as e:
+            print(f"  {model} error: {e}")
+            errors += 1
+            continue
+
+        latencies.append((time.perf_counter() - started) * 1000)
+        usage = extract_usage(response.usage)
+        prompt_tokens.append(usage['prompt_tokens'])
+        completion_tokens.append(usage['completion_tokens'])
+        costs.append(compute_cost(model, usage['prompt_tokens'], usage['completion_tokens'], usage['cached_tokens']))
+        if check is None or check(response.choices[0].message.content or ''):
+            valid += 1
+
+    runs = len(latencies)
+    return {
+        'model': model,
+        'runs': runs,
+        'errors': errors,
+        'p50_ms': round(_percentile(latencies, 0.50), 1),
+        'p95_ms': round(_percentile(latencies, 0.95), 1),
+        'avg_prompt_tokens': round(statistics.mean(prompt_tokens), 1) if runs else 0,
+        'avg_completion_tokens': round(statistics.mean(completion_tokens), 1) if runs else 0,
+        'avg_cost_usd': round(statistics.mean(costs), 6) if runs else 0.0,
+        'valid_rate': round(valid / runs, 2) if runs else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate models on a fixed request set")
+    parser.add_argument('--models', nargs='+', default=['gpt-4o', 'gpt-4o-mini'])
+    parser.add_argument('--cases', nargs='+', default=None, help="Subset of cases (default: all)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scenario-id', type=int, default=None, help="Add beginning/middle/end cases from this scenario")
+    parser.add_argument('--json', dest='json_path', default=None, help="Write results to a JSON file")
+    args = parser.parse_args()
+
+    scenario = None
+    if args.scenario_id is not None:
+        from app.database import SessionLocal
+        from app.services.scenario_manager import ScenarioManager
+        db = SessionLocal()
+        try:
+            scenario = ScenarioManager(db).get_by_id(args.scenario_id)
+        finally:
+            db.close()
+        if scenario is None:
+            raise SystemExit(f"Scenario {args.scenario_id} not found")
+
+    cases = build_cases(scenario)
+    selected = args.cases or list(cases)
+
+    results = {}
+    with usage_context(request_id=f"benchmark-{int(time.time())}"):
+        for name in selected:
+            print(f"\n== {name} ==")
+            results[name] = []
+            for model in args.models:
+                summary = run_case(cases[name], model, args.repeat)
+                results[name].append(summary)
+                print(
+                    f"  {model:<20} p50 {summary['p50_ms']:>8.1f} ms  p95 {summary['p95_ms']:>8.1f} ms  "
+                    f"tokens {summary['avg_prompt_tokens']:>7.1f}/{summary['avg_completion_tokens']:<7.1f} "
+                    f"cost ${summary['avg_cost_usd']:.5f}  valid {summary['valid_rate']:.0%}  errors {summary['errors']}"
+                )
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Bulk library import script.
+Loads prelanding ZIPs (same layout as /api/prelandings/upload-zip) from a
+directory or manifest: HTML is parsed across a process pool, embeddings are
+batched across documents and rows are bulk-inserted. Re-run with the same
+checkpoint to resume an interrupted import.
+
+Usage:
+    python import_library.py ./winners [--workers 8] [--batch-pages 50] [--checkpoint import.json] [--no-embed]
+    python import_library.py manifest.txt
+"""
+
+import argparse
+import json
+
+from app.services.library_import import LibraryImport
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import prelanding ZIPs into the library")
+    parser.add_argument('source', help="Directory of *.zip files or a manifest (one path per line)")
+    parser.add_argument('--checkpoint', default='import_checkpoint.json', help="Progress file used to resume")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count, 0 = in-process)")
+    parser.add_argument('--batch-pages', type=int, default=50, help="Pages per embedding/insert batch")
+    parser.add_argument('--no-embed', action='store_true', help="Store elements without vectors (embed later)")
+    args = parser.parse_args()
+
+    zip_paths = LibraryImport.discover(args.source)
+    print(f"Importing {len(zip_paths)} archives from {args.source}...")
+    summary = LibraryImport(
+        zip_paths,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        batch_pages=args.batch_pages,
+        embed=not args.no_embed
+    ).run()
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    print(f"\n✓ Imported {summary['imported']} prelandings ({summary['elements']} elements, "
+          f"{summary['embedded']} embedded), {summary['duplicates']} duplicates, {summary['failed']} failed, "
+          f"{summary['skipped']} already done - {summary['pages_per_minute']} pages/min")
+
+
+if __name__ == "__main__":
+    main()
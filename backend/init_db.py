@@ -5,6 +5,7 @@ Creates all tables and seeds initial data.
 
 from app.database import engine, SessionLocal
 from app.models import Base
+from app.migrations import upgrade_schema
 from app.seeds.initial_scenarios import seed_scenarios
 
 
@@ -16,6 +17,11 @@ def init_db():
     Base.metadata.create_all(bind=engine)
     print("✓ Tables created successfully")
 
+    # Add columns introduced since existing tables were created
+    added = upgrade_schema(engine)
+    if added:
+        print(f"✓ Added {len(added)} new column(s) to existing tables")
+
     # Seed initial data
     print("\nSeeding initial data...")
     db = SessionLocal()
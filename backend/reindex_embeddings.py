@@ -0,0 +1,41 @@
+"""
+Embedding backfill script.
+Embeds elements that have no vector yet (failed or interrupted ingests, or an
+import run with --no-embed), in batches. Safe to re-run or run concurrently:
+point ids are derived from the elements, so no duplicate vectors are created.
+
+Usage:
+    python reindex_embeddings.py [--prelanding pl_123]
+"""
+
+import argparse
+import json
+
+from app.database import SessionLocal
+from app.services.embeddings import EmbeddingService
+from app.services.ingest import ElementEmbedder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed elements that are missing vectors")
+    parser.add_argument('--prelanding', default=None, help="Only this prelanding (default: whole library)")
+    args = parser.parse_args()
+
+    def report(stage, done=None, total=None, **_):
+        if total:
+            print(f"Embedding {total} elements...")
+        elif done:
+            print(f"  {done} processed")
+
+    db = SessionLocal()
+    try:
+        summary = ElementEmbedder(EmbeddingService()).run(db, args.prelanding, report)
+    finally:
+        db.close()
+
+    print(json.dumps(summary, indent=2))
+    print(f"\n✓ Embedded {summary['embedded']} of {summary['missing']} missing elements, {summary['failed']} still failing")
+
+
+if __name__ == "__main__":
+    main()
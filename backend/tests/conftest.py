@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Settings require an API key; tests never reach the provider
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
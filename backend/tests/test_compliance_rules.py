@@ -0,0 +1,59 @@
+import json
+import shutil
+
+from app.services.compliance_rules import DEFAULT_RULES_DIR, ComplianceRuleStore
+
+
+def _rules_dir(tmp_path):
+    rules_dir = tmp_path / "compliance"
+    shutil.copytree(DEFAULT_RULES_DIR, rules_dir)
+    return rules_dir
+
+
+def test_edit_without_version_bump_is_picked_up(tmp_path):
+    rules_dir = _rules_dir(tmp_path)
+    store = ComplianceRuleStore(str(rules_dir), reload_seconds=0)
+    before = store.get("strict_facebook", "en")
+    assert not any(category == "banned" for category, _, _ in before.find_hits("a brand new claim"))
+
+    rules_path = rules_dir / "en.json"
+    rules = json.loads(rules_path.read_text(encoding="utf-8"))
+    rules["levels"]["strict_facebook"]["banned_phrases"].append("brand new claim")
+    rules_path.write_text(json.dumps(rules), encoding="utf-8")
+
+    after = store.get("strict_facebook", "en")
+    assert after.version != before.version
+    assert ("banned", "brand new claim", 2) in after.find_hits("a brand new claim")
+
+
+def test_untouched_files_keep_their_version(tmp_path):
+    rules_dir = _rules_dir(tmp_path)
+    first = ComplianceRuleStore(str(rules_dir), reload_seconds=0).get("strict_facebook", "de")
+    second = ComplianceRuleStore(str(rules_dir), reload_seconds=0).get("strict_facebook", "de")
+    assert first.version == second.version
+    assert first.version.startswith("en@")
+
+
+def test_literals_inside_amounts_are_found():
+    ruleset = ComplianceRuleStore(reload_seconds=0).get("strict_facebook", "en")
+    for text, amount in (("$100% profit", "$100"), ("€50100% profit", "€50100")):
+        hits = ruleset.find_hits(text)
+        assert ("financial", amount, 0) in hits
+        assert any(category == "banned" and phrase == "100% profit" for category, phrase, _ in hits)
+        rewritten, _ = ruleset.apply_rewrites(text, hits)
+        assert "100% profit" not in rewritten
+
+
+def test_amounts_do_not_overlap():
+    ruleset = ComplianceRuleStore(reload_seconds=0).get("strict_facebook", "en")
+    amounts = [phrase for category, phrase, _ in ruleset.find_hits("earn $1,000 or €50 today") if category == "financial"]
+    assert amounts == ["$1,000", "€50"]
+
+
+def test_rewrite_completing_another_rewrite_phrase_is_rewritten_again():
+    ruleset = ComplianceRuleStore(reload_seconds=0).get("strict_facebook", "de")
+    text = "Das ist kein risikofrei Angebot"
+    rewritten, hits = ruleset.apply_rewrites(text, ruleset.find_hits(text))
+    assert rewritten == "Das ist überschaubares risikoarm Angebot"
+    assert not any(category == "banned" for category, _, _ in hits)
+    assert hits == [hit for hit in ruleset.find_hits(rewritten) if hit[0] != "rewrite"]
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from app.services.embeddings import EmbeddingService
+
+
+class FakeLLM:
+    """Embeds each text as [len(text)]; rejects any request containing "too long"."""
+
+    def __init__(self):
+        self.requests = []
+
+    def embed(self, service, model, input):
+        self.requests.append(list(input))
+        if "too long" in input:
+            request = httpx.Request("POST", "https://api.openai.test/v1/embeddings")
+            raise openai.BadRequestError(
+                "maximum context length exceeded",
+                response=httpx.Response(400, request=request),
+                body=None,
+            )
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)
+        ])
+
+
+def _service():
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.llm = FakeLLM()
+    return service
+
+
+def test_rejected_input_fails_alone():
+    service = _service()
+    texts = [f"text {i}" for i in range(7)]
+    texts[4] = "too long"
+
+    vectors = service.create_embeddings(texts)
+
+    assert vectors[4] is None
+    assert all(vector == [float(len(text))] for i, (vector, text) in enumerate(zip(vectors, texts)) if i != 4)
+    assert len(service.llm.requests) < 2 * len(texts)
+
+
+def test_accepted_batch_is_one_request():
+    service = _service()
+    assert service.create_embeddings(["a", "bb"]) == [[1.0], [2.0]]
+    assert service.llm.requests == [["a", "bb"]]
@@ -0,0 +1,70 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.config import settings
+from app.services.llm_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMClient,
+    LLMRateLimitError,
+    LLMUnavailableError,
+)
+
+
+def _provider_error(error_class, status_code):
+    request = httpx.Request("POST", "https://api.openai.test/v1/chat/completions")
+    return error_class("provider error", response=httpx.Response(status_code, request=request), body=None)
+
+
+def _raising(error):
+    def call(client, service, task, **kwargs):
+        raise error
+    return call
+
+
+def _answering(client, service, task, **kwargs):
+    return SimpleNamespace(usage=None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 0)
+    client = LLMClient()
+    client._limiter("test-model").breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    return client
+
+
+def _call(client, tracked_fn):
+    return client._call(tracked_fn, "test", None, {"model": "test-model", "messages": []})
+
+
+def test_rate_limited_probe_closes_circuit(client):
+    breaker = client._limiter("test-model").breaker
+
+    # A provider fault opens the circuit; calls are rejected during the cool-down
+    with pytest.raises(LLMUnavailableError):
+        _call(client, _raising(_provider_error(openai.InternalServerError, 500)))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        _call(client, _answering)
+
+    # After the cool-down the probe is answered with 429
+    time.sleep(0.06)
+    with pytest.raises(LLMRateLimitError):
+        _call(client, _raising(_provider_error(openai.RateLimitError, 429)))
+    assert breaker.state == "closed"
+
+    # The next call reaches the provider instead of being rejected
+    assert _call(client, _answering).usage is None
+
+
+def test_rate_limits_do_not_open_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.before_call("test-model")
+    breaker.record_rate_limited()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
@@ -1,6 +1,6 @@
 'use client';
 
-import { useState, useEffect, FormEvent } from 'react';
+import { useState, useEffect, useRef, FormEvent } from 'react';
 import { motion } from 'framer-motion';
 import { Wand2, Loader2, Download, FileText, Code, Sparkles, Settings, Users, Star, Copy, Check } from 'lucide-react';
 import axios from 'axios';
@@ -28,6 +28,8 @@ export default function GeneratePage() {
     const [activeTab, setActiveTab] = useState('text');
     const [scenarios, setScenarios] = useState<any[]>([]);
     const [showScenarioManager, setShowScenarioManager] = useState(false);
+    // Idempotency key reused when the same request is retried after a failure
+    const pendingRequest = useRef<{ payload: string; key: string } | null>(null);
 
     // Load scenarios on mount
     useEffect(() => {
@@ -92,7 +94,15 @@ export default function GeneratePage() {
                 }
                 : formData;
 
-            const response = await axios.post(endpoint, requestData);
+            const payload = JSON.stringify({ endpoint, requestData });
+            if (pendingRequest.current?.payload !== payload) {
+                pendingRequest.current = { payload, key: crypto.randomUUID() };
+            }
+
+            const response = await axios.post(endpoint, requestData, {
+                headers: { 'Idempotency-Key': pendingRequest.current.key }
+            });
+            pendingRequest.current = null;
             setResult(response.data);
         } catch (error: any) {
             console.error('Ошибка генерации:', error);
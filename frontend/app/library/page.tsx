@@ -2,11 +2,20 @@
 
 import React, { useState, useEffect, useCallback, useMemo } from 'react';
 import { motion } from 'framer-motion';
-import { Upload, Search, TrendingUp, CheckCircle, XCircle, Loader2, MoreVertical, Trash2, Globe, FileText, Languages, ChevronLeft, ChevronRight } from 'lucide-react';
+import { Upload, Search, TrendingUp, CheckCircle, XCircle, Loader2, MoreVertical, Trash2, Globe, FileText, Languages, ChevronLeft, ChevronRight, RotateCcw } from 'lucide-react';
 import axios from 'axios';
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 const ITEMS_PER_PAGE = 9;
+const INDEXING_POLL_MS = 3000;
+
+// Background ingest stages (parse -> store -> embed -> vision)
+const STAGE_LABELS: Record<string, string> = {
+    parse: 'разбор HTML',
+    store: 'сохранение',
+    embed: 'эмбеддинги',
+    vision: 'анализ скриншотов'
+};
 
 interface PatternProfile {
     tone: string;
@@ -27,9 +36,23 @@ interface Prelanding {
     lead_rate?: number;
     deposit_rate?: number;
     date_added: string;
+    ingest_status?: string;
+    ingest_error?: string;
     pattern_profile?: PatternProfile;
 }
 
+interface IngestJob {
+    job_id: string;
+    status: string;
+    stage?: string;
+    stages: Record<string, { status: string; done: number; total: number }>;
+    summary?: { elements: number; vertical: string };
+    error?: string;
+}
+
+const isIndexing = (pl: Prelanding) =>
+    !!pl.ingest_status && pl.ingest_status !== 'ready' && pl.ingest_status !== 'failed';
+
 export default function LibraryPage() {
     const [prelandings, setPrelandings] = useState<Prelanding[]>([]);
     const [loading, setLoading] = useState(true);
@@ -50,8 +73,8 @@ export default function LibraryPage() {
         fetchPrelandings();
     }, [filterVertical]);
 
-    const fetchPrelandings = async () => {
-        setLoading(true);
+    const fetchPrelandings = async (silent = false) => {
+        if (!silent) setLoading(true);
         try {
             const params = new URLSearchParams();
             if (filterVertical) params.append('vertical', filterVertical);
@@ -61,10 +84,48 @@ export default function LibraryPage() {
         } catch (error) {
             console.error('Ошибка загрузки prelandings:', error);
         } finally {
-            setLoading(false);
+            if (!silent) setLoading(false);
         }
     };
 
+    // Refresh quietly while any prelanding is still being indexed
+    const anyIndexing = prelandings.some(isIndexing);
+    useEffect(() => {
+        if (!anyIndexing) return;
+        const timer = setInterval(() => fetchPrelandings(true), INDEXING_POLL_MS);
+        return () => clearInterval(timer);
+    }, [anyIndexing, filterVertical]);
+
+    const watchIngest = (jobId: string, name: string) => {
+        const events = new EventSource(`${API_URL}/api/prelandings/ingest/${jobId}/events`);
+
+        events.addEventListener('progress', (e) => {
+            const job: IngestJob = JSON.parse((e as MessageEvent).data);
+            const stage = job.stage ? job.stages[job.stage] : null;
+            const progress = stage && stage.total > 1 ? ` ${stage.done}/${stage.total}` : '';
+            setUploadResult({
+                success: true,
+                message: `${name}: индексация — ${job.stage ? STAGE_LABELS[job.stage] : 'в очереди'}${progress}`
+            });
+        });
+
+        events.addEventListener('done', (e) => {
+            const job: IngestJob = JSON.parse((e as MessageEvent).data);
+            events.close();
+            setUploadResult(job.status === 'completed' ? {
+                success: true,
+                message: `✓ ${name} проиндексирован! Категория: ${job.summary?.vertical || 'general'}, элементов: ${job.summary?.elements ?? 0}`
+            } : {
+                success: false,
+                message: `${name}: ошибка индексации${job.error ? ` — ${job.error}` : ''}`
+            });
+            fetchPrelandings(true);
+        });
+
+        // Connection lost: the table keeps polling the indexing state
+        events.onerror = () => events.close();
+    };
+
     const handleDrag = useCallback((e: React.DragEvent) => {
         e.preventDefault();
         e.stopPropagation();
@@ -108,13 +169,21 @@ export default function LibraryPage() {
                 headers: { 'Content-Type': 'multipart/form-data' }
             });
 
-            setUploadResult({
-                success: true,
-                message: `✓ ${response.data.name} загружен! Категория: ${response.data.vertical_detected || 'general'}`
-            });
+            if (response.data.duplicate) {
+                setUploadResult({
+                    success: true,
+                    message: `✓ ${response.data.name} уже в базе — метаданные обновлены`
+                });
+            } else {
+                setUploadResult({
+                    success: true,
+                    message: `${response.data.name} загружен, индексация...`
+                });
+                watchIngest(response.data.ingest_job_id, response.data.name);
+            }
 
             // Refresh list
-            fetchPrelandings();
+            fetchPrelandings(true);
         } catch (error: any) {
             setUploadResult({
                 success: false,
@@ -125,6 +194,19 @@ export default function LibraryPage() {
         }
     };
 
+    const retryIngest = async (pl: Prelanding) => {
+        try {
+            const response = await axios.post(`${API_URL}/api/prelandings/${pl.id}/reingest`);
+            watchIngest(response.data.job_id, pl.name || pl.id);
+            fetchPrelandings(true);
+        } catch (error: any) {
+            setUploadResult({
+                success: false,
+                message: error.response?.data?.detail || 'Ошибка повторной индексации'
+            });
+        }
+    };
+
     const deletePrelanding = async (id: string, name: string) => {
         if (!confirm(`Удалить "${name || id}"?`)) return;
 
@@ -345,7 +427,7 @@ export default function LibraryPage() {
                             {uploading ? (
                                 <div className="flex items-center gap-3">
                                     <Loader2 className="w-6 h-6 text-primary animate-spin" />
-                                    <span>Загрузка и анализ прелендинга...</span>
+                                    <span>Загрузка прелендинга...</span>
                                 </div>
                             ) : uploadResult ? (
                                 <div className="flex items-center gap-3">
@@ -406,6 +488,26 @@ export default function LibraryPage() {
                                         >
                                             <td className="px-4 py-3">
                                                 <span className="font-medium truncate block">{pl.name || '—'}</span>
+                                                {isIndexing(pl) && (
+                                                    <span className="inline-flex items-center gap-1 mt-1 text-xs text-amber-400">
+                                                        <Loader2 className="w-3 h-3 animate-spin" />
+                                                        индексация
+                                                    </span>
+                                                )}
+                                                {pl.ingest_status === 'failed' && (
+                                                    <span className="inline-flex items-center gap-1 mt-1 text-xs text-red-400" title={pl.ingest_error}>
+                                                        <XCircle className="w-3 h-3" />
+                                                        ошибка индексации
+                                                        <button
+                                                            onClick={() => retryIngest(pl)}
+                                                            className="inline-flex items-center gap-1 ml-1 underline hover:text-red-300"
+                                                            title="Повторить индексацию"
+                                                        >
+                                                            <RotateCcw className="w-3 h-3" />
+                                                            повторить
+                                                        </button>
+                                                    </span>
+                                                )}
                                             </td>
                                             <td className="px-4 py-3">
                                                 <span className="text-xs text-muted-foreground font-mono truncate block">{pl.id}</span>